@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+On-device bytes.decode() throughput across error handlers and malformed input.
+
+test_scripts/15849_bytes_decode_codec.py and 3469_bytes_decode_ignore.py check
+that decode(..., "ignore"/"replace") give the right result on a few bytes.
+This measures what the error handlers cost on buffers the size of UART and
+socket reads: decode throughput (MB/s) and the heap allocated per call for
+strict, ignore and replace, over buffers from 64 bytes to 64 KB, with a
+varying density of malformed sequences:
+
+    invalid     a byte that never occurs in UTF-8 (0xFF)
+    truncated   a 4-byte lead (0xF0) followed by ASCII instead of continuations
+    overlong    an overlong 2-byte encoding of '/' (0xC0 0xAF)
+
+The buffers are built on the device (a 1 KB pattern repeated), so nothing but
+the results crosses the link. Strict decoding of malformed input raises
+UnicodeError; its throughput is the cost of finding the error.
+
+Usage:
+    python decode_bench.py -t COM27
+    python decode_bench.py -t socket://localhost:2218 --handlers ignore replace --kinds truncated
+"""
+
+import argparse
+import sys
+import time
+
+from mpsession import TIMER, Session, open_session, parse_line, save_results
+
+RESULTS_FILE = "decode_bench.json"
+SIZES = [64, 256, 1024, 4096, 16384, 65536]
+HANDLERS = ["strict", "ignore", "replace"]
+KINDS = ["invalid", "truncated", "overlong"]
+DENSITIES = [0.001, 0.01, 0.1]  # Fraction of characters replaced by a malformed sequence
+
+# Code points the valid text cycles through
+CONTENT = {"ascii": [0x61, 0x62, 0x63, 0x20], "mixed": [0x61, 0x20, 0xE9, 0x4E2D, 0x1F600]}
+
+# On-device benchmark. _chars() is the first count characters of the text: the
+# valid characters cycled, with a malformed sequence as every step-th character
+# (never if step is 0), cut at size bytes and padded with ASCII so it ends on a
+# character boundary. _buffer() repeats one whole period of the text (a multiple
+# of both step and the cycle), so the density holds across the whole buffer, and
+# returns it with the number of malformed sequences it holds. _case() sweeps the
+# sizes of one handler and input, and stops once a call takes longer than max_us.
+BENCH = TIMER + """\
+_BAD = {'invalid': b'\\xff', 'truncated': b'\\xf0a', 'overlong': b'\\xc0\\xaf'}
+def _chars(size, count, chars, bad, step):
+ parts = []
+ n = i = nbad = 0
+ while n < size and i < count:
+  is_bad = step and i % step == step - 1
+  p = bad if is_bad else chars[i % len(chars)]
+  if n + len(p) > size:
+   p = b'a' * (size - n)
+  elif is_bad:
+   nbad += 1
+  parts.append(p)
+  n += len(p)
+  i += 1
+ return b''.join(parts), nbad
+def _buffer(size, chars, bad, step):
+ k = len(chars)
+ a, b = step or k, k
+ while b:
+  a, b = b, a % b
+ period = (step or k) * k // a
+ unit, ubad = _chars(size, period, chars, bad, step)
+ reps = size // len(unit)
+ rest, rbad = _chars(size - reps * len(unit), period, chars, bad, step)
+ return unit * reps + rest, ubad * reps + rbad
+def _decoder(buf, handler):
+ def fn():
+  try:
+   buf.decode('utf-8', handler)
+  except UnicodeError:
+   pass
+ return fn
+def _case(handler, kind, density, content, sizes, min_us, max_us):
+ chars = [chr(c).encode() for c in content]
+ step = round(1 / density) if density else 0
+ for size in sizes:
+  r = {'handler': handler, 'kind': kind, 'density': density, 'size': size}
+  buf = fn = None
+  try:
+   buf, r['bad'] = _buffer(size, chars, _BAD.get(kind, b''), step)
+   try:
+    r['chars'] = len(buf.decode('utf-8', handler))
+   except UnicodeError:
+    r['raised'] = True
+   fn = _decoder(buf, handler)
+   gc.collect()
+   a = gc.mem_alloc()
+   fn()
+   a = gc.mem_alloc() - a
+   r['alloc'] = a if a >= 0 else None
+   r['us'], r['reps'] = _time(fn, min_us)
+  except Exception as e:
+   r['error'] = type(e).__name__ + ': ' + str(e)
+  buf = fn = None
+  gc.collect()
+  _emit('R', r)
+  if 'error' in r or r['us'] > max_us:
+   break
+def _all(cases, content, sizes, min_us, max_us):
+ for handler, kind, density in cases:
+  _case(handler, kind, density, content, sizes, min_us, max_us)
+ _emit('E', len(cases))
+"""
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark bytes.decode() error handlers on malformed input on a device",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python decode_bench.py -t COM27
+    python decode_bench.py -t socket://localhost:2218 --handlers ignore replace
+    python decode_bench.py -t COM27 --kinds truncated --densities 0.01 0.5 --content ascii
+    python decode_bench.py -t /dev/ttyACM0 --sizes 64 1024 16384
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        default="auto",
+        help="Target connection (default: auto), e.g. COM27, /dev/ttyUSB0, socket://localhost:2218.",
+    )
+    parser.add_argument(
+        "--handlers",
+        nargs="+",
+        choices=HANDLERS,
+        default=HANDLERS,
+        help="Error handlers to measure (default: all).",
+    )
+    parser.add_argument(
+        "--kinds",
+        nargs="+",
+        choices=KINDS,
+        default=KINDS,
+        help="Kinds of malformed sequence (default: all).",
+    )
+    parser.add_argument(
+        "--densities",
+        nargs="+",
+        type=float,
+        default=DENSITIES,
+        help="Fractions of characters replaced by a malformed sequence; valid input is always "
+        f"measured too (default: {' '.join(map(str, DENSITIES))}).",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=SIZES,
+        help=f"Buffer sizes in bytes (default: {' '.join(map(str, SIZES))}).",
+    )
+    parser.add_argument(
+        "--content",
+        choices=list(CONTENT),
+        default="mixed",
+        help="Valid text between the malformed sequences: ASCII only, or mixed 1-4 byte "
+        "characters (default: mixed).",
+    )
+    parser.add_argument(
+        "--min-ms",
+        type=float,
+        default=20,
+        help="Minimum duration of a timed round; short calls are repeated (default: 20).",
+    )
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=1000,
+        help="Stop sweeping a case once one call takes longer than this (default: 1000).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Seconds without output before the device counts as hung (default: 60).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the results to this JSON file (default: {RESULTS_FILE}).",
+    )
+    return parser.parse_args()
+
+
+def case_label(r: dict) -> str:
+    """Row label of a case, e.g. "replace truncated 1%"."""
+    if not r["density"]:
+        return f"{r['handler']} valid"
+    return f"{r['handler']} {r['kind']} {r['density']:.1%}".replace(".0%", "%")
+
+
+def throughput(r: dict) -> float | None:
+    """Decoded MB/s of one point."""
+    return r["size"] / r["us"] if r.get("us") else None
+
+
+def run_bench(session: Session, cases: list[tuple], args) -> list[dict]:
+    """Run the cases on the device, printing each point as it arrives."""
+    records = []
+
+    def on_line(line: bytes):
+        tag, value = parse_line(line)
+        if tag == "R":
+            value["mb_s"] = throughput(value)
+            records.append(value)
+            if "error" in value:
+                result = value["error"]
+            else:
+                result = f"{value['mb_s']:.2f} MB/s, {value['bad']} malformed" + (
+                    " (raised)" if value.get("raised") else ""
+                )
+            print(f"  {case_label(value):<28} {value['size']:>6}  {result}")
+
+    session.exec_lines(BENCH, on_line)
+    err = session.exec_lines(
+        f"_all({cases!r}, {CONTENT[args.content]!r}, {args.sizes!r}, "
+        f"{args.min_ms * 1000:.0f}, {args.max_ms * 1000:.0f})",
+        on_line,
+        args.timeout,
+    )
+    if err:
+        lines = err.strip().splitlines()
+        print(f"  benchmark stopped: {lines[-1] if lines else err}")
+    return records
+
+
+def print_results(records: list[dict], sizes: list[int]):
+    """Print MB/s per case and size, and the allocation at the largest size reached."""
+    print("\n" + "=" * 70)
+    print("DECODE THROUGHPUT (MB/s)")
+    print("=" * 70)
+    rows = {}
+    for r in records:
+        rows.setdefault(case_label(r), {})[r["size"]] = r
+    print(f"{'case':<26}" + "".join(f" {size:>7}" for size in sizes) + f" {'alloc/B':>8}")
+    raised = clean = False
+    for label, points in rows.items():
+        if any(r.get("raised") for r in points.values()):
+            label, raised = label + " *", True
+        row = f"{label:<26}"
+        for size in sizes:
+            r = points.get(size)
+            if r is None:
+                row += f" {'':>7}"
+            elif "error" in r:
+                row += f" {'ERR':>7}"
+            elif r["density"] and not r.get("bad"):
+                row += f" {r['mb_s']:>6.2f}~"
+                clean = True
+            else:
+                row += f" {r['mb_s']:>7.2f}"
+        measured = [r for r in points.values() if r.get("alloc") is not None]
+        if measured:
+            largest = max(measured, key=lambda r: r["size"])
+            row += f" {largest['alloc'] / largest['size']:>8.2f}"
+        print(row)
+
+    if raised:
+        print("* raised UnicodeError: time to find the first malformed sequence")
+    if clean:
+        print("~ buffer too small to hold a malformed sequence at this density: valid input")
+
+    errors = {case_label(r): r["error"] for r in records if "error" in r}
+    if errors:
+        print("\n" + "-" * 70)
+        for label, error in errors.items():
+            print(f"ERROR {label}: {error}")
+
+
+def main():
+    args = parse_args()
+    args.sizes = sorted(args.sizes)
+    densities = [d for d in args.densities if d > 0]
+    if any(d > 1 for d in densities):
+        print("Error: densities are fractions between 0 and 1")
+        sys.exit(2)
+    cases = []
+    for handler in args.handlers:
+        cases.append((handler, "", 0))
+        cases += [(handler, kind, d) for kind in args.kinds for d in densities]
+
+    session, identity = open_session(args.target)
+    try:
+        print(f"Benchmarking {len(cases)} cases at {len(args.sizes)} sizes ({args.content})\n")
+        start = time.monotonic()
+        records = run_bench(session, cases, args)
+        elapsed = time.monotonic() - start
+    finally:
+        session.close()
+
+    print_results(records, args.sizes)
+    print(f"\n{len(records)} points in {elapsed:.1f}s")
+
+    meta = {
+        "target": args.target,
+        "identity": identity,
+        "content": args.content,
+        "sizes": args.sizes,
+        "min_ms": args.min_ms,
+    }
+    save_results(args.json, meta, points=records)
+
+
+if __name__ == "__main__":
+    main()
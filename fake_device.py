@@ -0,0 +1,915 @@
+#!/usr/bin/env python3
+"""
+Fake MicroPython device speaking the raw REPL protocol over a local TCP socket.
+
+A stand-in for a board or the unix port: it implements the friendly REPL
+(single lines), raw REPL, raw-paste mode and soft reset closely enough for
+mpremote, and runs the submitted code in CPython against an in-memory or
+host-directory filesystem exposed as the device's `os` module. Latency,
+serial throughput and Unicode faults can be injected, so the harness can be
+measured and run end to end (e.g. in CI) without hardware.
+
+Usage:
+    python fake_device.py --port 2218                      # In-memory filesystem
+    python fake_device.py --port 2218 --root ./device_fs   # Host directory as filesystem
+    python fake_device.py --port 2218 --latency 20 --baudrate 115200
+    python fake_device.py --port 2218 --fault outside-bmp=EINVAL --fault combining=nfd
+    python unicode_test.py -t socket://localhost:2218
+
+In-process (tests, benchmarks):
+    device = FakeDevice(port=0)
+    device.start()
+    run(f"socket://localhost:{device.port}")
+    device.stop()
+
+Faults are CLASS=ACTION. CLASS is one of nonascii, outside-bmp, combining,
+format, private-use, control, or literal characters (e.g. "'=EINVAL").
+ACTION is an errno name (path operations on matching paths fail with it),
+nfc/nfd/replace (created names are normalized or lossy, so lookups by the
+original name miss) or hang (the console stops responding when matching
+characters are printed).
+
+With --webrepl PASSWORD the REPL is served as WebREPL instead: a WebSocket
+handshake, the password prompt, then the same REPL in text frames.
+--decode-frames makes it decode every text frame on its own, the way a
+WebREPL that is not UTF-8 safe across frames would.
+"""
+
+import argparse
+import base64
+import builtins
+import errno
+import hashlib
+import io
+import posixpath
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+import types
+import unicodedata
+from pathlib import Path
+
+from unicode_props import (
+    COMBINING,
+    CONTROL,
+    FORMAT,
+    OUTSIDE_BMP,
+    PRIVATE_USE,
+    codepoints,
+    property_table,
+)
+
+RAW_REPL_BANNER = b"raw REPL; CTRL-B to exit\r\n>"
+FRIENDLY_BANNER = (
+    b"\r\nMicroPython v1.27.0 on fake; fake_device.py with CPython\r\n"
+    b'Type "help()" for more information.\r\n>>> '
+)
+PASTE_WINDOW = 256
+HEAP_SIZE = 192 * 1024
+
+# Fault classes by unicode_props flag bits; other CLASS values are literal characters
+FAULT_CLASSES = {
+    "outside-bmp": OUTSIDE_BMP,
+    "combining": COMBINING,
+    "format": FORMAT,
+    "private-use": PRIVATE_USE,
+    "control": CONTROL,
+}
+NAME_ACTIONS = ("nfc", "nfd", "replace")
+
+S_IFDIR = 0x4000
+S_IFREG = 0x8000
+
+# WebSocket (RFC 6455)
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_CONTINUATION, WS_TEXT, WS_BINARY, WS_CLOSE, WS_PING, WS_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+WEBREPL_CONNECTED = b"\r\nWebREPL connected\r\n>>> "
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fake MicroPython device (raw REPL over TCP) for running the harness without hardware",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python fake_device.py --port 2218
+    python fake_device.py --port 2218 --root ./device_fs
+    python fake_device.py --port 2218 --latency 20 --baudrate 115200
+    python fake_device.py --port 2218 --fault outside-bmp=EINVAL --fault "'=EINVAL" --fault format=hang
+    python fake_device.py --port 8266 --webrepl secret --decode-frames
+    python unicode_test.py --spawn "python fake_device.py --port {port}" --shards 8
+""",
+    )
+    parser.add_argument("--port", type=int, default=2218, help="TCP port (default: 2218).")
+    parser.add_argument(
+        "--root",
+        help="Host directory used as the device filesystem (default: in-memory, empty at start).",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="Milliseconds added before the response to every command (default: 0).",
+    )
+    parser.add_argument(
+        "--baudrate",
+        type=int,
+        default=0,
+        help="Throttle device output to this serial rate, 10 bits per byte (default: unlimited).",
+    )
+    parser.add_argument(
+        "--fault",
+        action="append",
+        default=[],
+        metavar="CLASS=ACTION",
+        help="Inject a Unicode fault, e.g. outside-bmp=EINVAL, combining=nfd, format=hang. "
+        "Repeatable.",
+    )
+    parser.add_argument(
+        "--webrepl",
+        metavar="PASSWORD",
+        help="Serve WebREPL (WebSocket with password prompt) instead of the plain socket REPL.",
+    )
+    parser.add_argument(
+        "--decode-frames",
+        action="store_true",
+        help="WebREPL fault: decode each text frame separately, so UTF-8 split across frames "
+        "is replaced with U+FFFD.",
+    )
+    return parser.parse_args()
+
+
+def parse_fault(spec: str) -> tuple:
+    """Parse CLASS=ACTION into (class flag bits or character set, action)."""
+    cls, sep, action = spec.rpartition("=")
+    if not sep or not cls:
+        raise ValueError(f"fault must be CLASS=ACTION, got {spec!r}")
+    if action not in NAME_ACTIONS and action != "hang" and not hasattr(errno, action):
+        raise ValueError(f"unknown fault action {action!r}")
+    if cls == "nonascii":
+        return None, action
+    return FAULT_CLASSES.get(cls, frozenset(cls)), action
+
+
+def matches(cls, text: str) -> bool:
+    """Whether text contains a character of a fault class."""
+    if cls is None:
+        return not text.isascii()
+    if isinstance(cls, frozenset):
+        return any(c in cls for c in text)
+    return any(flag & cls for flag in property_table().flags(codepoints(text)))
+
+
+def apply_name_fault(cls, action: str, name: str) -> str:
+    """Rewrite a created path the way a lossy or normalizing filesystem would."""
+    if action == "nfc" or action == "nfd":
+        return "".join(
+            unicodedata.normalize(action.upper(), c) if matches(cls, c) else c for c in name
+        )
+    return "".join("?" if matches(cls, c) else c for c in name)
+
+
+def ws_mask(payload: bytes, key: bytes) -> bytes:
+    """XOR payload with a 4-byte WebSocket masking key (masking and unmasking are the same)."""
+    n = len(payload)
+    key = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def ws_frame(payload: bytes, opcode: int = WS_TEXT) -> bytes:
+    """An unmasked, final WebSocket frame (server to client)."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 0x10000:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+def ws_parse(data: bytes):
+    """Split one frame off data: (fin, opcode, unmasked payload, rest), or None if incomplete."""
+    if len(data) < 2:
+        return None
+    fin, opcode = data[0] & 0x80, data[0] & 0x0F
+    masked, n = data[1] & 0x80, data[1] & 0x7F
+    offset = 2
+    if n == 126:
+        if len(data) < 4:
+            return None
+        (n,) = struct.unpack_from("!H", data, 2)
+        offset = 4
+    elif n == 127:
+        if len(data) < 10:
+            return None
+        (n,) = struct.unpack_from("!Q", data, 2)
+        offset = 10
+    mask = data[offset : offset + 4] if masked else b""
+    offset += len(mask)
+    if len(data) < offset + n:
+        return None
+    payload = data[offset : offset + n]
+    if mask:
+        payload = ws_mask(payload, mask)
+    return bool(fin), opcode, payload, data[offset + n :]
+
+
+class _MemoryFile(io.BytesIO):
+    """In-memory file that stores its contents back into the filesystem when closed."""
+
+    def __init__(self, fs: "MemoryFS", path: str, data: bytes, writable: bool):
+        super().__init__(data)
+        self.fs = fs
+        self.path = path
+        self.store = writable
+
+    def close(self):
+        if not self.closed and self.store:
+            self.fs.files[self.path] = self.getvalue()
+            self.fs.mtimes[self.path] = int(time.time())
+        super().close()
+
+
+class DeviceFS:
+    """Device filesystem: path handling and fault injection shared by both backends."""
+
+    def __init__(self, faults: list[tuple] = ()):
+        self.faults = list(faults)
+        self.cwd = "/"
+
+    def path(self, path: str, create: bool = False) -> str:
+        """Absolute normalized device path, after the faults for path operations."""
+        if not isinstance(path, str):
+            raise TypeError("can't convert to str implicitly")
+        path = posixpath.normpath(posixpath.join(self.cwd, path))
+        path = "/" + path.lstrip("/")
+        for cls, action in self.faults:
+            if action == "hang" or not matches(cls, path):
+                continue
+            if action in NAME_ACTIONS:
+                if create:
+                    path = apply_name_fault(cls, action, path)
+            else:
+                raise OSError(getattr(errno, action), "")
+        return path
+
+    def getcwd(self) -> str:
+        return self.cwd
+
+    def chdir(self, path: str):
+        path = self.path(path)
+        if not self.stat(path)[0] & S_IFDIR:
+            raise OSError(errno.ENOTDIR, "")
+        self.cwd = path
+
+    def listdir(self, path: str = "") -> list[str]:
+        return [entry[0] for entry in self.ilistdir(path)]
+
+    def os_module(self) -> types.ModuleType:
+        """The device's `os` module backed by this filesystem."""
+        module = types.ModuleType("os")
+        for name in (
+            "stat",
+            "mkdir",
+            "rmdir",
+            "remove",
+            "rename",
+            "listdir",
+            "ilistdir",
+            "getcwd",
+            "chdir",
+        ):
+            setattr(module, name, getattr(self, name))
+        module.unlink = self.remove
+        module.sep = "/"
+        module.sync = lambda: None
+        module.uname = lambda: ("fake", "fake", "1.27.0", "fake_device.py", "fake")
+        module.statvfs = lambda path: (4096, 4096, 1024, 1024, 1024, 0, 0, 0, 0, 255)
+        return module
+
+
+class MemoryFS(DeviceFS):
+    """Filesystem kept in memory: {path: bytes} plus a set of directories."""
+
+    def __init__(self, faults: list[tuple] = ()):
+        super().__init__(faults)
+        self.files = {}
+        self.mtimes = {}
+        self.dirs = {"/"}
+
+    def _parent_exists(self, path: str):
+        if posixpath.dirname(path) not in self.dirs:
+            raise OSError(errno.ENOENT, "")
+
+    def open(self, path, mode: str = "r", *args, **kwargs):
+        writing = any(m in mode for m in "wax+")
+        path = self.path(path, create=writing)
+        if path in self.dirs:
+            raise OSError(errno.EISDIR, "")
+        if "r" in mode and "+" not in mode:
+            if path not in self.files:
+                raise OSError(errno.ENOENT, "")
+            data = self.files[path]
+        else:
+            self._parent_exists(path)
+            data = self.files.get(path, b"") if "a" in mode or "+" in mode else b""
+            self.files[path] = data
+        f = _MemoryFile(self, path, data, writing)
+        if "a" in mode:
+            f.seek(0, io.SEEK_END)
+        if "b" in mode:
+            return f
+        return io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+    def stat(self, path: str) -> tuple:
+        path = self.path(path)
+        if path in self.dirs:
+            return (S_IFDIR, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        if path in self.files:
+            mtime = self.mtimes.get(path, 0)
+            return (S_IFREG, 0, 0, 0, 0, 0, len(self.files[path]), mtime, mtime, mtime)
+        raise OSError(errno.ENOENT, "")
+
+    def mkdir(self, path: str):
+        path = self.path(path, create=True)
+        if path in self.dirs or path in self.files:
+            raise OSError(errno.EEXIST, "")
+        self._parent_exists(path)
+        self.dirs.add(path)
+
+    def rmdir(self, path: str):
+        path = self.path(path)
+        if path not in self.dirs or path == "/":
+            raise OSError(errno.ENOENT if path not in self.dirs else errno.EACCES, "")
+        if any(posixpath.dirname(p) == path for p in [*self.dirs, *self.files]):
+            raise OSError(errno.EACCES, "")
+        self.dirs.discard(path)
+
+    def remove(self, path: str):
+        path = self.path(path)
+        if path not in self.files:
+            raise OSError(errno.EISDIR if path in self.dirs else errno.ENOENT, "")
+        del self.files[path]
+        self.mtimes.pop(path, None)
+
+    def rename(self, old: str, new: str):
+        old, new = self.path(old), self.path(new, create=True)
+        if old in self.files:
+            self._parent_exists(new)
+            self.files[new] = self.files.pop(old)
+            self.mtimes[new] = self.mtimes.pop(old, 0)
+        elif old in self.dirs:
+            prefix = old + "/"
+            self.dirs = {
+                new + d[len(old) :] if d == old or d.startswith(prefix) else d for d in self.dirs
+            }
+            moved = {p: new + p[len(old) :] for p in self.files if p.startswith(prefix)}
+            for p, dest in moved.items():
+                self.files[dest] = self.files.pop(p)
+                self.mtimes[dest] = self.mtimes.pop(p, 0)
+        else:
+            raise OSError(errno.ENOENT, "")
+
+    def ilistdir(self, path: str = ""):
+        path = self.path(path or self.cwd)
+        if path not in self.dirs:
+            raise OSError(errno.ENOENT, "")
+        entries = [
+            (posixpath.basename(d), S_IFDIR, 0, 0)
+            for d in self.dirs
+            if d != "/" and posixpath.dirname(d) == path
+        ]
+        entries += [
+            (posixpath.basename(p), S_IFREG, 0, len(data))
+            for p, data in self.files.items()
+            if posixpath.dirname(p) == path
+        ]
+        return iter(sorted(entries))
+
+
+class HostFS(DeviceFS):
+    """Filesystem stored in a host directory; device "/" is the root directory."""
+
+    def __init__(self, root: str, faults: list[tuple] = ()):
+        super().__init__(faults)
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def host(self, path: str, create: bool = False) -> Path:
+        host = (self.root / self.path(path, create).lstrip("/")).resolve()
+        if host != self.root and self.root not in host.parents:
+            raise OSError(errno.EACCES, "")
+        return host
+
+    def open(self, path, mode: str = "r", *args, **kwargs):
+        host = self.host(path, create=any(m in mode for m in "wax+"))
+        if "b" in mode:
+            return builtins.open(host, mode)
+        return builtins.open(host, mode, encoding="utf-8", newline="")
+
+    def stat(self, path: str) -> tuple:
+        st = self.host(path).stat()
+        mode = S_IFDIR if st.st_mode & 0o040000 else S_IFREG
+        size = 0 if mode == S_IFDIR else st.st_size
+        mtime = int(st.st_mtime)
+        return (mode, 0, 0, 0, 0, 0, size, mtime, mtime, mtime)
+
+    def mkdir(self, path: str):
+        self.host(path, create=True).mkdir()
+
+    def rmdir(self, path: str):
+        self.host(path).rmdir()
+
+    def remove(self, path: str):
+        self.host(path).unlink()
+
+    def rename(self, old: str, new: str):
+        self.host(old).rename(self.host(new, create=True))
+
+    def ilistdir(self, path: str = ""):
+        host = self.host(path or self.cwd)
+        entries = []
+        for entry in sorted(host.iterdir()):
+            if entry.is_dir():
+                entries.append((entry.name, S_IFDIR, 0, 0))
+            else:
+                entries.append((entry.name, S_IFREG, 0, entry.stat().st_size))
+        return iter(entries)
+
+
+class Implementation(tuple):
+    """sys.implementation with MicroPython's repr."""
+
+    def __new__(cls):
+        return super().__new__(cls, ("micropython", (1, 27, 0, ""), "fake device", 0))
+
+    name = property(lambda self: self[0])
+    version = property(lambda self: self[1])
+    _machine = property(lambda self: self[2])
+
+    def __repr__(self):
+        return "(name='micropython', version=(1, 27, 0, ''), _machine='fake device', _mpy=0)"
+
+
+class Interpreter:
+    """Runs submitted code in CPython with device modules; globals persist until soft reset."""
+
+    def __init__(self, fs: DeviceFS, write):
+        self.fs = fs
+        self.write = write  # Receives stdout text as it is printed
+        self.reset()
+
+    def reset(self):
+        """Soft reset: fresh globals and working directory."""
+        self.fs.cwd = "/"
+        device_builtins = dict(vars(builtins))
+        device_builtins.update(print=self.print, open=self.fs.open, __import__=self.import_)
+        self.globals = {"__name__": "__main__", "__builtins__": device_builtins}
+        self.modules = self.device_modules()
+
+    def device_modules(self) -> dict:
+        os_module = self.fs.os_module()
+
+        sys_module = types.ModuleType("sys")
+        sys_module.platform = "fake"
+        sys_module.version = "3.4.0; MicroPython v1.27.0 fake_device.py"
+        sys_module.implementation = Implementation()
+        sys_module.byteorder = "little"
+        sys_module.maxsize = 2**31 - 1
+        sys_module.argv = []
+        sys_module.path = ["", "/lib"]
+        sys_module.stdout = types.SimpleNamespace(write=self.write, buffer=None)
+        sys_module.stdout.buffer = types.SimpleNamespace(
+            write=lambda b: self.write(bytes(b).decode("utf-8", "replace"))
+        )
+        sys_module.print_exception = lambda e, file=None: (file or sys_module.stdout).write(
+            format_exception(e)
+        )
+
+        def exit(code=0):
+            raise SystemExit(code)
+
+        sys_module.exit = exit
+
+        gc_module = types.ModuleType("gc")
+        gc_module.collect = lambda: None
+        gc_module.enable = gc_module.disable = lambda: None
+        gc_module.mem_alloc = lambda: 0
+        gc_module.mem_free = lambda: HEAP_SIZE
+        gc_module.threshold = lambda *args: -1
+
+        micropython_module = types.ModuleType("micropython")
+        micropython_module.const = lambda value: value
+        micropython_module.opt_level = lambda *args: 0
+        micropython_module.mem_info = lambda *args: self.write(
+            f"stack: 0 out of 8192\nGC: total: {HEAP_SIZE}, used: 0, free: {HEAP_SIZE}\n"
+        )
+
+        return {
+            "os": os_module,
+            "uos": os_module,
+            "sys": sys_module,
+            "usys": sys_module,
+            "gc": gc_module,
+            "micropython": micropython_module,
+        }
+
+    def import_(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name in self.modules:
+            return self.modules[name]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def print(self, *args, sep=" ", end="\n", file=None):
+        (file or self).write(sep.join(str(arg) for arg in args) + end)
+
+    def run(self, source: bytes, echo: bool = False) -> str:
+        """Execute source, streaming its output; returns the traceback ("" if none).
+
+        With echo (friendly REPL lines), the repr of an expression's value is printed.
+        """
+        error = ""
+        text = source.decode("utf-8", "surrogateescape")
+        try:
+            try:
+                code = compile(text, "<stdin>", "eval" if echo else "exec")
+            except SyntaxError:
+                if not echo:
+                    raise
+                echo = False
+                code = compile(text, "<stdin>", "exec")
+            result = eval(code, self.globals)
+            if echo and result is not None:
+                self.print(repr(result))
+        except SystemExit:
+            pass
+        except BaseException as e:
+            error = format_exception(e)
+        return error
+
+
+def format_exception(e: BaseException) -> str:
+    """MicroPython-style traceback, with OSError rendered as [Errno N] ENAME."""
+    line = 1
+    if isinstance(e, SyntaxError):
+        line = e.lineno or 1
+    else:
+        for frame in traceback.extract_tb(e.__traceback__):
+            if frame.filename == "<stdin>":
+                line = frame.lineno
+    if isinstance(e, OSError) and e.errno:
+        name, message = "OSError", f"[Errno {e.errno}] {errno.errorcode.get(e.errno, e.errno)}"
+    elif isinstance(e, SyntaxError):
+        name, message = "SyntaxError", "invalid syntax"
+    else:
+        name, message = type(e).__name__, str(e)
+    text = "Traceback (most recent call last):\n"
+    text += f'  File "<stdin>", line {line}, in <module>\n'
+    return text + (f"{name}: {message}\n" if message else f"{name}\n")
+
+
+class DeviceConnection(socketserver.BaseRequestHandler):
+    """One client connection: REPL state machine over the socket."""
+
+    def setup(self):
+        # Replies are many small writes; don't let Nagle hold them back
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.device = self.server
+        self.interpreter = Interpreter(self.device.fs, self.send_output)
+        self.mode = "friendly" if self.device.webrepl is None else "password"
+        self.pending = b""  # Unparsed input
+        self.frames = b""  # Unparsed WebSocket input
+        self.password = bytearray()
+        self.buffer = bytearray()  # Code of the current raw REPL / raw-paste command
+        self.line = bytearray()  # Friendly REPL input line
+        self.window_remain = PASTE_WINDOW
+        self.hung = False
+
+    def send(self, data: bytes):
+        """Send device output, throttled to the configured baud rate."""
+        if self.hung:
+            return
+        try:
+            if not self.device.baudrate:
+                self.write(data)
+                return
+            step = max(1, self.device.baudrate // 100)  # ~10 ms of data per write
+            for i in range(0, len(data), step):
+                self.write(data[i : i + step])
+                time.sleep(len(data[i : i + step]) * 10 / self.device.baudrate)
+        except OSError:
+            # Host disconnected while code was still running: like a console nobody reads
+            self.hung = True
+
+    def write(self, data: bytes):
+        """Write to the socket, as a WebSocket text frame in WebREPL mode."""
+        self.request.sendall(data if self.device.webrepl is None else ws_frame(data))
+
+    def send_output(self, text: str):
+        """Send program output, cooked (LF -> CRLF) like a bare-metal port; may trigger a hang fault."""
+        for cls, action in self.device.faults:
+            if action == "hang" and matches(cls, text):
+                cut = next(i for i, c in enumerate(text) if matches(cls, c))
+                self.send(text[:cut].replace("\n", "\r\n").encode("utf-8", "surrogateescape"))
+                self.hung = True
+                return
+        self.send(text.replace("\n", "\r\n").encode("utf-8", "surrogateescape"))
+
+    def handle(self):
+        if self.device.webrepl is not None:
+            if not self.handshake():
+                return
+            self.send(b"Password: ")
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            if self.device.webrepl is not None:
+                data = self.unwrap(data)
+                if data is None:
+                    return
+            if self.hung:
+                continue  # A hung console drops all input
+            self.pending += data
+            self.process()
+
+    def handshake(self) -> bool:
+        """Answer the WebSocket upgrade request."""
+        request = b""
+        while b"\r\n\r\n" not in request:
+            try:
+                data = self.request.recv(4096)
+            except OSError:
+                return False
+            if not data:
+                return False
+            request += data
+        head, _, self.frames = request.partition(b"\r\n\r\n")
+        key = None
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            self.request.sendall(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+        self.request.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        return True
+
+    def unwrap(self, data: bytes) -> bytes | None:
+        """REPL input carried by the complete WebSocket frames received; None once closed."""
+        self.frames += data
+        out = b""
+        while True:
+            frame = ws_parse(self.frames)
+            if frame is None:
+                return out
+            _, opcode, payload, self.frames = frame
+            if opcode == WS_CLOSE:
+                self.request.sendall(ws_frame(payload[:2], WS_CLOSE))
+                return None
+            if opcode == WS_PING:
+                self.request.sendall(ws_frame(payload, WS_PONG))
+            elif opcode in (WS_TEXT, WS_CONTINUATION):
+                if self.device.decode_frames:
+                    payload = payload.decode("utf-8", "replace").encode("utf-8")
+                out += payload
+            # Binary frames carry WebREPL file transfers, which are not implemented
+
+    def process(self):
+        """Consume as much pending input as the current mode can handle."""
+        while self.pending and not self.hung:
+            if self.mode == "password":
+                consumed = self.password_input()
+            elif self.mode == "paste":
+                consumed = self.paste_input()
+            elif self.mode == "raw":
+                consumed = self.raw_input()
+            else:
+                consumed = self.friendly_input()
+            if not consumed:
+                return  # Need more bytes
+
+    def respond_delay(self):
+        if self.device.latency:
+            time.sleep(self.device.latency / 1000)
+
+    def execute(self, source: bytes):
+        """Run a raw REPL command and send stdout, EOF, stderr, EOF."""
+        self.respond_delay()
+        err = self.interpreter.run(source)
+        self.send(b"\x04")
+        self.send_output(err)
+        self.send(b"\x04")
+
+    def soft_reset(self):
+        self.interpreter.reset()
+        self.send(b"soft reboot\r\n")
+
+    def raw_input(self) -> int:
+        data = self.pending
+        # Plain code bytes up to the next control character
+        i = 0
+        while i < len(data) and data[i] > 0x05:
+            i += 1
+        if i:
+            self.buffer += data[:i]
+            self.pending = data[i:]
+            return i
+
+        c = data[0]
+        if c == 0x05:
+            if len(data) < 3:
+                return 0
+            self.pending = data[3:]
+            if data[1:3] == b"A\x01" and not self.buffer:
+                self.mode = "paste"
+                self.window_remain = PASTE_WINDOW
+                self.send(b"R\x01" + struct.pack("<H", PASTE_WINDOW))
+            else:
+                self.send(b"R\x00")
+            return 3
+
+        self.pending = data[1:]
+        if c == 0x01:  # ctrl-A: (re)enter raw REPL
+            self.buffer.clear()
+            self.send(RAW_REPL_BANNER)
+        elif c == 0x02:  # ctrl-B: friendly REPL
+            self.buffer.clear()
+            self.mode = "friendly"
+            self.send(FRIENDLY_BANNER)
+        elif c == 0x03:  # ctrl-C
+            self.buffer.clear()
+        elif c == 0x04:  # ctrl-D: run the command, or soft reset on an empty one
+            if self.buffer:
+                source = bytes(self.buffer)
+                self.buffer.clear()
+                self.send(b"OK")
+                self.execute(source)
+                self.send(b">")
+            else:
+                self.soft_reset()
+                self.send(RAW_REPL_BANNER)
+        else:
+            self.buffer.append(c)
+        return 1
+
+    def paste_input(self) -> int:
+        data = self.pending
+        end = data.find(b"\x04")
+        chunk = data if end < 0 else data[:end]
+        while chunk:
+            take = chunk[: self.window_remain]
+            self.buffer += take
+            chunk = chunk[len(take) :]
+            self.window_remain -= len(take)
+            if self.window_remain == 0:
+                # Window consumed: allow the host to send another one
+                self.window_remain = PASTE_WINDOW
+                self.send(b"\x01")
+        if end < 0:
+            self.pending = b""
+            return len(data)
+
+        self.pending = data[end + 1 :]
+        source = bytes(self.buffer)
+        self.buffer.clear()
+        self.mode = "raw"
+        self.send(b"\x04")  # Acknowledge end of data
+        self.execute(source)
+        self.send(b">")
+        return end + 1
+
+    def password_input(self) -> int:
+        c = self.pending[0]
+        self.pending = self.pending[1:]
+        if c not in (0x0A, 0x0D):
+            self.password.append(c)
+            return 1
+        if self.password.decode("utf-8", "replace") == self.device.webrepl:
+            self.mode = "friendly"
+            self.send(WEBREPL_CONNECTED)
+        else:
+            self.send(b"\r\nAccess denied\r\n")
+            self.hung = True
+            self.request.shutdown(socket.SHUT_RDWR)
+        return 1
+
+    def friendly_input(self) -> int:
+        c = self.pending[0]
+        self.pending = self.pending[1:]
+        if c == 0x01:
+            self.mode = "raw"
+            self.buffer.clear()
+            self.send(RAW_REPL_BANNER)
+        elif c == 0x03:
+            self.line.clear()
+            self.send(b"\r\n>>> ")
+        elif c == 0x04:
+            self.interpreter.reset()
+            self.send(b"MPY: soft reboot" + FRIENDLY_BANNER)
+        elif c == 0x0D:
+            source = bytes(self.line)
+            self.line.clear()
+            self.send(b"\r\n")
+            if source.strip():
+                self.respond_delay()
+                self.send_output(self.interpreter.run(source, echo=True))
+            self.send(b">>> ")
+        elif c in (0x08, 0x7F):
+            if self.line:
+                # Drop a whole UTF-8 character
+                del self.line[-1]
+                while self.line and self.line[-1] & 0xC0 == 0x80:
+                    del self.line[-1]
+                self.send(b"\x08\x1b[K")
+        elif c >= 0x20 or c == 0x09:
+            self.line.append(c)
+            self.send(bytes([c]))
+        return 1
+
+
+class FakeDevice(socketserver.ThreadingTCPServer):
+    """The fake device: a TCP server with one REPL per connection and a shared filesystem."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 2218,
+        root: str = None,
+        latency: float = 0,
+        baudrate: int = 0,
+        faults: list[str] = (),
+        webrepl: str = None,
+        decode_frames: bool = False,
+    ):
+        self.faults = [parse_fault(spec) for spec in faults]
+        self.webrepl = webrepl
+        self.decode_frames = decode_frames
+        self.fs = HostFS(root, self.faults) if root else MemoryFS(self.faults)
+        self.latency = latency
+        self.baudrate = baudrate
+        self.thread = None
+        super().__init__(("localhost", port), DeviceConnection)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeDevice":
+        """Serve in a background thread (in-process use)."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    args = parse_args()
+    try:
+        device = FakeDevice(
+            args.port,
+            args.root,
+            args.latency,
+            args.baudrate,
+            args.fault,
+            args.webrepl,
+            args.decode_frames,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    fs = f"host directory {args.root}" if args.root else "in-memory filesystem"
+    scheme = "socket" if args.webrepl is None else "ws"
+    print(f"Fake MicroPython device on {scheme}://localhost:{device.port} ({fs})")
+    for spec in args.fault:
+        print(f"  fault: {spec}")
+    if args.decode_frames:
+        print("  fault: text frames decoded separately")
+    try:
+        device.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.server_close()
+
+
+if __name__ == "__main__":
+    main()
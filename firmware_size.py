@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Firmware size tracker: text/data/bss per commit with per-symbol attribution.
+
+Reads a series of firmware ELF files, either given directly (oldest first) or
+found in a build directory of prebuilt ELFs for every commit of a git range,
+and writes the commit-by-commit size CSV of report/utf8-memory-impact-data.csv
+(sizes, deltas, cumulative growth, category summary, optimizations). It also
+diffs the ELF symbol tables of consecutive builds, so a +272-byte .text change
+is attributed to the functions and objects that grew, shrank, appeared or
+disappeared.
+
+Section sizes follow the Berkeley format of binutils `size`: allocated
+read-only sections count as text, allocated writable ones as data and
+allocated sections without contents as bss. The ELF files are parsed
+directly, so no toolchain is needed.
+
+Usage:
+    python firmware_size.py base.elf fix1.elf fix2.elf
+    python firmware_size.py --git-range b4aeb97a0d..461a24dc50 --repo ../micropython \\
+        --build-dir builds --elf-pattern "{commit}/micropython"
+    python firmware_size.py ... --annotations report/utf8-memory-impact-data.csv
+"""
+
+import argparse
+import csv
+import re
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+OUTPUT_FILE = "firmware_size.csv"
+SYMBOLS_FILE = "firmware_symbols.csv"
+ELF_PATTERN = "{commit}.elf"
+COMMIT_DIGITS = 10  # Abbreviated commit hashes, as in the report
+
+CSV_COLUMNS = [
+    "Commit",
+    "Number",
+    "Description",
+    "File",
+    "text",
+    "data",
+    "bss",
+    "total",
+    "Δtext",
+    "Δtotal",
+    "Cumulative",
+    "Category",
+    "Notes",
+]
+SECTIONS = ("text", "data", "bss")
+
+# ELF constants
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+STT_OBJECT = 1
+STT_FUNC = 2
+STT_FILE = 4
+SHN_LORESERVE = 0xFF00
+
+# Files that never change the firmware image
+NON_CODE_FILE = re.compile(r"^(tests|docs|examples)/|\.(md|rst|txt|py|exp)$")
+
+# Compiler-generated clone and counter suffixes (foo.constprop.0, CSWTCH.123)
+SYMBOL_SUFFIX = re.compile(r"(\.\d+)+$")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Track firmware text/data/bss across builds, with per-symbol size diffs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python firmware_size.py base.elf fix1.elf fix2.elf
+    python firmware_size.py base=build-old/firmware.elf fix=build-new/firmware.elf --top 20
+    python firmware_size.py --git-range b4aeb97a0d..461a24dc50 --repo ../micropython \\
+        --build-dir builds --elf-pattern "{commit}/micropython"
+    python firmware_size.py --git-range b4aeb97a0d..HEAD --repo ../micropython --build-dir builds \\
+        --annotations report/utf8-memory-impact-data.csv -o report/utf8-memory-impact-data.csv
+""",
+    )
+    parser.add_argument(
+        "elf",
+        nargs="*",
+        metavar="[LABEL=]ELF",
+        help="Firmware ELF files, oldest (baseline) first. LABEL defaults to the file name.",
+    )
+    parser.add_argument(
+        "--git-range",
+        metavar="BASE..HEAD",
+        help="Measure BASE and every commit after it up to HEAD, using prebuilt ELFs.",
+    )
+    parser.add_argument(
+        "--repo", default=".", help="Git repository of the firmware (default: current directory)."
+    )
+    parser.add_argument(
+        "--build-dir",
+        type=Path,
+        default=Path("."),
+        help="Directory with one prebuilt ELF per commit (default: current directory).",
+    )
+    parser.add_argument(
+        "--elf-pattern",
+        default=ELF_PATTERN,
+        help="Path of a commit's ELF under --build-dir; {commit} is the abbreviated hash, "
+        f"{{sha}} the full one (default: {ELF_PATTERN}).",
+    )
+    parser.add_argument(
+        "--annotations",
+        metavar="CSV",
+        help="Earlier size CSV (e.g. report/utf8-memory-impact-data.csv) whose Description, "
+        "Category and Notes per commit are carried over.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=OUTPUT_FILE,
+        help=f"Size CSV to write (default: {OUTPUT_FILE}).",
+    )
+    parser.add_argument(
+        "--symbols",
+        default=SYMBOLS_FILE,
+        metavar="CSV",
+        help=f"Per-symbol diff CSV to write (default: {SYMBOLS_FILE}).",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Symbols printed per changed build (default: 10).",
+    )
+    return parser.parse_args()
+
+
+class ElfFile:
+    """Section sizes and sized symbols of an ELF file (32/64-bit, either byte order)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        data = path.read_bytes()
+        if data[:4] != b"\x7fELF":
+            raise ValueError(f"{path}: not an ELF file")
+        self.is64 = data[4] == 2
+        self.endian = "<" if data[5] == 1 else ">"
+        self.sections = self._sections(data)
+        self.sizes = self._berkeley_sizes()
+        self.symbols = self._symbols(data)
+
+    def _unpack(self, fmt: str, data: bytes, offset: int) -> tuple:
+        return struct.unpack_from(self.endian + fmt, data, offset)
+
+    def _sections(self, data: bytes) -> list[dict]:
+        if self.is64:
+            (shoff,) = self._unpack("Q", data, 0x28)
+            shentsize, shnum, shstrndx = self._unpack("HHH", data, 0x3A)
+            fmt = "IIQQQQIIQQ"
+        else:
+            (shoff,) = self._unpack("I", data, 0x20)
+            shentsize, shnum, shstrndx = self._unpack("HHH", data, 0x2E)
+            fmt = "IIIIIIIIII"
+        sections = []
+        for i in range(shnum):
+            name, type_, flags, _, offset, size, link, _, _, entsize = self._unpack(
+                fmt, data, shoff + i * shentsize
+            )
+            sections.append(
+                {
+                    "name_offset": name,
+                    "type": type_,
+                    "flags": flags,
+                    "offset": offset,
+                    "size": size,
+                    "link": link,
+                    "entsize": entsize,
+                }
+            )
+        if sections and shstrndx < len(sections):
+            names = sections[shstrndx]
+            for section in sections:
+                start = names["offset"] + section["name_offset"]
+                section["name"] = data[start : data.index(b"\0", start)].decode("ascii", "replace")
+        return sections
+
+    @staticmethod
+    def section_class(section: dict) -> str:
+        """Section class of an allocated section as `size` counts it (text/data/bss), else ""."""
+        if not section["flags"] & SHF_ALLOC:
+            return ""
+        if not section["flags"] & SHF_WRITE:
+            return "text"
+        return "bss" if section["type"] == SHT_NOBITS else "data"
+
+    def _berkeley_sizes(self) -> dict[str, int]:
+        sizes = dict.fromkeys(SECTIONS, 0)
+        for section in self.sections:
+            cls = self.section_class(section)
+            if cls:
+                sizes[cls] += section["size"]
+        return sizes
+
+    def _symbols(self, data: bytes) -> dict[tuple[str, str], tuple[str, int]]:
+        """{(symbol, source file for locals): (section class, size)} of sized functions/objects."""
+        symbols = {}
+        for symtab in self.sections:
+            if symtab["type"] != SHT_SYMTAB:
+                continue
+            strtab = self.sections[symtab["link"]]["offset"]
+            fmt = "IBBHQQ" if self.is64 else "IIIBBH"
+            entsize = symtab["entsize"] or struct.calcsize(fmt)
+            source = ""
+            for offset in range(symtab["offset"], symtab["offset"] + symtab["size"], entsize):
+                if self.is64:
+                    name, info, _, shndx, _, size = self._unpack(fmt, data, offset)
+                else:
+                    name, _, size, info, _, shndx = self._unpack(fmt, data, offset)
+                start = strtab + name
+                text = data[start : data.index(b"\0", start)].decode("utf-8", "replace")
+                kind, local = info & 0xF, info >> 4 == 0
+                if kind == STT_FILE:
+                    source = text
+                    continue
+                if kind not in (STT_FUNC, STT_OBJECT) or not size or shndx >= SHN_LORESERVE:
+                    continue
+                cls = self.section_class(self.sections[shndx])
+                if not cls:
+                    continue
+                key = (SYMBOL_SUFFIX.sub("", text), source if local else "")
+                old = symbols.get(key, (cls, 0))[1]
+                symbols[key] = (cls, old + size)
+        return symbols
+
+
+def symbol_label(key: tuple[str, str]) -> str:
+    """Display name of a symbol key: "file.c:name" for file-local symbols."""
+    name, source = key
+    return f"{source}:{name}" if source else name
+
+
+def diff_symbols(old: ElfFile, new: ElfFile) -> list[tuple[str, str, int, int]]:
+    """Symbols whose size changed: (section class, label, old size, new size), largest first."""
+    changes = []
+    for key in old.symbols.keys() | new.symbols.keys():
+        cls, old_size = old.symbols.get(key, (None, 0))
+        new_cls, new_size = new.symbols.get(key, (cls, 0))
+        if old_size != new_size:
+            changes.append((new_cls or cls, symbol_label(key), old_size, new_size))
+    changes.sort(key=lambda c: (-abs(c[3] - c[2]), c[1]))
+    return changes
+
+
+def git(repo: str, *args) -> str:
+    """Output of a git command in repo."""
+    result = subprocess.run(
+        ["git", "-C", repo, *args], capture_output=True, text=True, encoding="utf-8"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout
+
+
+def main_file(repo: str, sha: str) -> str:
+    """The changed file with the most changed lines, preferring files that affect the build."""
+    files = []
+    for line in git(repo, "show", "--numstat", "--format=", sha).splitlines():
+        added, deleted, path = line.split("\t", 2)
+        changed = int(added) + int(deleted) if added != "-" else 0
+        files.append((not NON_CODE_FILE.search(path), changed, path))
+    if not files:
+        return ""
+    code = [f for f in files if f[0]]
+    if not code:
+        # Tests/docs only: report the common top-level directory, like "tests/"
+        return files[0][2].split("/", 1)[0] + "/" if "/" in files[0][2] else files[0][2]
+    return max(code)[2]
+
+
+def git_builds(args) -> list[dict]:
+    """Builds for BASE..HEAD: the base commit, then each commit up to HEAD (oldest first)."""
+    base, _, head = args.git_range.partition("..")
+    shas = [git(args.repo, "rev-parse", base).strip()]
+    shas += git(args.repo, "rev-list", "--reverse", f"{base}..{head or 'HEAD'}").split()
+    builds = []
+    for i, sha in enumerate(shas):
+        commit = sha[:COMMIT_DIGITS]
+        elf = args.build_dir / args.elf_pattern.format(commit=commit, sha=sha)
+        builds.append(
+            {
+                "commit": commit,
+                "number": "BASE" if i == 0 else str(len(shas) - i),  # Distance from HEAD
+                "description": git(args.repo, "log", "-1", "--format=%s", sha).strip(),
+                "file": "—" if i == 0 else main_file(args.repo, sha),
+                "elf": elf,
+            }
+        )
+    return builds
+
+
+def file_builds(specs: list[str]) -> list[dict]:
+    """Builds for ELF files given as [LABEL=]PATH, oldest first."""
+    builds = []
+    for i, spec in enumerate(specs):
+        label, sep, path = spec.partition("=")
+        if not sep:
+            label, path = Path(spec).stem, spec
+        builds.append(
+            {
+                "commit": label,
+                "number": "BASE" if i == 0 else str(len(specs) - i),
+                "description": "",
+                "file": "—" if i == 0 else "",
+                "elf": Path(path),
+            }
+        )
+    return builds
+
+
+def load_annotations(path: str) -> dict[str, dict]:
+    """Description/Category/Notes per commit from an earlier size CSV (main table only)."""
+    annotations = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["Commit"] == "SUMMARY":
+                break  # End of the main table
+            annotations[row["Commit"]] = row
+    return annotations
+
+
+def categorize(build: dict, delta: int) -> str:
+    """Default category when no annotation gives one."""
+    if build["number"] == "BASE":
+        return "baseline"
+    if build["file"].endswith("/") or NON_CODE_FILE.search(build["file"] or ""):
+        return "test" if delta == 0 else "other"
+    return "config" if delta == 0 and build["file"].endswith(".h") else "code"
+
+
+def measure(builds: list[dict], annotations: dict) -> list[dict]:
+    """Load each build's ELF and fill in sizes, deltas and annotations; drops missing builds."""
+    rows = []
+    previous = None
+    for build in builds:
+        try:
+            elf = ElfFile(build["elf"])
+        except (OSError, ValueError) as e:
+            print(f"  skipping {build['commit']}: {e}")
+            continue
+        sizes = elf.sizes
+        total = sum(sizes.values())
+        prev_sizes = previous["elf"].sizes if previous else sizes
+        base_total = rows[0]["total"] if rows else total
+        row = dict(build, elf=elf, **sizes, total=total)
+        row["dtext"] = sizes["text"] - prev_sizes["text"]
+        row["dtotal"] = total - sum(prev_sizes.values())
+        row["cumulative"] = total - base_total
+        note = annotations.get(build["commit"], {})
+        row["description"] = note.get("Description") or build["description"]
+        row["category"] = note.get("Category") or categorize(build, row["dtotal"])
+        row["notes"] = note.get("Notes", "")
+        row["changes"] = diff_symbols(previous["elf"], elf) if previous else []
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def write_csv(rows: list[dict], path: str):
+    """Write the size table, category summary and optimizations in the report's layout."""
+    width = len(CSV_COLUMNS)
+
+    def pad(values: list) -> list:
+        return list(values) + [""] * (width - len(values))
+
+    base_total = rows[0]["total"]
+    changes = rows[1:]
+    net = rows[-1]["cumulative"]
+    categories = {}
+    for row in changes:
+        count, size = categories.get(row["category"], (0, 0))
+        categories[row["category"]] = (count + 1, size + row["dtotal"])
+    savings = [row for row in changes if row["dtotal"] < 0]
+
+    def share(size: int, whole: int, digits: int = 1) -> str:
+        return f"{size / whole:.{digits}%}" if size and whole else "0%"
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            writer.writerow(
+                [
+                    row["commit"],
+                    row["number"],
+                    row["description"],
+                    row["file"],
+                    row["text"],
+                    row["data"],
+                    row["bss"],
+                    row["total"],
+                    row["dtext"],
+                    row["dtotal"],
+                    row["cumulative"],
+                    row["category"],
+                    row["notes"],
+                ]
+            )
+        writer.writerow([])
+        writer.writerow(pad(["SUMMARY"]))
+        writer.writerow(pad(["Category", "Commits", "Total Bytes", "% of Changes", "% of Base"]))
+        for category, (count, size) in categories.items():
+            writer.writerow(
+                pad([category, count, size, share(size, net), share(size, base_total, 3)])
+            )
+        writer.writerow(pad(["TOTAL", len(changes), net, "100%", share(net, base_total, 3)]))
+        if savings:
+            writer.writerow([])
+            writer.writerow(pad(["OPTIMIZATIONS"]))
+            writer.writerow(pad(["Commit", "Description", "Savings", "Technique"]))
+            for row in savings:
+                writer.writerow(
+                    pad([row["commit"], row["description"], row["dtotal"], row["notes"]])
+                )
+            saved = -sum(row["dtotal"] for row in savings)
+            writer.writerow(pad(["TOTAL", "", saved]))
+
+
+def write_symbols(rows: list[dict], path: str):
+    """Write every per-symbol size change, one row per symbol and build."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Commit", "Section", "Symbol", "Old", "New", "Δ"])
+        for row in rows:
+            for cls, label, old, new in row["changes"]:
+                writer.writerow([row["commit"], cls, label, old, new, new - old])
+
+
+def print_report(rows: list[dict], top: int):
+    """Print the size table and the symbols behind each change."""
+    print("=" * 70)
+    print("FIRMWARE SIZE")
+    print("=" * 70)
+    print(
+        f"{'commit':<12} {'#':>4} {'text':>9} {'data':>7} {'bss':>7} {'Δtotal':>7} {'cum':>7}  file"
+    )
+    for row in rows:
+        print(
+            f"{row['commit'][:12]:<12} {row['number']:>4} {row['text']:>9} {row['data']:>7} "
+            f"{row['bss']:>7} {row['dtotal']:>+7} {row['cumulative']:>+7}  {row['file']}"
+        )
+
+    for previous, row in zip(rows, rows[1:]):
+        if not row["changes"] and not row["dtotal"]:
+            continue
+        print("\n" + "-" * 70)
+        print(f"{row['commit']} {row['description'][:50]}")
+        print(f"  Δtext {row['dtext']:+}, Δtotal {row['dtotal']:+}")
+        for section in SECTIONS:
+            attributed = sum(new - old for cls, _, old, new in row["changes"] if cls == section)
+            other = row[section] - previous[section] - attributed
+            if attributed or other:
+                print(
+                    f"  .{section}: {attributed:+} in symbols"
+                    + (f", {other:+} padding/unnamed" if other else "")
+                )
+        for cls, label, old, new in row["changes"][:top]:
+            status = "new" if not old else "removed" if not new else f"{old} -> {new}"
+            print(f"    {new - old:>+6}  {cls:<4}  {label}  ({status})")
+        if len(row["changes"]) > top:
+            print(f"    ... and {len(row['changes']) - top} more (see symbols CSV)")
+
+
+def main():
+    args = parse_args()
+    if bool(args.git_range) == bool(args.elf):
+        print("Error: give either ELF files or --git-range")
+        sys.exit(2)
+
+    try:
+        builds = git_builds(args) if args.git_range else file_builds(args.elf)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    annotations = load_annotations(args.annotations) if args.annotations else {}
+
+    rows = measure(builds, annotations)
+    if len(rows) < 2:
+        print("Need at least two readable ELF files")
+        sys.exit(1)
+    if not rows[0]["elf"].symbols:
+        print("Note: no symbol table in the baseline ELF (stripped?), per-symbol diff unavailable")
+
+    print_report(rows, args.top)
+    write_csv(rows, args.output)
+    write_symbols(rows, args.symbols)
+    print(f"\nSize table saved to: {args.output}")
+    print(f"Symbol diff saved to: {args.symbols}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Heap allocation profile of the Unicode string operations behind the issue reproducers.
+
+The reproducers in test_scripts/ check that str.center(), %c and format(),
+bytes.decode() error handlers, exception messages and os.listdir() give the
+right answer for non-ASCII text. This profiles what those operations cost at
+runtime: each one is called repeatedly on the device with ASCII input and with
+input made of 2-, 3- and 4-byte UTF-8 characters, and gc.mem_alloc() is
+sampled around every call. The operations are stand-ins written for profiling,
+not the reproducer scripts themselves: each is tagged with the issue whose
+reproducer (REPRODUCERS) exercises it. issue_runner.py reports the heap used
+and retained by each actual reproducer. Reported per operation and input width:
+
+    bytes/call      heap allocated per call (calls that ran into a collection excluded)
+    gc/call         collections per call (gc.mem_alloc() dropped during the call)
+    max free        largest free heap block after the run, from micropython.mem_info()
+
+Usage:
+    python heap_profile.py -t COM27
+    python heap_profile.py -t socket://localhost:2218 17827 decode
+    python heap_profile.py -t COM27 --threshold 4096 --calls 200
+"""
+
+import argparse
+import re
+import sys
+import time
+
+from mpsession import CLEANUP_SCRIPT, WIDTHS, Session, open_session, parse_line, save_results
+
+RESULTS_FILE = "heap_profile.json"
+DEVICE_DIR = "/_heap_profile"
+
+# Reproducer in test_scripts/ of each issue the operations stand in for
+REPRODUCERS = {
+    "3364": "test_scripts/3364_single_char_formatting.py",
+    "3469": "test_scripts/3469_bytes_decode_ignore.py",
+    "8300": "test_scripts/8300_listdir_non_ascii.py",
+    "13084": "test_scripts/13084_formatting_char_128.py",
+    "15849": "test_scripts/15849_bytes_decode_codec.py",
+    "17827": "test_scripts/17827_str_center_unicode.py",
+    "17855": "test_scripts/17855_exception_utf_code.py",
+}
+
+# (issue, operation, expression) profiled per width. Expressions see s (str of
+# --length characters), b (s as UTF-8), bad (b with an invalid byte every 8
+# characters), c (a code point), f (a fill character) and d (a directory with
+# files named in that width).
+OPERATIONS = [
+    ("17827", "str.center", "s.center(len(s) * 2, f)"),
+    ("3364", "%c", "'%c' % c"),
+    ("13084", "%c join", "''.join(['%c' % c] * 8)"),
+    ("13084", "str.format", "'{:^{}}|{}'.format(s, len(s) * 2, s)"),
+    ("13084", "%s", "'<%s>' % s"),
+    ("15849", "decode strict", "b.decode('utf-8')"),
+    ("3469", "decode ignore", "bad.decode('utf-8', 'ignore')"),
+    ("3469", "decode replace", "bad.decode('utf-8', 'replace')"),
+    ("15849", "str.encode", "s.encode('utf-8')"),
+    ("17827", "index", "s[len(s) // 2]"),
+    ("17827", "slice", "s[1:-1]"),
+    ("17855", "exception", "str(ValueError(s))"),
+    ("8300", "os.listdir", "os.listdir(d)"),
+]
+
+# On-device profiler. _case() builds the inputs of one width, calls the operation
+# once to warm up (interning, lazy init), then measures each of n calls on its own.
+PROFILER = """\
+import gc, os
+try:
+ from micropython import mem_info
+except ImportError:
+ mem_info = None
+def _emit(tag, v):
+ print('\\x1e' + tag, repr(v))
+def _inputs(w, base, n):
+ s = ''.join([chr(base + i % 16) for i in range(n)])
+ b = s.encode()
+ bad = b'\\xff'.join([c.encode() for c in [s[i:i + 8] for i in range(0, n, 8)]])
+ d = {0!r} + '/' + w
+ try:
+  os.mkdir(d)
+  for i in range(4):
+   with open(d + '/' + chr(base + i) * 4 + '.txt', 'w') as fh:
+    fh.write('x')
+ except OSError:
+  pass
+ return {{'s': s, 'b': b, 'bad': bad, 'c': base + 1, 'f': chr(base + 15), 'd': d, 'os': os}}
+def _measure(fn, n):
+ fn()
+ gc.collect()
+ total = calls = colls = peak = 0
+ for i in range(n):
+  a = gc.mem_alloc()
+  fn()
+  a = gc.mem_alloc() - a
+  if a < 0:
+   colls += 1
+  else:
+   total += a
+   calls += 1
+   peak = max(peak, a)
+ return total, calls, colls, peak
+def _noop():
+ pass
+def _case(op, expr, w, base, length, n):
+ env = _inputs(w, base, length)
+ r = {{'op': op, 'width': w, 'calls': n, 'error': ''}}
+ fn = None
+ try:
+  fn = eval('lambda: ' + expr, env)
+  total, calls, colls, peak = _measure(fn, n)
+  r['bytes'] = total // calls if calls else None
+  r['peak'] = peak
+  r['gc'] = colls
+ except Exception as e:
+  r['error'] = type(e).__name__ + ': ' + str(e)
+ env = fn = None
+ gc.collect()
+ r['free'] = gc.mem_free()
+ _emit('R', r)
+ if mem_info:
+  mem_info()
+def _all(cases, length, n, threshold):
+ try:
+  os.mkdir({0!r})
+ except OSError:
+  pass
+ if threshold:
+  gc.threshold(threshold)
+ base = _measure(_noop, n)
+ _emit('B', base[0] // base[1] if base[1] else 0)
+ for op, expr, w, b in cases:
+  _case(op, expr, w, b, length, n)
+ if threshold:
+  gc.threshold(-1)
+ _emit('E', len(cases))
+""".format(DEVICE_DIR)
+
+# micropython.mem_info() lines after each record, e.g. "GC: total: 2072832, used: 4480, ..."
+MEM_INFO_FIELD = re.compile(r"(used|free|max free sz): (\d+)")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Profile heap allocation of Unicode string operations on a device",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python heap_profile.py -t COM27
+    python heap_profile.py -t socket://localhost:2218 17827 3469
+    python heap_profile.py -t COM27 decode format --length 64
+    python heap_profile.py -t /dev/ttyACM0 --threshold 4096 --calls 200
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        default="auto",
+        help="Target connection (default: auto), e.g. COM27, /dev/ttyUSB0, socket://localhost:2218.",
+    )
+    parser.add_argument(
+        "ops",
+        nargs="*",
+        metavar="FILTER",
+        help="Only profile operations whose issue number starts with, or whose name contains, "
+        "one of these. Default: all.",
+    )
+    parser.add_argument(
+        "--widths",
+        nargs="+",
+        choices=list(WIDTHS),
+        default=list(WIDTHS),
+        help="Input widths to compare (default: all).",
+    )
+    parser.add_argument(
+        "--length",
+        type=int,
+        default=32,
+        help="Characters per input string (default: 32).",
+    )
+    parser.add_argument(
+        "--calls",
+        type=int,
+        default=50,
+        help="Measured calls per operation and width (default: 50).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=0,
+        metavar="BYTES",
+        help="Set gc.threshold() while profiling, so collections happen as often as on a "
+        "board with a small heap (default: off).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Seconds without output before the device counts as hung (default: 60).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the results to this JSON file (default: {RESULTS_FILE}).",
+    )
+    return parser.parse_args()
+
+
+def select_operations(filters: list[str]) -> list[tuple[str, str, str]]:
+    """Operations matching any filter (issue number prefix or part of the name)."""
+    if not filters:
+        return OPERATIONS
+    return [
+        op
+        for op in OPERATIONS
+        if any(op[0].startswith(f) or f.lower() in op[1].lower() for f in filters)
+    ]
+
+
+def profile(session: Session, cases: list[tuple], args) -> tuple[list[dict], int]:
+    """Run the cases on the device. Returns (records, per-call overhead of the loop in bytes)."""
+    records = []
+    overhead = 0
+
+    def on_line(line: bytes):
+        nonlocal overhead
+        tag, value = parse_line(line)
+        if tag == "B":
+            overhead = value
+        elif tag == "R":
+            records.append(value)
+            print(f"  {value['op']:<16} {value['width']:<7} " + (value["error"] or "ok"))
+        elif tag is None and records:
+            # mem_info() output of the case just reported
+            for name, number in MEM_INFO_FIELD.findall(value):
+                records[-1]["max_free" if name == "max free sz" else f"gc_{name}"] = int(number)
+
+    session.exec_lines(PROFILER, on_line)
+    err = session.exec_lines(
+        f"_all({cases!r}, {args.length}, {args.calls}, {args.threshold})", on_line, args.timeout
+    )
+    if err:
+        lines = err.strip().splitlines()
+        print(f"  profiler stopped: {lines[-1] if lines else err}")
+    for r in records:
+        if r.get("bytes") is not None:
+            r["bytes"] = max(r["bytes"] - overhead, 0)
+    return records, overhead
+
+
+def print_results(operations: list[tuple], records: list[dict], widths: list[str], calls: int):
+    """Print bytes/call and gc/call per operation, one column per input width,
+    and the reproducers the operations stand in for."""
+    print("\n" + "=" * 70)
+    print("HEAP PER CALL (bytes, collections per call)")
+    print("=" * 70)
+    by_op = {}
+    for r in records:
+        by_op.setdefault(r["op"], {})[r["width"]] = r
+    print(f"{'operation':<16}" + "".join(f" {w:>12}" for w in widths) + f" {'4B/ascii':>9}")
+    for op, cells in by_op.items():
+        row = f"{op:<16}"
+        for w in widths:
+            r = cells.get(w)
+            if r is None:
+                row += f" {'':>12}"
+            elif r["error"] or r.get("bytes") is None:
+                row += f" {'ERR':>12}"
+            else:
+                colls = f"/{r['gc'] / calls:.2f}" if r["gc"] else ""
+                row += f" {str(r['bytes']) + colls:>12}"
+        ascii_, wide = cells.get("ascii", {}).get("bytes"), cells.get("4-byte", {}).get("bytes")
+        row += f" {wide / ascii_:>8.1f}x" if ascii_ and wide is not None else f" {'-':>9}"
+        print(row)
+
+    print("\nStand-ins for the reproducers:")
+    for issue in sorted({issue for issue, _, _ in operations}, key=int):
+        ops = ", ".join(op for i, op, _ in operations if i == issue)
+        print(f"  {REPRODUCERS[issue]:<46} {ops}")
+
+    errors = [r for r in records if r["error"]]
+    if errors:
+        print("\n" + "-" * 70)
+        for r in errors:
+            print(f"{r['op']} ({r['width']}): {r['error']}")
+
+
+def main():
+    args = parse_args()
+    operations = select_operations(args.ops)
+    if not operations:
+        print(f"No operations match {' '.join(args.ops)}")
+        sys.exit(1)
+    cases = [(op, expr, w, WIDTHS[w]) for _, op, expr in operations for w in args.widths]
+
+    session, identity = open_session(args.target)
+    try:
+        print(
+            f"Profiling {len(operations)} operations x {len(args.widths)} widths, "
+            f"{args.calls} calls each on {args.length}-character input\n"
+        )
+        start = time.monotonic()
+        records, overhead = profile(session, cases, args)
+        elapsed = time.monotonic() - start
+        session.run("exec", CLEANUP_SCRIPT.format(DEVICE_DIR))
+    finally:
+        session.close()
+
+    print_results(operations, records, args.widths, args.calls)
+    print(f"\n{len(records)} cases in {elapsed:.1f}s (loop overhead {overhead} bytes/call)")
+
+    meta = {
+        "target": args.target,
+        "identity": identity,
+        "length": args.length,
+        "calls": args.calls,
+        "threshold": args.threshold,
+        "overhead": overhead,
+    }
+    issues = {op: issue for issue, op, _ in operations}
+    reproducers = {issue: REPRODUCERS[issue] for issue in sorted(set(issues.values()), key=int)}
+    save_results(args.json, meta, issues=issues, reproducers=reproducers, cases=records)
+
+
+if __name__ == "__main__":
+    main()
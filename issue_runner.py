@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Run the issue reproducers in test_scripts/ on a device over a single session.
+
+Uploads the scripts once, then a small on-device runner executes each in its
+own namespace (with a gc.collect() before and after) and streams one compact
+record per script back: verdict counts from the script's PASS/FAIL/NOTE
+lines, run time, heap use and any uncaught exception. The host parses those
+records instead of scraping the printed text, so a full regression pass costs
+one connection instead of one `mpremote run` per script. If a script takes the
+device down, the runner reconnects and carries on with the next one.
+
+Usage:
+    python issue_runner.py                                  # Auto-detect, all reproducers
+    python issue_runner.py -t socket://localhost:2218
+    python issue_runner.py -t COM27 17827 3469              # Scripts whose name starts with these
+    python issue_runner.py -t COM27 -v                      # Also show every output line
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from mpsession import CLEANUP_SCRIPT, MARK, Session, open_session, parse_line, save_results
+
+SCRIPT_DIR = Path("test_scripts")
+DEVICE_DIR = "/_issue_scripts"
+RESULTS_FILE = "issue_results.json"
+
+# Reproducers are named <issue number>_<topic>.py; helpers such as mount_sd_m5.py are skipped
+SCRIPT_PATTERN = re.compile(r"^\d+_\w+\.py$")
+
+# Runner output lines are MARK, a tag and a repr:
+# S <name> (script starts), O <line> (script output, -v only), R <record>, E <count>
+
+# On-device runner. _all() runs the scripts one by one; output printed by a script
+# is captured through a `print` in its namespace and classified by its first word.
+RUNNER = """\
+import gc, os
+try:
+ from time import ticks_ms, ticks_diff
+except ImportError:
+ from time import time
+ ticks_ms = lambda: int(time() * 1000)
+ ticks_diff = lambda a, b: a - b
+_V = {'PASS': 'pass', 'CORRECT': 'pass', 'FAIL': 'fail', 'ERROR': 'fail', 'NOTE': 'note'}
+def _emit(tag, v):
+ print('\\x1e' + tag, repr(v))
+class _Out:
+ def __init__(s, verbose):
+  s.verbose = verbose
+  s.part = ''
+  s.n = {'pass': 0, 'fail': 0, 'note': 0}
+  s.lines = []
+ def line(s, t):
+  k = _V.get(t.lstrip().split(' ', 1)[0].rstrip(':'))
+  if k:
+   s.n[k] += 1
+   if k != 'pass' and len(s.lines) < 8:
+    s.lines.append(t.strip()[:120])
+  if s.verbose:
+   _emit('O', t)
+ def write(s, t):
+  parts = (s.part + t).split('\\n')
+  s.part = parts.pop()
+  for t in parts:
+   s.line(t)
+def _run(name, verbose):
+ out = _Out(verbose)
+ def p(*a, sep=' ', end='\\n', file=None):
+  if file is None:
+   out.write(sep.join([str(x) for x in a]) + end)
+  else:
+   print(*a, sep=sep, end=end, file=file)
+ ns = {'__name__': '__main__', '__file__': name, 'print': p}
+ exc = ''
+ gc.collect()
+ free = gc.mem_free()
+ t = ticks_ms()
+ try:
+  with open(name) as f:
+   src = f.read()
+  exec(src, ns)
+ except SystemExit:
+  pass
+ except KeyboardInterrupt:
+  raise
+ except BaseException as e:
+  exc = type(e).__name__ + ': ' + str(e)
+ ms = ticks_diff(ticks_ms(), t)
+ if out.part:
+  out.line(out.part)
+ heap = free - gc.mem_free()
+ src = None
+ ns.clear()
+ gc.collect()
+ n = out.n
+ _emit('R', {'name': name, 'status': 'error' if exc else 'fail' if n['fail'] else 'pass' if n['pass'] else 'info',
+  'pass': n['pass'], 'fail': n['fail'], 'note': n['note'], 'ms': ms, 'heap': heap,
+  'retained': free - gc.mem_free(), 'exc': exc[:200], 'lines': out.lines})
+def _all(d, names, verbose):
+ os.chdir(d)
+ for name in names:
+  _emit('S', name)
+  _run(name, verbose)
+ _emit('E', len(names))
+"""
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run the test_scripts issue reproducers on a device in one session",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python issue_runner.py -t COM27
+    python issue_runner.py -t socket://localhost:2218 17827 15849 8300
+    python issue_runner.py -t /dev/ttyACM0 -v --timeout 60
+    python issue_runner.py -t COM27 --json esp32_issues.json
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        default="auto",
+        help="Target connection (default: auto), e.g. COM27, /dev/ttyUSB0, socket://localhost:2218.",
+    )
+    parser.add_argument(
+        "scripts",
+        nargs="*",
+        metavar="PREFIX",
+        help="Only run reproducers whose file name starts with one of these (e.g. an issue "
+        "number). Default: all.",
+    )
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default=SCRIPT_DIR,
+        help=f"Directory with the reproducers (default: {SCRIPT_DIR}).",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Stream every line the scripts print, not just the results.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Seconds a script may run without output before the device counts as hung "
+        "(default: 30).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the per-script records to this JSON file (default: {RESULTS_FILE}).",
+    )
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help=f"Leave the uploaded scripts in {DEVICE_DIR} on the device.",
+    )
+    return parser.parse_args()
+
+
+def collect_scripts(directory: Path, prefixes: list[str]) -> list[Path]:
+    """Reproducer scripts in directory, optionally filtered by name prefix."""
+    scripts = sorted(
+        (p for p in directory.iterdir() if SCRIPT_PATTERN.match(p.name)),
+        key=lambda p: int(p.name.split("_", 1)[0]),
+    )
+    if prefixes:
+        scripts = [p for p in scripts if p.name.startswith(tuple(prefixes))]
+    return scripts
+
+
+def upload(session: Session, scripts: list[Path]) -> list[Path]:
+    """Copy the scripts to DEVICE_DIR in batched writes. Returns the scripts that were written."""
+    files = [(f"{DEVICE_DIR}/{p.name}", p.read_bytes()) for p in scripts]
+    results = session.bulk_put([DEVICE_DIR], files)
+    uploaded = []
+    for script, err in zip(scripts, results):
+        if err:
+            print(f"  upload failed: {script.name}: {err}")
+        else:
+            uploaded.append(script)
+    return uploaded
+
+
+def crash_record(name: str, reason: str, status: str = "crash") -> dict:
+    """Record of a script that did not report back (device crashed, hung or reset)."""
+    return {
+        "name": name,
+        "status": status,
+        "pass": 0,
+        "fail": 0,
+        "note": 0,
+        "ms": None,
+        "heap": None,
+        "retained": None,
+        "exc": reason[:200],
+        "lines": [],
+    }
+
+
+def run_scripts(
+    session: Session, names: list[str], verbose: bool, timeout: float
+) -> tuple[dict, int]:
+    """Run the uploaded scripts, reconnecting after a crash.
+
+    Returns ({name: record}, number of connections used).
+    """
+    from mpremote.transport import TransportError
+
+    results = {}
+    connections = 1
+    passes = recorded = 0
+    while True:
+        pending = [name for name in names if name not in results]
+        if not pending:
+            break
+        if passes and len(results) == recorded:
+            # The last pass recorded nothing, so another one would not either
+            for name in pending:
+                results[name] = crash_record(name, "no result record", "error")
+            break
+        passes, recorded = passes + 1, len(results)
+        current = None
+
+        def on_line(line: bytes):
+            nonlocal current
+            tag, value = parse_line(line)
+            if tag == "S":
+                current = value
+                print(f"[{len(results) + 1:3}/{len(names)}] {value}", end="\n" if verbose else " ")
+                sys.stdout.flush()
+            elif tag == "R":
+                results[value["name"]] = value
+                current = None
+                print(
+                    ("      = " if verbose else "")
+                    + value["status"].upper()
+                    + (f" ({value['exc']})" if value["exc"] else "")
+                )
+            elif tag is None and value.startswith(MARK + "R") and current:
+                # Unparseable result (e.g. cut short): count it rather than rerun the script
+                results[current] = crash_record(current, "unreadable result record", "error")
+                current = None
+                print(("      = " if verbose else "") + "ERROR (unreadable result record)")
+            elif tag == "O" or (verbose and tag is None and value):
+                print(f"      | {value}")
+
+        try:
+            if session.transport is None:
+                connections += 1  # Reopened (with a soft reset) after a crash
+            session.exec_lines(RUNNER, on_line)
+            err = session.exec_lines(
+                f"_all({DEVICE_DIR!r}, {pending!r}, {verbose})", on_line, timeout
+            )
+            if err:
+                # The runner itself was interrupted (e.g. MemoryError outside a script)
+                name = current or pending[0]
+                lines = err.strip().splitlines()
+                results[name] = crash_record(name, lines[-1] if lines else err)
+                print(("      = " if verbose else "") + f"CRASH ({results[name]['exc']})")
+        except TransportError as e:
+            session.drop()
+            name = current or pending[0]
+            results[name] = crash_record(name, f"device lost: {e}")
+            print(("      = " if verbose else "") + f"CRASH (device lost: {e})")
+
+    return results, connections
+
+
+def print_results(records: list[dict]):
+    """Print the per-script table and the lines behind each failure."""
+    print("\n" + "=" * 70)
+    print("ISSUE REPRODUCERS")
+    print("=" * 70)
+    print(
+        f"{'script':<36} {'status':<7} {'pass':>4} {'fail':>4} {'note':>4} {'ms':>7} {'heap':>8}"
+    )
+    for r in records:
+        ms = "-" if r["ms"] is None else r["ms"]
+        heap = "-" if r["heap"] is None else r["heap"]
+        print(
+            f"{r['name'][:36]:<36} {r['status']:<7} {r['pass']:>4} {r['fail']:>4} {r['note']:>4} "
+            f"{ms:>7} {heap:>8}"
+        )
+
+    problems = [r for r in records if r["status"] in ("fail", "error", "crash")]
+    if problems:
+        print("\n" + "-" * 70)
+        for r in problems:
+            print(f"{r['name']} ({r['status']}):")
+            if r["exc"]:
+                print(f"  {r['exc']}")
+            for line in r["lines"]:
+                print(f"  {line}")
+
+    counts = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    print("\n" + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+
+
+def main():
+    args = parse_args()
+    scripts = collect_scripts(args.dir, args.scripts)
+    if not scripts:
+        print(f"No reproducers found in {args.dir}")
+        sys.exit(1)
+
+    session, identity = open_session(args.target)
+    try:
+        print(f"Uploading {len(scripts)} scripts to {DEVICE_DIR}...\n")
+        scripts = upload(session, scripts)
+
+        start = time.monotonic()
+        results, connections = run_scripts(
+            session, [p.name for p in scripts], args.verbose, args.timeout
+        )
+        elapsed = time.monotonic() - start
+
+        if not args.keep:
+            session.run("exec", CLEANUP_SCRIPT.format(DEVICE_DIR))
+    finally:
+        session.close()
+
+    records = [results[p.name] for p in scripts if p.name in results]
+    print_results(records)
+    print(
+        f"{len(records)} scripts in {elapsed:.1f}s over {connections} connection"
+        + ("s" if connections != 1 else "")
+    )
+
+    meta = {"target": args.target, "identity": identity, "connections": connections}
+    save_results(args.json, meta, scripts=records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Persistent single-session transport to a MicroPython target.
+
+Opens the target once through mpremote's Python transport API and runs every
+mkdir/cp/cat over that one raw-REPL connection, instead of spawning a fresh
+`mpremote connect <target> ...` process (interpreter startup, port open,
+raw REPL entry and soft reset) per operation.
+
+Also holds what the standalone tools share: the device record format
+(MARK/parse_line), the per-width characters, the on-device timer and cleanup
+code, open_session() and the results JSON writer.
+
+Usage:
+    with Session("socket://localhost:2218") as session:
+        code, out, err = session.run("cat", ":/remote_data/foo.txt")
+"""
+
+import ast
+import base64
+import json
+import os
+import sys
+import time
+from importlib.metadata import PackageNotFoundError, version
+
+try:
+    MPREMOTE_VERSION = version("mpremote")
+except PackageNotFoundError:
+    MPREMOTE_VERSION = "unknown"
+
+# Payload bytes per raw-REPL exec in bulk_put(); bounded by device RAM needed to compile it
+BULK_BATCH_SIZE = 8192
+
+# On-device receiver for bulk_put(): creates directories and writes files from
+# base64 (or bytes literal) payloads, printing one "R <index> <result>" line per file.
+# Probe writes (rm=1) delete the file again once it was written.
+RECEIVER = """\
+import os
+try:
+ from binascii import a2b_base64 as _d
+except ImportError:
+ _d = None
+def _mk(p):
+ try:
+  os.mkdir(p)
+ except OSError:
+  pass
+def _w(i, p, d, rm=0):
+ try:
+  if isinstance(d, str):
+   d = _d(d)
+  with open(p, 'wb') as f:
+   f.write(d)
+  if rm:
+   os.remove(p)
+  print('R', i, 'OK')
+ except Exception as e:
+  print('R', i, type(e).__name__ + ':', e)
+"""
+
+# Same device code as mpremote's fs_printfile() (`mpremote cat`): text mode, print()ed
+PRINTFILE = """\
+with open({0!r}) as f:
+ while 1:
+  b=f.read(256)
+  if not b:break
+  print(b,end='')
+"""
+
+# The standalone tools' device code reports with print(MARK + tag, repr(value));
+# parse_line() reads those lines back
+MARK = "\x1e"
+
+# Input widths: first code point of 16 consecutive characters of that UTF-8 length
+WIDTHS = {"ascii": 0x61, "2-byte": 0xE0, "3-byte": 0x4E00, "4-byte": 0x1F600}
+
+IDENTITY_SCRIPT = "import sys\nprint(sys.platform, sys.version, sys.implementation)"
+
+# Removes a tool's device directory and whatever was left in it
+CLEANUP_SCRIPT = """\
+import os
+def _rm(d):
+ for e in os.ilistdir(d):
+  p = d + '/' + e[0]
+  try:
+   if e[1] & 0x4000:
+    _rm(p)
+    os.rmdir(p)
+   else:
+    os.remove(p)
+  except OSError:
+   pass
+os.chdir('/')
+_rm({0!r})
+os.rmdir({0!r})
+"""
+
+# On-device timer for the benchmarks. _time() doubles the repetitions until a round
+# takes at least min_us, then keeps the best of three rounds; returns (us per call, repetitions).
+TIMER = """\
+import gc
+try:
+ from time import ticks_us, ticks_diff
+except ImportError:
+ from time import time
+ ticks_us = lambda: int(time() * 1000000)
+ ticks_diff = lambda a, b: a - b
+def _emit(tag, v):
+ print('\\x1e' + tag, repr(v))
+def _round(fn, reps):
+ t = ticks_us()
+ for i in range(reps):
+  fn()
+ return ticks_diff(ticks_us(), t)
+def _time(fn, min_us):
+ reps = 1
+ dt = _round(fn, reps)
+ while dt < min_us and reps < 65536:
+  reps *= 2
+  dt = _round(fn, reps)
+ best = dt
+ for i in range(2):
+  best = min(best, _round(fn, reps))
+ return best / reps, reps
+"""
+
+
+def open_transport(target: str):
+    """Open an mpremote SerialTransport for a target, resolving "auto" like mpremote does."""
+    try:
+        import serial.tools.list_ports
+        from mpremote.transport import TransportError
+        from mpremote.transport_serial import SerialTransport
+    except ImportError as e:
+        raise RuntimeError(f"Session mode needs the mpremote package ({e})") from e
+
+    if target == "auto":
+        # Same rule as `mpremote connect auto`: first USB serial port that opens
+        for p in sorted(serial.tools.list_ports.comports()):
+            if p.vid is not None and p.pid is not None:
+                try:
+                    return SerialTransport(p.device, baudrate=115200)
+                except TransportError as er:
+                    if not er.args[0].startswith("failed to access"):
+                        raise
+        raise TransportError("no device found")
+
+    if target.startswith("port:"):
+        target = target[len("port:") :]
+    return SerialTransport(target, baudrate=115200)
+
+
+def remote_path(path: str) -> str:
+    """Strip mpremote's ':' remote prefix from a path."""
+    return path[1:] if path.startswith(":") else path
+
+
+class Session:
+    """A single open raw-REPL connection, reused for every operation."""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.transport = None
+        self.open_phases = {}  # Seconds spent in connect/soft_reset by the last open()
+
+    def open(self):
+        """Connect and enter the raw REPL (one soft reset for the whole session)."""
+        start = time.monotonic()
+        self.transport = open_transport(self.target)
+        connected = time.monotonic()
+        self.transport.enter_raw_repl(soft_reset=True)
+        self.open_phases = {
+            "connect": connected - start,
+            "soft_reset": time.monotonic() - connected,
+        }
+
+    def take_open_phases(self) -> dict[str, float]:
+        """Connect/soft reset time of an open() not yet accounted to an operation."""
+        phases, self.open_phases = self.open_phases, {}
+        return phases
+
+    def close(self):
+        """Leave the raw REPL and release the port."""
+        if self.transport is None:
+            return
+        try:
+            if self.transport.in_raw_repl:
+                self.transport.exit_raw_repl()
+        except OSError:
+            pass
+        self.transport.close()
+        self.transport = None
+
+    def drop(self):
+        """Forget a connection whose raw REPL state is unknown; the next run() reopens it."""
+        try:
+            self.close()
+        except Exception:
+            pass
+        self.transport = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def bulk_put(
+        self,
+        dirs: list[str],
+        files: list[tuple[str, bytes]],
+        batch_size: int = BULK_BATCH_SIZE,
+        probe: bool = False,
+        on_batch=None,
+    ) -> list[str]:
+        """Create dirs and write files using a few large raw-REPL batches.
+
+        files is a list of (remote_path, data). Returns one entry per file:
+        "" on success, otherwise the error reported for that file. With probe,
+        each file is removed again right after it was written successfully.
+        on_batch(indices) is called with the files of each batch before it is sent.
+        """
+        from mpremote.transport import TransportError
+        from serial import SerialException
+
+        results = [None] * len(files)
+        try:
+            if self.transport is None:
+                self.open()
+            self.transport.exec(RECEIVER)
+            use_b64 = self.transport.eval("_d is not None")
+
+            batches = [[(None, f"_mk({remote_path(d)!r})") for d in dirs]]
+            size = 0
+            for i, (dest, data) in enumerate(files):
+                payload = base64.b64encode(data).decode() if use_b64 else data
+                line = f"_w({i}, {remote_path(dest)!r}, {payload!r}{', 1' if probe else ''})"
+                if size and size + len(line) > batch_size:
+                    batches.append([])
+                    size = 0
+                batches[-1].append((i, line))
+                size += len(line)
+
+            for batch in batches:
+                if on_batch is not None:
+                    on_batch([i for i, _ in batch if i is not None])
+                self._run_batch(batch, results)
+        except (TransportError, SerialException, ConnectionError) as e:
+            self.drop()
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = f"Error with transport: {e}"
+
+        return [result if result is not None else "No result from device" for result in results]
+
+    def _run_batch(self, entries: list[tuple], results: list):
+        """Exec one batch; bisect it when it aborts, so each file still gets its own result."""
+        from mpremote.transport import TransportExecError
+
+        try:
+            out = self.transport.exec("\n".join(line for _, line in entries))
+            error = None
+        except TransportExecError as e:
+            out, error = e.status_code, e.error_output.strip()
+
+        for line in out.decode("utf-8", "replace").splitlines():
+            parts = line.split(" ", 2)
+            if len(parts) == 3 and parts[0] == "R" and parts[1].isdigit():
+                results[int(parts[1])] = "" if parts[2] == "OK" else parts[2]
+
+        if error is None:
+            return
+        pending = [(i, line) for i, line in entries if i is None or results[i] is None]
+        if len(pending) == 1:
+            if pending[0][0] is not None:
+                results[pending[0][0]] = error
+        elif pending:
+            # A compile error aborts the whole batch: retry the unfinished lines in halves
+            half = len(pending) // 2
+            self._run_batch(pending[:half], results)
+            self._run_batch(pending[half:], results)
+
+    def exec_lines(self, code: str, on_line, timeout: float = 10) -> str:
+        """Exec code, calling on_line(bytes) for each output line as it arrives.
+
+        timeout is the longest pause in the output. Returns the error output
+        ("" when the code ran cleanly); a TransportError means the REPL was lost.
+        """
+        if self.transport is None:
+            self.open()
+        pending = bytearray()
+
+        def consume(data: bytes):
+            pending.extend(data.rstrip(b"\x04"))  # EOF ending stdout
+            while b"\n" in pending:
+                end = pending.index(b"\n")
+                on_line(bytes(pending[:end]).rstrip(b"\r"))
+                del pending[: end + 1]
+
+        _, err = self.transport.exec_raw(code, timeout=timeout, data_consumer=consume)
+        if pending:
+            on_line(bytes(pending))
+        return err.decode("utf-8", "replace")
+
+    def _printfile(self, path: str) -> str:
+        """Read a file the way `mpremote cat` does: opened in text mode and print()ed."""
+        from mpremote.transport import TransportExecError, _convert_filesystem_error
+
+        chunks = []
+        try:
+            self.transport.exec(PRINTFILE.format(path), data_consumer=chunks.append)
+        except TransportExecError as e:
+            raise _convert_filesystem_error(e, path) from None
+        return b"".join(chunks).replace(b"\x04", b"").decode("utf-8", "replace")
+
+    def run(self, *args) -> tuple[int, str, str]:
+        """Run an mpremote-style command over the session.
+
+        Supports "mkdir :path", "cp local :remote", "cat :path" and "exec code", and returns
+        (returncode, stdout, stderr) with the same error wording as the mpremote
+        CLI so categorize_error() keeps working.
+        """
+        from mpremote.transport import TransportError, TransportExecError
+        from serial import SerialException
+
+        cmd, *paths = args
+        try:
+            if self.transport is None:
+                self.open()
+            if cmd == "mkdir":
+                self.transport.fs_mkdir(remote_path(paths[0]))
+                return 0, "", ""
+            if cmd == "cp":
+                with open(paths[0], "rb") as f:
+                    data = f.read()
+                self.transport.fs_writefile(remote_path(paths[1]), data)
+                return 0, "", ""
+            if cmd == "exec":
+                out = self.transport.exec(paths[0])
+                return 0, bytes(out).decode("utf-8", "replace"), ""
+            if cmd == "cat":
+                return 0, self._printfile(remote_path(paths[0])), ""
+            return -1, "", f"Session: unsupported command {cmd!r}"
+        except (SerialException, ConnectionError) as e:
+            # The port itself failed (unplugged, reset, socket closed), start over
+            self.drop()
+            return -1, "", f"mpremote: Error with transport: {e}"
+        except OSError as e:
+            # mpremote's filesystem errors carry the path in strerror
+            detail = e.filename or e.strerror
+            reason = os.strerror(e.errno) if e.errno else str(e)
+            return 1, "", f"mpremote: {cmd}: {detail}: {reason}."
+        except TransportExecError as e:
+            return 1, "", f"mpremote: Error with transport:\n{e.error_output}"
+        except TransportError as e:
+            # Raw REPL state is unknown after a protocol error, start over
+            self.drop()
+            return -1, "", f"mpremote: Error with transport: {e}"
+
+
+def parse_line(line: bytes):
+    """Split a device output line into (tag, value); (None, text) for anything else."""
+    text = line.decode("utf-8", "replace")
+    if not text.startswith(MARK) or " " not in text:
+        return None, text
+    tag, value = text[len(MARK) :].split(" ", 1)
+    try:
+        return tag, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None, text
+
+
+def open_session(target: str) -> tuple[Session, str]:
+    """Open a session for a standalone tool and print the target's identity.
+
+    Exits with an error message when the target cannot be opened.
+    """
+    session = Session(target)
+    try:
+        session.open()
+    except Exception as e:
+        print(f"Error: cannot open {target}: {e}")
+        sys.exit(1)
+    try:
+        identity = session.run("exec", IDENTITY_SCRIPT)[1].strip()
+    except BaseException:
+        session.close()
+        raise
+    print(f"Target: {target} ({identity})")
+    return session, identity
+
+
+def save_results(path: str, meta: dict, **sections):
+    """Write a tool's results JSON: the run's meta (time, mpremote version) and its sections."""
+    data = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "mpremote": MPREMOTE_VERSION, **meta},
+        **sections,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"Results saved to: {path}")
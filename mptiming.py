@@ -0,0 +1,198 @@
+"""
+Per-phase wall time of mpremote operations.
+
+Splits each operation into the phases a slow run can come from:
+
+    spawn       process start, interpreter and mpremote import, until the port is opened
+    connect     opening the port (SerialTransport)
+    soft_reset  raw REPL entry, including the soft reset
+    transfer    the command itself (raw REPL execs and data transfer)
+    teardown    leaving the raw REPL, closing the port and process exit
+
+A spawned mpremote is run through this module (`python mptiming.py MARKS_FILE
+<mpremote args>`), which hooks the transport and appends one timestamp per phase
+boundary to MARKS_FILE as it is reached, so a killed (hung) process still shows
+how far it got. Session operations have no spawn/teardown, and their connect and
+soft reset are paid once when the session opens.
+
+Usage:
+    timings = PhaseTimings()
+    cmd = timed_command(["mpremote", "connect", port, "cat", ":a.txt"], marks_path)
+    ... run cmd between started and ended (time.time()) ...
+    timings.add(port, "read", phase_durations(read_marks(marks_path), started, ended))
+    timings.print_stage(port, "read")
+    timings.save("unicode_test_timings.json")
+"""
+
+import importlib.util
+import json
+import math
+import sys
+import threading
+import time
+
+PHASES = ("spawn", "connect", "soft_reset", "transfer", "teardown")
+
+# Phase boundary marks written by the instrumented process, in order;
+# phase i runs from the previous mark (or the parent's spawn time) to MARKS[i]
+MARKS = ("connect_begin", "connect_end", "reset_end", "teardown_begin")
+
+PERCENTILES = (50, 95, 99)
+
+
+def instrumentable() -> bool:
+    """Whether mpremote can be imported here, so spawned runs can be instrumented."""
+    return importlib.util.find_spec("mpremote") is not None
+
+
+def timed_command(cmd: list[str], marks_path: str) -> list[str]:
+    """Turn an `mpremote ...` command line into one that records phase marks."""
+    return [sys.executable, __file__, marks_path] + cmd[1:]
+
+
+def read_marks(path: str) -> dict[str, float]:
+    """Phase marks (name -> time.time()) written by an instrumented process."""
+    marks = {}
+    try:
+        with open(path, encoding="ascii") as f:
+            for line in f:
+                name, _, value = line.partition(" ")
+                try:
+                    marks.setdefault(name, float(value))
+                except ValueError:
+                    pass  # Partial line of a killed process
+    except OSError:
+        pass
+    return marks
+
+
+def phase_durations(marks: dict[str, float], started: float, ended: float) -> dict[str, float]:
+    """Seconds per phase of one spawned run, plus its total.
+
+    A phase whose closing mark is missing did not finish: it is charged with the
+    time until the next mark that was reached (or the end, e.g. a killed console
+    hang shows up as transfer), and the phases it swallowed are not reported.
+    """
+    durations = {}
+    previous, running = started, None
+    for phase, end in zip(PHASES, [marks.get(mark) for mark in MARKS] + [ended]):
+        if end is None:
+            running = running or phase
+            continue
+        durations[running or phase] = max(end - previous, 0.0)
+        previous, running = end, None
+    durations["total"] = ended - started
+    return durations
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class PhaseTimings:
+    """Phase durations of all operations, by target and test stage (thread-safe)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # (target, stage) -> {phase: [seconds]}
+
+    def add(self, target: str, stage: str, durations: dict[str, float]):
+        with self.lock:
+            phases = self.samples.setdefault((target, stage), {})
+            for phase, seconds in durations.items():
+                phases.setdefault(phase, []).append(seconds)
+
+    def summary(self, target: str, stage: str) -> dict[str, dict]:
+        """{phase: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} of one stage."""
+        with self.lock:
+            phases = {p: sorted(v) for p, v in self.samples.get((target, stage), {}).items()}
+        summary = {}
+        for phase in PHASES + ("total",):
+            values = phases.get(phase)
+            if not values:
+                continue
+            stats = {"count": len(values), "mean_ms": sum(values) / len(values) * 1000}
+            for p in PERCENTILES:
+                stats[f"p{p}_ms"] = percentile(values, p) * 1000
+            stats["max_ms"] = values[-1] * 1000
+            summary[phase] = {k: round(v, 3) for k, v in stats.items()}
+        return summary
+
+    def print_stage(self, target: str, stage: str):
+        """Print the latency percentiles per phase of one stage."""
+        summary = self.summary(target, stage)
+        if not summary:
+            return
+        print("\n" + "-" * 70)
+        print(f"PHASE TIMING ({stage}, {summary['total']['count']} operations)")
+        print("-" * 70)
+        print(f"{'phase':<12} {'count':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+        for phase, stats in summary.items():
+            print(
+                f"{phase:<12} {stats['count']:>6}"
+                + "".join(
+                    f" {stats[key]:>7.1f} ms" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+                )
+            )
+
+    def save(self, path: str):
+        """Write the summaries of all targets and stages as JSON."""
+        with self.lock:
+            keys = sorted(self.samples)
+        data = {}
+        for target, stage in keys:
+            data.setdefault(target, {})[stage] = self.summary(target, stage)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"phases": list(PHASES), "targets": data}, f, indent=2)
+            f.write("\n")
+
+
+def run_instrumented(marks_path: str, args: list[str]) -> int:
+    """Run the mpremote CLI with args, appending phase marks to marks_path."""
+    marks = open(marks_path, "a", encoding="ascii", buffering=1)
+    seen = set()
+
+    def mark(name: str):
+        if name not in seen:
+            seen.add(name)
+            marks.write(f"{name} {time.time():.6f}\n")
+
+    from mpremote.main import main
+    from mpremote.transport_serial import SerialTransport
+
+    init, enter, exit_raw, close = (
+        SerialTransport.__init__,
+        SerialTransport.enter_raw_repl,
+        SerialTransport.exit_raw_repl,
+        SerialTransport.close,
+    )
+
+    def timed_init(self, *a, **kw):
+        mark("connect_begin")
+        init(self, *a, **kw)
+        mark("connect_end")
+
+    def timed_enter(self, *a, **kw):
+        enter(self, *a, **kw)
+        mark("reset_end")
+
+    def timed_exit(self, *a, **kw):
+        mark("teardown_begin")
+        exit_raw(self, *a, **kw)
+
+    def timed_close(self, *a, **kw):
+        mark("teardown_begin")
+        close(self, *a, **kw)
+
+    SerialTransport.__init__ = timed_init
+    SerialTransport.enter_raw_repl = timed_enter
+    SerialTransport.exit_raw_repl = timed_exit
+    SerialTransport.close = timed_close
+
+    sys.argv = ["mpremote"] + args
+    return main()
+
+
+if __name__ == "__main__":
+    sys.exit(run_instrumented(sys.argv[1], sys.argv[2:]))
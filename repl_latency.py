@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Keystroke latency of the REPL line editor for UTF-8 input, on a pseudo-terminal.
+
+The UTF-8 input buffering and cursor movement added to shared/readline (issue
+#7585, test_scripts/later/7585_repl_input_non_ascii.py) are otherwise only
+checked by simulation and by typing. This runs the unix port's REPL on a pty
+and types into it the way a terminal does, one byte at a time: a line of
+ASCII, 2-, 3- or 4-byte characters, then Home, Right to the middle, an insert,
+Backspace, End, Left and Backspace again. Per keystroke it records
+
+    latency     time from the keystroke's last byte to the first echoed byte
+    redraw      time until the echo is complete (no output for --settle ms)
+    echo        bytes echoed, e.g. the redrawn tail of the line after an insert
+
+and after Enter it checks that the edited line holds exactly what the same
+edits give on the host. Sweeping the line length shows whether editing long
+multi-byte lines stays interactive: an operation whose median latency grows
+more than DEGRADE_RATIO times from the shortest to the longest line is flagged.
+
+Usage:
+    python repl_latency.py                                   # micropython (unix port) on PATH
+    python repl_latency.py --command ports/unix/build-standard/micropython
+    python repl_latency.py --command "python3 -q" --lengths 16 256   # GNU readline, for comparison
+"""
+
+import argparse
+import json
+import os
+import re
+import select
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+from mpsession import WIDTHS
+from mptiming import percentile
+
+try:
+    import fcntl
+    import pty
+    import struct
+    import termios
+except ImportError:  # Windows: no pseudo-terminals
+    pty = None
+
+RESULTS_FILE = "repl_latency.json"
+LENGTHS = [16, 64, 256, 1024]
+PROMPT = b">>> "
+COLUMNS = 9999  # Terminal width; wide enough that no test line wraps
+
+DEGRADE_RATIO = 3.0  # Growth of median latency from shortest to longest line that is flagged
+NOISE_MS = 0.5  # Latencies below this at the longest line are not flagged
+
+KEYS = {
+    "home": b"\x1b[H",
+    "end": b"\x1b[F",
+    "left": b"\x1b[D",
+    "right": b"\x1b[C",
+    "backspace": b"\x7f",
+}
+OPS = ["type", "home", "right", "insert", "backspace", "end", "left"]
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Measure REPL keystroke echo latency for UTF-8 line editing on a pty",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python repl_latency.py
+    python repl_latency.py --command ports/unix/build-standard/micropython
+    python repl_latency.py --widths ascii 4-byte --lengths 16 128 1024
+    python repl_latency.py --command "python3 -q" --lengths 16 256
+""",
+    )
+    parser.add_argument(
+        "--command",
+        default="micropython",
+        help="REPL to run on the pty (default: micropython, the unix port).",
+    )
+    parser.add_argument(
+        "--widths",
+        nargs="+",
+        choices=list(WIDTHS),
+        default=list(WIDTHS),
+        help="Character widths of the typed text (default: all).",
+    )
+    parser.add_argument(
+        "--lengths",
+        nargs="+",
+        type=int,
+        default=LENGTHS,
+        help=f"Line lengths in characters (default: {' '.join(map(str, LENGTHS))}).",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=3,
+        help="Milliseconds without output after which a keystroke's echo counts as complete "
+        "(default: 3).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=2,
+        help="Seconds to wait for an echo or a prompt (default: 2).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the results to this JSON file (default: {RESULTS_FILE}).",
+    )
+    return parser.parse_args()
+
+
+class PtyRepl:
+    """A REPL process on a pseudo-terminal, written to byte by byte."""
+
+    def __init__(self, command: list[str], timeout: float):
+        self.timeout = timeout
+        self.master, slave = pty.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 50, COLUMNS, 0, 0))
+        env = dict(os.environ, TERM=os.environ.get("TERM", "xterm"), LC_ALL="C.UTF-8")
+        self.process = subprocess.Popen(
+            command, stdin=slave, stdout=slave, stderr=slave, env=env, start_new_session=True
+        )
+        os.close(slave)
+        self.output = b""
+        self.read_until(PROMPT, timeout=10)
+
+    def poll(self, timeout: float) -> bytes:
+        """Output available within timeout seconds (b"" if none)."""
+        ready, _, _ = select.select([self.master], [], [], max(timeout, 0))
+        if not ready:
+            return b""
+        try:
+            return os.read(self.master, 65536)
+        except OSError:
+            raise ConnectionError("REPL exited") from None
+
+    def read_until(self, marker: bytes, timeout: float = None) -> bytes:
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while marker not in self.output:
+            data = self.poll(deadline - time.monotonic())
+            if not data and time.monotonic() >= deadline:
+                raise TimeoutError(f"no {marker!r} from the REPL")
+            self.output += data
+        data, _, self.output = self.output.partition(marker)
+        return data + marker
+
+    def keystroke(self, key: bytes, settle: float) -> dict:
+        """Send one key byte by byte and time its echo."""
+        early = 0
+        for byte in key[:-1]:
+            os.write(self.master, bytes([byte]))
+            early += len(self.poll(0))  # Echo before the key is complete
+        os.write(self.master, key[-1:])
+        start = time.perf_counter()
+        data = self.poll(self.timeout)
+        first = time.perf_counter()
+        if not data:
+            return {"latency": None, "redraw": None, "echo": 0, "early": early}
+        echo, last = len(data), first
+        while True:
+            data = self.poll(settle)
+            if not data:
+                break
+            echo, last = echo + len(data), time.perf_counter()
+        return {
+            "latency": (first - start) * 1000,
+            "redraw": (last - start) * 1000,
+            "echo": echo,
+            "early": early,
+        }
+
+    def write(self, data: bytes):
+        os.write(self.master, data)
+
+    def close(self):
+        try:
+            os.write(self.master, b"\x04")  # Ctrl-D: leave the REPL
+            self.process.wait(2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        os.close(self.master)
+
+
+class LineModel:
+    """The line editor's expected buffer and cursor."""
+
+    def __init__(self):
+        self.chars = []
+        self.cursor = 0
+
+    def apply(self, op: str, char: str = ""):
+        if op in ("type", "insert"):
+            self.chars.insert(self.cursor, char)
+            self.cursor += 1
+        elif op == "home":
+            self.cursor = 0
+        elif op == "end":
+            self.cursor = len(self.chars)
+        elif op == "left":
+            self.cursor = max(self.cursor - 1, 0)
+        elif op == "right":
+            self.cursor = min(self.cursor + 1, len(self.chars))
+        elif op == "backspace" and self.cursor:
+            self.cursor -= 1
+            del self.chars[self.cursor]
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chars)
+
+
+def edit_script(base: int, length: int) -> list[tuple[str, str]]:
+    """(op, character) steps editing the line x='<text>' of length characters; setup ops have
+    no op name and are not timed."""
+    text = [chr(base + i % 16) for i in range(length)]
+    steps = [("", c) for c in "x='"] + [("type", c) for c in text] + [("", "'")]
+    steps += [("home", "")] + [("right", "")] * (3 + length // 2)
+    steps += [("insert", chr(base + 15)), ("backspace", ""), ("backspace", "")]
+    steps += [("end", ""), ("left", ""), ("left", ""), ("backspace", "")]
+    return steps
+
+
+def run_line(repl: PtyRepl, width: str, length: int, settle: float) -> dict:
+    """Type and edit one line, then check what the REPL made of it."""
+    model = LineModel()
+    keys = []
+    for op, char in edit_script(WIDTHS[width], length):
+        model.apply(op or "type", char)
+        key = char.encode("utf-8") if char else KEYS[op]
+        sample = repl.keystroke(key, settle)
+        if op:
+            keys.append({"op": op, **sample})
+    repl.write(b"\r")
+    repl.read_until(PROMPT)
+
+    namespace = {}
+    exec(model.text, namespace)
+    expected = f"{len(namespace['x'])} {namespace['x'].encode('utf-8').hex()}"
+    repl.write(b"print(len(x), x.encode().hex())\r")
+    out = repl.read_until(PROMPT).decode("utf-8", "replace")
+    found = re.search(r"\n(\d+ [0-9a-f]*)\r?\n", out)
+    got = found.group(1) if found else out.strip()[-80:]
+    timed = [k for k in keys if k["redraw"] is not None]
+    return {
+        "width": width,
+        "length": length,
+        "status": "PASS" if got == expected else "FAIL",
+        "expected": expected if got != expected else "",
+        "got": got if got != expected else "",
+        "edit_ms": round(sum(k["redraw"] for k in timed), 3),
+        "timeouts": len(keys) - len(timed),
+        "early": sum(k["early"] for k in keys),
+        "keys": keys,
+    }
+
+
+def op_stats(run: dict) -> dict[str, dict]:
+    """{op: {count, p50, p95 (latency ms), echo (mean bytes)}} of one run."""
+    stats = {}
+    for op in OPS:
+        samples = [k for k in run["keys"] if k["op"] == op and k["latency"] is not None]
+        if not samples:
+            continue
+        latencies = sorted(k["latency"] for k in samples)
+        stats[op] = {
+            "count": len(samples),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "echo": round(sum(k["echo"] for k in samples) / len(samples), 1),
+        }
+    return stats
+
+
+def degraded(runs: list[dict]) -> list[str]:
+    """Ops whose median latency grows more than DEGRADE_RATIO from the shortest line to the longest."""
+    flags = []
+    for width in dict.fromkeys(r["width"] for r in runs):
+        by_length = sorted((r for r in runs if r["width"] == width), key=lambda r: r["length"])
+        if len(by_length) < 2:
+            continue
+        short, long = by_length[0]["stats"], by_length[-1]["stats"]
+        for op in OPS:
+            if op in short and op in long and long[op]["p50"] >= NOISE_MS:
+                ratio = long[op]["p50"] / max(short[op]["p50"], 1e-3)
+                if ratio > DEGRADE_RATIO:
+                    flags.append(
+                        f"{op} ({width}): p50 {short[op]['p50']:.2f} -> {long[op]['p50']:.2f} ms "
+                        f"from {by_length[0]['length']} to {by_length[-1]['length']} characters"
+                    )
+    return flags
+
+
+def print_results(runs: list[dict], lengths: list[int]):
+    """Print median latency per op and line length, edit times and failed checks."""
+    print("\n" + "=" * 70)
+    print("KEYSTROKE LATENCY (p50 ms, echo bytes at the longest line)")
+    print("=" * 70)
+    widths = list(dict.fromkeys(r["width"] for r in runs))
+    print(f"{'op':<10} {'width':<7}" + "".join(f" {n:>8}" for n in lengths) + f" {'echo':>7}")
+    for op in OPS:
+        for width in widths:
+            cells = {r["length"]: r["stats"].get(op) for r in runs if r["width"] == width}
+            row = f"{op:<10} {width:<7}"
+            for n in lengths:
+                stats = cells.get(n)
+                row += f" {stats['p50']:>8.3f}" if stats else f" {'-':>8}"
+            longest = cells.get(max(cells)) if cells else None
+            print(row + (f" {longest['echo']:>7.0f}" if longest else ""))
+
+    print("\n" + "-" * 70)
+    print(f"{'edit time':<10} {'':<7}" + "".join(f" {n:>8}" for n in lengths) + "  (ms)")
+    for width in widths:
+        times = {r["length"]: r["edit_ms"] for r in runs if r["width"] == width}
+        print(
+            f"{'':<10} {width:<7}"
+            + "".join(f" {times[n]:>8.1f}" if n in times else f" {'-':>8}" for n in lengths)
+        )
+
+    failed = [r for r in runs if r["status"] != "PASS" or r["timeouts"]]
+    flags = degraded(runs)
+    if failed or flags:
+        print("\n" + "-" * 70)
+        for r in failed:
+            detail = f"expected {r['expected'][:40]}, got {r['got'][:40]}" if r["got"] else ""
+            timeouts = f" {r['timeouts']} keys without echo" if r["timeouts"] else ""
+            print(f"{r['status']} {r['width']} x {r['length']}:{timeouts} {detail}")
+        for flag in flags:
+            print(f"SLOW {flag}")
+
+
+def main():
+    args = parse_args()
+    if pty is None:
+        print("Error: needs a POSIX pseudo-terminal (Linux, macOS)")
+        sys.exit(1)
+    command = shlex.split(args.command)
+    if not shutil.which(command[0]):
+        print(f"Error: {command[0]} not found (build the unix port or pass --command)")
+        sys.exit(1)
+    args.lengths = sorted(args.lengths)
+
+    repl = PtyRepl(command, args.timeout)
+    print(f"REPL: {args.command} (pid {repl.process.pid})\n")
+    runs = []
+    try:
+        for width in args.widths:
+            for length in args.lengths:
+                try:
+                    run = run_line(repl, width, length, args.settle / 1000)
+                except TimeoutError as e:
+                    run = {"width": width, "length": length, "status": "FAIL", "got": str(e)}
+                    run.update(expected="", edit_ms=0, timeouts=0, early=0, keys=[])
+                    repl.write(b"\x03")  # Abandon the line
+                    repl.read_until(PROMPT)
+                run["stats"] = op_stats(run)
+                runs.append(run)
+                print(
+                    f"  {width:<7} {length:>5} chars: {run['status']}, edit {run['edit_ms']:.1f} ms"
+                )
+    finally:
+        repl.close()
+
+    print_results(runs, args.lengths)
+    failed = sum(r["status"] != "PASS" for r in runs)
+    print(f"\n{len(runs)} lines, {failed} failed")
+
+    data = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "command": args.command,
+            "settle_ms": args.settle,
+        },
+        "flags": degraded(runs),
+        "runs": runs,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"Results saved to: {args.json}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+On-device micro-benchmarks of str operations on UTF-8 text, with scaling fits.
+
+MicroPython stores str as UTF-8 without a character index, so for non-ASCII
+text indexing, slicing and anything built on them walk the string from the
+start: O(n) per call, and O(n²) for loops that index every character. This
+times indexing, iteration, slicing, find, center/ljust and %/format/f-string
+formatting on the device with time.ticks_us(), sweeping the string length
+for ASCII and 2-, 3- and 4-byte characters, and fits the growth exponent k of
+time ~ n^k for every operation and width:
+
+    k < 0.5     O(1)
+    k < 1.5     O(n)
+    k >= 1.5    O(n²), flagged
+
+The fit uses the three longest lengths, where per-call overhead no longer
+dominates. An operation whose exponent is clearly higher for multi-byte text
+than for ASCII is flagged as well; calls of a few microseconds are too close
+to the timer resolution and are not flagged.
+
+Usage:
+    python str_bench.py -t COM27
+    python str_bench.py -t socket://localhost:2218 index slice --lengths 16 64 256 1024
+"""
+
+import argparse
+import math
+import sys
+import time
+
+from mpsession import TIMER, WIDTHS, Session, open_session, parse_line, save_results
+
+RESULTS_FILE = "str_bench.json"
+LENGTHS = [16, 64, 256, 1024, 4096]
+
+FIT_POINTS = 3  # Longest lengths used for the exponent fit
+QUADRATIC = 1.5  # Exponent from which an operation counts as O(n²)
+WIDTH_PENALTY = 0.5  # Exponent increase over ASCII that counts as a UTF-8 penalty
+NOISE_US = 5  # Operations faster than this at the longest length are not flagged
+
+# (operation, expression). Expressions see s (str of n characters of one width),
+# n and f (a character of the same width that is in s).
+OPERATIONS = [
+    ("len", "len(s)"),
+    ("index middle", "s[n // 2]"),
+    ("index loop", "[s[i] for i in range(n)]"),
+    ("iterate", "[c for c in s]"),
+    ("slice", "s[n // 4 : n - n // 4]"),
+    ("find missing", "s.find('~')"),
+    ("find from", "s.find(f, n // 2)"),
+    ("center", "s.center(n * 2, f)"),
+    ("ljust", "s.ljust(n * 2, f)"),
+    ("%s", "'<%s>' % s"),
+    ("%c loop", "''.join(['%c' % ord(c) for c in s])"),
+    ("format", "'{:^{}}'.format(s, n * 2)"),
+    ("f-string", "f'<{s}>'"),
+]
+
+# On-device benchmark. _case() sweeps the lengths of one operation and width, and
+# stops once a call takes longer than max_us.
+BENCH = TIMER + """\
+def _case(op, expr, w, base, lengths, min_us, max_us):
+ for n in lengths:
+  env = {'s': ''.join([chr(base + i % 16) for i in range(n)]), 'n': n, 'f': chr(base + 15)}
+  r = {'op': op, 'width': w, 'length': n}
+  try:
+   fn = eval('lambda: ' + expr, env)
+   gc.collect()
+   r['us'], r['reps'] = _time(fn, min_us)
+  except Exception as e:
+   r['error'] = type(e).__name__ + ': ' + str(e)
+  env = fn = None
+  _emit('R', r)
+  if 'error' in r or r['us'] > max_us:
+   break
+def _all(cases, lengths, min_us, max_us):
+ for op, expr, w, base in cases:
+  _case(op, expr, w, base, lengths, min_us, max_us)
+ _emit('E', len(cases))
+"""
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark str operations on UTF-8 text on a device and fit their scaling",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python str_bench.py -t COM27
+    python str_bench.py -t socket://localhost:2218 index slice center
+    python str_bench.py -t COM27 --lengths 8 32 128 512 2048 --widths ascii 3-byte
+    python str_bench.py -t /dev/ttyACM0 --max-ms 500
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        default="auto",
+        help="Target connection (default: auto), e.g. COM27, /dev/ttyUSB0, socket://localhost:2218.",
+    )
+    parser.add_argument(
+        "ops",
+        nargs="*",
+        metavar="FILTER",
+        help="Only benchmark operations whose name contains one of these. Default: all.",
+    )
+    parser.add_argument(
+        "--widths",
+        nargs="+",
+        choices=list(WIDTHS),
+        default=list(WIDTHS),
+        help="Character widths to compare (default: all).",
+    )
+    parser.add_argument(
+        "--lengths",
+        nargs="+",
+        type=int,
+        default=LENGTHS,
+        help=f"String lengths in characters (default: {' '.join(map(str, LENGTHS))}).",
+    )
+    parser.add_argument(
+        "--min-ms",
+        type=float,
+        default=20,
+        help="Minimum duration of a timed round; short calls are repeated (default: 20).",
+    )
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=1000,
+        help="Stop sweeping an operation once one call takes longer than this (default: 1000).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Seconds without output before the device counts as hung (default: 60).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the results to this JSON file (default: {RESULTS_FILE}).",
+    )
+    return parser.parse_args()
+
+
+def fit_exponent(points: list[tuple[int, float]]) -> float | None:
+    """Least-squares slope of log(time) over log(length), from the longest lengths."""
+    points = [(n, us) for n, us in sorted(points) if us > 0][-FIT_POINTS:]
+    if len(points) < 2:
+        return None
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(us) for _, us in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx if sxx else None
+
+
+def complexity(k: float | None) -> str:
+    """Scaling class of a fitted exponent."""
+    if k is None:
+        return "-"
+    return "O(1)" if k < 0.5 else "O(n)" if k < QUADRATIC else "O(n²)"
+
+
+def run_bench(session: Session, cases: list[tuple], args) -> list[dict]:
+    """Run the cases on the device, printing each point as it arrives."""
+    records = []
+
+    def on_line(line: bytes):
+        tag, value = parse_line(line)
+        if tag == "R":
+            records.append(value)
+            result = value.get("error") or f"{value['us']:.1f} us"
+            print(f"  {value['op']:<14} {value['width']:<7} {value['length']:>6}  {result}")
+
+    session.exec_lines(BENCH, on_line)
+    err = session.exec_lines(
+        f"_all({cases!r}, {args.lengths!r}, {args.min_ms * 1000:.0f}, {args.max_ms * 1000:.0f})",
+        on_line,
+        args.timeout,
+    )
+    if err:
+        lines = err.strip().splitlines()
+        print(f"  benchmark stopped: {lines[-1] if lines else err}")
+    return records
+
+
+def analyze(records: list[dict], widths: list[str]) -> dict[str, dict]:
+    """{operation: {width: {exponent, class, us}}}, with the longest length's time per call."""
+    points = {}
+    for r in records:
+        if "us" in r:
+            points.setdefault(r["op"], {}).setdefault(r["width"], []).append(
+                (r["length"], r["us"])
+            )
+    fits = {}
+    for op, by_width in points.items():
+        fits[op] = {}
+        for w in widths:
+            if w not in by_width:
+                continue
+            k = fit_exponent(by_width[w])
+            n, us = max(by_width[w])
+            fits[op][w] = {
+                "exponent": None if k is None else round(k, 2),
+                "class": complexity(k),
+                "length": n,
+                "us": round(us, 2),
+            }
+    return fits
+
+
+def flagged(fits: dict[str, dict]) -> list[str]:
+    """Descriptions of quadratic operations and of UTF-8 scaling penalties."""
+    flags = []
+    for op, by_width in fits.items():
+        ascii_k = by_width.get("ascii", {}).get("exponent")
+        for w, fit in by_width.items():
+            k = fit["exponent"]
+            if k is None or fit["us"] < NOISE_US:
+                continue
+            if k >= QUADRATIC:
+                flags.append(f"{op} ({w}): O(n²), exponent {k}")
+            elif w != "ascii" and ascii_k is not None and k - ascii_k >= WIDTH_PENALTY:
+                flags.append(f"{op} ({w}): exponent {k} vs {ascii_k} for ASCII")
+    return flags
+
+
+def print_results(fits: dict[str, dict], widths: list[str], records: list[dict]):
+    """Print exponent, class and time at the longest length per operation and width."""
+    print("\n" + "=" * 70)
+    print("SCALING (exponent k of time ~ n^k, us per call at the longest length)")
+    print("=" * 70)
+    print(f"{'operation':<14}" + "".join(f" {w:>13}" for w in widths))
+    for op, by_width in fits.items():
+        exponents, times = f"{op:<14}", f"{'':<14}"
+        for w in widths:
+            fit = by_width.get(w)
+            if fit is None:
+                exponents, times = exponents + f" {'':>13}", times + f" {'':>13}"
+                continue
+            k = "-" if fit["exponent"] is None else f"{fit['exponent']:.2f}"
+            exponents += f" {k + ' ' + fit['class']:>13}"
+            times += f" {fit['us']:>10.1f} us"
+        print(exponents)
+        print(times)
+
+    errors = {(r["op"], r["width"]): r["error"] for r in records if "error" in r}
+    flags = flagged(fits)
+    if flags or errors:
+        print("\n" + "-" * 70)
+        for flag in flags:
+            print(f"FLAG  {flag}")
+        for (op, w), error in errors.items():
+            print(f"ERROR {op} ({w}): {error}")
+
+
+def main():
+    args = parse_args()
+    operations = [op for op in OPERATIONS if not args.ops or any(f in op[0] for f in args.ops)]
+    if not operations:
+        print(f"No operations match {' '.join(args.ops)}")
+        sys.exit(1)
+    args.lengths = sorted(args.lengths)
+    cases = [(op, expr, w, WIDTHS[w]) for op, expr in operations for w in args.widths]
+
+    session, identity = open_session(args.target)
+    try:
+        print(
+            f"Benchmarking {len(operations)} operations x {len(args.widths)} widths "
+            f"at {len(args.lengths)} lengths\n"
+        )
+        start = time.monotonic()
+        records = run_bench(session, cases, args)
+        elapsed = time.monotonic() - start
+    finally:
+        session.close()
+
+    fits = analyze(records, args.widths)
+    print_results(fits, args.widths, records)
+    print(f"\n{len(records)} points in {elapsed:.1f}s")
+
+    meta = {
+        "target": args.target,
+        "identity": identity,
+        "lengths": args.lengths,
+        "min_ms": args.min_ms,
+    }
+    save_results(args.json, meta, fits=fits, flags=flagged(fits), points=records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Keying and invalidation of the persistent result cache (--cache)."""
+
+import time
+import unicodedata
+
+import pytest
+
+import unicode_test
+from unicode_test import CorpusManifest, ResultCache, Target
+
+PASS = (0, "", "")
+EINVAL = (1, "", "OSError: [Errno 22] EINVAL")
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    root = tmp_path / "test_data"
+    root.mkdir()
+    for name in ("café_nfc.txt", unicodedata.normalize("NFD", "café_nfd.txt"), "😀.txt"):
+        (root / name).write_text("data\n", encoding="utf-8")
+    monkeypatch.setattr(unicode_test, "TEST_DIR", root)
+    reindex(root, monkeypatch)
+    return root
+
+
+def reindex(root, monkeypatch):
+    manifest = CorpusManifest(root / "manifest.json")
+    manifest.refresh()
+    monkeypatch.setattr(unicode_test, "_manifest", manifest)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache.json"), max_age_days=1)
+
+
+@pytest.fixture
+def target():
+    target = Target("COM27")
+    target.identity = "rp2 3.4.0; MicroPython v1.27.0"
+    return target
+
+
+def test_put_and_get(cache, target, corpus):
+    path = corpus / "😀.txt"
+    assert cache.get(target, "cp", path) is None
+    cache.put(target, "cp", path, EINVAL)
+    assert cache.get(target, "cp", path) == EINVAL
+
+
+def test_saved_entries_are_reloaded(cache, target, corpus):
+    path = corpus / "😀.txt"
+    cache.put(target, "cp", path, EINVAL)
+    cache.save()
+    assert ResultCache(cache.path, max_age_days=1).get(target, "cp", path) == EINVAL
+
+
+def test_key_covers_operation_mode_identity_and_mpremote(cache, target, corpus, monkeypatch):
+    path = corpus / "😀.txt"
+    cache.put(target, "cp", path, EINVAL)
+    assert cache.get(target, "cat", path) is None
+
+    other = Target("COM28")
+    other.identity = target.identity
+    assert cache.get(other, "cp", path) == EINVAL  # Same firmware on another port
+
+    other.identity = "rp2 3.4.0; MicroPython v1.28.0"
+    assert cache.get(other, "cp", path) is None
+
+    target.session = object()
+    assert cache.get(target, "cp", path) is None
+    target.session = None
+
+    monkeypatch.setattr(unicode_test, "MPREMOTE_VERSION", "0.0.0")
+    assert cache.get(target, "cp", path) is None
+
+
+def test_key_covers_filename_bytes(cache, target, corpus):
+    nfc = corpus / "café_nfc.txt"
+    nfd = corpus / unicodedata.normalize("NFD", "café_nfd.txt")
+    cache.put(target, "cp", nfc, PASS)
+    cache.put(target, "cp", nfd, EINVAL)
+    assert cache.get(target, "cp", nfc) == PASS
+    assert cache.get(target, "cp", nfd) == EINVAL
+
+
+def test_key_covers_file_content(cache, target, corpus, monkeypatch):
+    path = corpus / "😀.txt"
+    cache.put(target, "cp", path, PASS)
+    path.write_text("new content\n", encoding="utf-8")
+    reindex(corpus, monkeypatch)
+    assert cache.get(target, "cp", path) is None
+
+
+def test_expired_entries_are_not_served(cache, target, corpus):
+    path = corpus / "😀.txt"
+    cache.put(target, "cp", path, PASS)
+    for entry in cache.entries.values():
+        entry["time"] = time.time() - 2 * 86400
+    assert cache.get(target, "cp", path) is None
+
+
+@pytest.mark.parametrize(
+    "err", ["TIMEOUT", "mpremote: failed to access COM27", "could not enter raw repl"]
+)
+def test_transient_failures_are_not_stored(cache, target, corpus, err):
+    cache.put(target, "cp", corpus / "😀.txt", (1, "", err))
+    assert cache.entries == {}
+
+
+def test_drop(cache, target, corpus):
+    path = corpus / "😀.txt"
+    cache.put(target, "cp", path, PASS)
+    cache.drop(target, "cp", path)
+    assert cache.get(target, "cp", path) is None
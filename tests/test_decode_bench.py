@@ -0,0 +1,51 @@
+"""Composition of decode_bench's on-device buffers, run under CPython."""
+
+import pytest
+
+from decode_bench import BENCH, CONTENT, SIZES
+
+
+@pytest.fixture(scope="module")
+def device():
+    namespace = {}
+    exec(BENCH, namespace)
+    return namespace
+
+
+def build(device, size, content, kind, density):
+    chars = [chr(c).encode() for c in CONTENT[content]]
+    bad = device["_BAD"][kind] if density else b""
+    return device["_buffer"](size, chars, bad, round(1 / density) if density else 0)
+
+
+@pytest.mark.parametrize("content", list(CONTENT))
+@pytest.mark.parametrize("kind", ["invalid", "truncated", "overlong"])
+@pytest.mark.parametrize("density", [0.001, 0.01, 0.1, 0.5])
+def test_reported_count_matches_buffer(device, content, kind, density):
+    for size in SIZES:
+        buf, bad = build(device, size, content, kind, density)
+        assert len(buf) == size
+        assert buf.count(device["_BAD"][kind]) == bad
+
+
+@pytest.mark.parametrize("content", list(CONTENT))
+@pytest.mark.parametrize("density", [0.001, 0.01, 0.1])
+def test_density_holds_across_the_buffer(device, content, density):
+    # Characters of the largest buffer: every malformed sequence is one position
+    buf, bad = build(device, SIZES[-1], content, "invalid", density)
+    positions = len(buf.decode("utf-8", "replace"))
+    assert bad / positions == pytest.approx(density, rel=0.05)
+
+
+def test_low_density_reaches_large_buffers(device):
+    # One malformed sequence per 1000 characters must not get lost in repetition
+    buf, bad = build(device, 65536, "mixed", "invalid", 0.001)
+    assert bad > 0
+
+
+@pytest.mark.parametrize("content", list(CONTENT))
+def test_valid_input_decodes_strictly(device, content):
+    for size in SIZES:
+        buf, bad = build(device, size, content, "", 0)
+        assert bad == 0
+        buf.decode("utf-8")
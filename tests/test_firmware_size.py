@@ -0,0 +1,167 @@
+"""ELF parsing of firmware_size: Berkeley section sizes and per-symbol attribution."""
+
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from firmware_size import ElfFile, diff_symbols, symbol_label
+
+SHT_PROGBITS, SHT_SYMTAB, SHT_STRTAB, SHT_NOBITS = 1, 2, 3, 8
+WRITE, ALLOC, EXEC = 0x1, 0x2, 0x4
+LOCAL, GLOBAL = 0, 1
+NOTYPE, OBJECT, FUNC, FILE = 0, 1, 2, 4
+SHN_ABS = 0xFFF1
+
+# (name, type, flags, size) of the sections after the null section; .symtab,
+# .strtab and .shstrtab follow
+SECTIONS = [
+    (".text", SHT_PROGBITS, ALLOC | EXEC, 300),
+    (".rodata", SHT_PROGBITS, ALLOC, 40),
+    (".data", SHT_PROGBITS, ALLOC | WRITE, 24),
+    (".bss", SHT_NOBITS, ALLOC | WRITE, 1000),
+    (".comment", SHT_PROGBITS, 0, 17),
+]
+
+# (name, binding, type, section index, size)
+SYMBOLS = [
+    ("main.c", LOCAL, FILE, SHN_ABS, 0),
+    ("buf.0", LOCAL, OBJECT, 3, 8),
+    ("buf.1", LOCAL, OBJECT, 3, 4),
+    ("table", LOCAL, OBJECT, 2, 32),
+    ("str_center", GLOBAL, FUNC, 1, 120),
+    ("label", GLOBAL, NOTYPE, 1, 0),
+    ("other.c", LOCAL, FILE, SHN_ABS, 0),
+    ("buf.2", LOCAL, OBJECT, 4, 512),
+    ("heap", GLOBAL, OBJECT, 4, 256),
+    ("empty", GLOBAL, FUNC, 1, 0),
+    ("absolute", GLOBAL, OBJECT, SHN_ABS, 4),
+    ("note", GLOBAL, OBJECT, 5, 8),
+]
+
+
+def strtab(names: list[str]) -> tuple[bytes, list[int]]:
+    data, offsets = b"\0", []
+    for name in names:
+        offsets.append(len(data))
+        data += name.encode("utf-8") + b"\0"
+    return data, offsets
+
+
+def build_elf(is64: bool, big: bool, sections=SECTIONS, symbols=SYMBOLS) -> bytes:
+    """A minimal relocatable ELF with the given sections and a symbol table."""
+    endian = ">" if big else "<"
+    symbol_names, symbol_offsets = strtab([s[0] for s in symbols])
+    entries = [b"\0" * (24 if is64 else 16)]
+    for (_, bind, kind, shndx, size), name in zip(symbols, symbol_offsets):
+        info = bind << 4 | kind
+        if is64:
+            entries.append(struct.pack(endian + "IBBHQQ", name, info, 0, shndx, 0, size))
+        else:
+            entries.append(struct.pack(endian + "IIIBBH", name, 0, size, info, 0, shndx))
+    symtab = b"".join(entries)
+
+    contents = [
+        (name, type_, flags, b"" if type_ == SHT_NOBITS else b"\xa5" * size, size, 0, 0)
+        for name, type_, flags, size in sections
+    ]
+    first = len(sections) + 1
+    contents.append((".symtab", SHT_SYMTAB, 0, symtab, len(symtab), first + 1, len(entries[0])))
+    contents.append((".strtab", SHT_STRTAB, 0, symbol_names, len(symbol_names), 0, 0))
+    section_names, name_offsets = strtab([c[0] for c in contents] + [".shstrtab"])
+    contents.append((".shstrtab", SHT_STRTAB, 0, section_names, len(section_names), 0, 0))
+
+    header_size, shentsize = (64, 64) if is64 else (52, 40)
+    body = b""
+    headers = [b"\0" * shentsize]
+    for (_, type_, flags, data, size, link, entsize), name in zip(contents, name_offsets):
+        offset = header_size + len(body)
+        body += data
+        fields = (name, type_, flags, 0, offset, size, link, 0, 1, entsize)
+        headers.append(struct.pack(endian + ("IIQQQQIIQQ" if is64 else "I" * 10), *fields))
+
+    shoff = header_size + len(body)
+    header = bytearray(header_size)
+    header[:7] = b"\x7fELF" + bytes([2 if is64 else 1, 2 if big else 1, 1])
+    if is64:
+        struct.pack_into(endian + "Q", header, 0x28, shoff)
+        struct.pack_into(endian + "HHH", header, 0x3A, shentsize, len(headers), len(headers) - 1)
+    else:
+        struct.pack_into(endian + "I", header, 0x20, shoff)
+        struct.pack_into(endian + "HHH", header, 0x2E, shentsize, len(headers), len(headers) - 1)
+    return bytes(header) + body + b"".join(headers)
+
+
+@pytest.fixture(params=[(False, False), (False, True), (True, False), (True, True)])
+def elf(request, tmp_path):
+    is64, big = request.param
+    path = tmp_path / "firmware.elf"
+    path.write_bytes(build_elf(is64, big))
+    return ElfFile(path)
+
+
+def test_berkeley_section_sizes(elf):
+    # Read-only allocated sections are text, writable ones data, without contents bss
+    assert elf.sizes == {"text": 340, "data": 24, "bss": 1000}
+
+
+def test_sized_functions_and_objects(elf):
+    assert elf.symbols == {
+        ("buf", "main.c"): ("data", 12),  # buf.0 + buf.1: numbered copies merged
+        ("table", "main.c"): ("text", 32),
+        ("str_center", ""): ("text", 120),
+        ("buf", "other.c"): ("bss", 512),
+        ("heap", ""): ("bss", 256),
+    }
+
+
+def test_not_an_elf_file(tmp_path):
+    path = tmp_path / "firmware.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError, match="not an ELF file"):
+        ElfFile(path)
+
+
+def test_diff_symbols(tmp_path):
+    old_path, new_path = tmp_path / "old.elf", tmp_path / "new.elf"
+    old_path.write_bytes(build_elf(False, False))
+    grown = [
+        (name, bind, kind, shndx, 272 if name == "str_center" else size)
+        for name, bind, kind, shndx, size in SYMBOLS
+        if name != "heap"
+    ]
+    grown.append(("utf8_check", GLOBAL, FUNC, 1, 64))
+    new_path.write_bytes(build_elf(False, False, symbols=grown))
+    assert diff_symbols(ElfFile(old_path), ElfFile(new_path)) == [
+        ("bss", "heap", 256, 0),
+        ("text", "str_center", 120, 272),
+        ("text", "utf8_check", 0, 64),
+    ]
+
+
+def test_symbol_label():
+    assert symbol_label(("buf", "main.c")) == "main.c:buf"
+    assert symbol_label(("heap", "")) == "heap"
+
+
+@pytest.mark.skipif(not (shutil.which("cc") and shutil.which("size")), reason="needs cc and size")
+def test_sizes_match_binutils(tmp_path):
+    source = tmp_path / "probe.c"
+    source.write_text(
+        "static char buf[64];\n"
+        "int counter = 3;\n"
+        'const char text[] = "caf\\xc3\\xa9";\n'
+        "int touch(int i) { buf[i] = text[i]; return counter + buf[i]; }\n",
+        encoding="ascii",
+    )
+    obj = tmp_path / "probe.o"
+    subprocess.run(["cc", "-c", "-O0", "-o", str(obj), str(source)], check=True)
+    out = subprocess.run(["size", str(obj)], check=True, capture_output=True, text=True).stdout
+    text, data, bss = map(int, out.splitlines()[1].split()[:3])
+    elf = ElfFile(obj)
+    assert elf.sizes == {"text": text, "data": data, "bss": bss}
+    assert elf.symbols[("touch", "")][0] == "text"
+    assert elf.symbols[("text", "")] == ("text", 6)
+    assert elf.symbols[("counter", "")] == ("data", 4)
+    assert elf.symbols[("buf", "probe.c")] == ("bss", 64)
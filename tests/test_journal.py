@@ -0,0 +1,98 @@
+"""Checkpoint journal of unicode_test: resume replay and run parameter checks."""
+
+import json
+
+import pytest
+
+from unicode_test import TEST_DIR, Journal
+
+PARAMS = {"target": "COM27", "dest_base": "/remote_data", "mode": "cli", "corpus": "abc"}
+A = TEST_DIR / "Edge_Cases" / "a.txt"
+B = TEST_DIR / "Edge_Cases" / "b.txt"
+C = TEST_DIR / "Edge_Cases" / "c.txt"
+
+
+@pytest.fixture
+def path(tmp_path):
+    """An interrupted run: cp of A and B completed, cp of C in flight."""
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(str(path), PARAMS)
+    journal.begin("cp", A)
+    journal.finish("cp", A, (0, "", ""))
+    journal.begin("cp", B)
+    journal.finish("cp", B, (1, "", "OSError: [Errno 22] EINVAL"))
+    journal.begin("cp", C)
+    journal.close()
+    return path
+
+
+def test_resume_replays_completed_operations(path):
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.mismatch == ""
+    assert journal.result("cp", A) == (0, "", "")
+    assert journal.result("cp", B) == (1, "", "OSError: [Errno 22] EINVAL")
+    assert journal.result("cat", A) is None
+    journal.close()
+
+
+def test_resume_reruns_the_operation_in_flight(path):
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.in_flight == {("cp", "Edge_Cases/c.txt")}
+    assert journal.result("cp", C) is None
+    journal.close()
+
+
+def test_resume_appends_to_the_journal(path):
+    journal = Journal(str(path), PARAMS, resume=True)
+    journal.begin("cp", C)
+    journal.finish("cp", C, (0, "", ""))
+    journal.close()
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.in_flight == set()
+    assert len(journal.completed) == 3
+    journal.close()
+
+
+def test_resume_ignores_a_torn_last_line(path):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "cp", "file": "Edge_Cases/c.txt", "sta')
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.mismatch == ""
+    assert len(journal.completed) == 2
+    journal.close()
+
+
+@pytest.mark.parametrize("key", sorted(PARAMS))
+def test_resume_refuses_a_journal_of_another_run(path, key):
+    params = dict(PARAMS, **{key: "other"})
+    journal = Journal(str(path), params, resume=True)
+    assert journal.mismatch == f"different {key}"
+    assert journal.completed == {} and journal.in_flight == set()
+    journal.close()
+    # Started over for this run
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"state": "header", **params}]
+
+
+def test_resume_refuses_a_journal_without_header(path):
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    path.write_text("".join(lines[1:]), encoding="utf-8")
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.mismatch == "no run parameters"
+    assert journal.completed == {}
+    journal.close()
+
+
+def test_resume_without_journal_starts_one(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.mismatch == "" and journal.completed == {}
+    journal.close()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"state": "header", **PARAMS}
+
+
+def test_new_run_starts_the_journal_over(path):
+    Journal(str(path), PARAMS).close()
+    journal = Journal(str(path), PARAMS, resume=True)
+    assert journal.completed == {} and journal.in_flight == set()
+    journal.close()
@@ -0,0 +1,97 @@
+"""Incremental refresh of the test_data corpus manifest."""
+
+import hashlib
+import json
+import os
+
+import pytest
+
+import unicode_test
+from unicode_test import CorpusManifest
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    root = tmp_path / "test_data"
+    (root / "CJK").mkdir(parents=True)
+    (root / ".git").mkdir()
+    (root / "CJK" / "你好_hello.txt").write_text("你好\n", encoding="utf-8")
+    (root / "😀_emoji.txt").write_text("emoji\n", encoding="utf-8")
+    (root / "readme.md").write_text("skipped\n", encoding="utf-8")
+    (root / "helper.py").write_text("skipped\n", encoding="utf-8")
+    (root / ".git" / "HEAD").write_text("skipped\n", encoding="utf-8")
+    monkeypatch.setattr(unicode_test, "TEST_DIR", root)
+    return root
+
+
+def manifest(corpus) -> CorpusManifest:
+    return CorpusManifest(corpus / "manifest.json")
+
+
+def test_first_refresh_indexes_the_corpus(corpus):
+    m = manifest(corpus)
+    assert m.refresh() == 2
+    assert sorted(m.entries) == ["CJK/你好_hello.txt", "😀_emoji.txt"]
+    assert m.dirs == ["CJK"]
+    entry = m.entries["CJK/你好_hello.txt"]
+    assert entry["sha256"] == hashlib.sha256("你好\n".encode("utf-8")).hexdigest()
+    assert entry["size"] == len("你好\n".encode("utf-8"))
+    assert any("Outside BMP" in issue for issue in m.entries["😀_emoji.txt"]["issues"])
+    assert m.files() == [corpus / "CJK" / "你好_hello.txt", corpus / "😀_emoji.txt"]
+
+
+def test_unchanged_corpus_is_not_reindexed_or_rewritten(corpus, monkeypatch):
+    manifest(corpus).refresh()
+    m = manifest(corpus)
+    assert len(m.entries) == 2
+    monkeypatch.setattr(m, "describe", pytest.fail)
+    monkeypatch.setattr(m, "save", pytest.fail)
+    assert m.refresh() == 0
+
+
+def test_only_changed_files_are_reindexed(corpus):
+    manifest(corpus).refresh()
+    path = corpus / "😀_emoji.txt"
+    path.write_text("changed content\n", encoding="utf-8")
+    m = manifest(corpus)
+    assert m.refresh() == 1
+    assert m.entries["😀_emoji.txt"]["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert manifest(corpus).entries == m.entries
+
+
+def test_same_size_with_new_mtime_is_reindexed(corpus):
+    manifest(corpus).refresh()
+    path = corpus / "😀_emoji.txt"
+    path.write_text("EMOJI\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    m = manifest(corpus)
+    assert m.refresh() == 1
+    assert m.entries["😀_emoji.txt"]["sha256"] == hashlib.sha256(b"EMOJI\n").hexdigest()
+
+
+def test_removed_files_and_folders_are_dropped(corpus):
+    manifest(corpus).refresh()
+    (corpus / "CJK" / "你好_hello.txt").unlink()
+    (corpus / "CJK").rmdir()
+    m = manifest(corpus)
+    assert m.refresh() == 0
+    assert sorted(m.entries) == ["😀_emoji.txt"] and m.dirs == []
+    assert sorted(manifest(corpus).entries) == ["😀_emoji.txt"]
+
+
+def test_other_manifest_version_is_rebuilt(corpus):
+    manifest(corpus).refresh()
+    path = corpus / "manifest.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["version"] = CorpusManifest.VERSION + 1
+    path.write_text(json.dumps(data), encoding="utf-8")
+    m = manifest(corpus)
+    assert m.entries == {}
+    assert m.refresh() == 2
+
+
+def test_entry_of_an_unindexed_file(corpus):
+    m = manifest(corpus)
+    path = corpus / "CJK" / "你好_hello.txt"
+    assert m.entry(path)["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
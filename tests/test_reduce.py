@@ -0,0 +1,90 @@
+"""ddmin reduction of failing filenames (--reduce), driven by host-side predicates."""
+
+import random
+
+import pytest
+
+from unicode_test import TEST_DIR, Target, ddmin, reduce_failures
+
+
+def reduce(chars: str, fails, rounds: list = None) -> str:
+    """Run ddmin() to the end, answering each round with fails(candidate)."""
+    reduction = ddmin(chars)
+    candidates = next(reduction)
+    try:
+        while True:
+            if rounds is not None:
+                rounds.append(candidates)
+            candidates = reduction.send([fails(c) for c in candidates])
+    except StopIteration as stop:
+        return stop.value
+
+
+def test_single_trigger_character():
+    assert reduce("ab😀cdefgh", lambda s: "😀" in s) == "😀"
+
+
+def test_keeps_every_character_needed_in_order():
+    assert reduce("xaxxxxzx", lambda s: "a" in s and "z" in s) == "az"
+
+
+def test_failure_that_does_not_reproduce():
+    assert reduce("😀_User_🎉", lambda s: False) is None
+
+
+def test_already_minimal():
+    assert reduce("abc", lambda s: s == "abc") == "abc"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_result_is_one_minimal(seed):
+    rng = random.Random(seed)
+    chars = "".join(rng.choice("abcdefgh😀🎉é中") for _ in range(rng.randint(1, 40)))
+    needed = set(rng.sample(sorted(set(chars)), rng.randint(1, min(3, len(set(chars))))))
+
+    def fails(s):
+        return needed <= set(s)
+
+    result = reduce(chars, fails)
+    assert fails(result)
+    assert all(not fails(result[:i] + result[i + 1 :]) for i in range(len(result)))
+    # A subsequence of the original name
+    it = iter(chars)
+    assert all(c in it for c in result)
+
+
+class ProbeSession:
+    """Stands in for the device: names with characters outside the BMP fail with EINVAL."""
+
+    def __init__(self):
+        self.batches = 0
+
+    def bulk_put(self, dirs, files, probe=False):
+        self.batches += 1
+        return [
+            "OSError: [Errno 22] EINVAL" if any(ord(c) > 0xFFFF for c in path) else ""
+            for path, _ in files
+        ]
+
+    def run(self, *args):
+        return 0, "", ""
+
+
+def test_reduce_failures_batches_all_files_per_round(capsys):
+    target = Target("probe")
+    target.session = ProbeSession()
+    files = [
+        TEST_DIR / "Emoji_Symbols" / "😀_User_🎉.txt",
+        TEST_DIR / "Edge_Cases" / "𝐇𝐞𝐥𝐥𝐨_mathbold.txt",
+    ]
+    err = "OSError: [Errno 22] EINVAL"
+    minimal = reduce_failures(target, [(f, err) for f in files])
+    assert sorted(stem for _, stem in minimal) == ["𝐇", "😀"]
+    # Both reductions advance together: no more round trips than the longer one alone
+    alone = []
+    for f in files:
+        rounds = []
+        reduce(f.stem, lambda s: any(ord(c) > 0xFFFF for c in s), rounds)
+        alone.append(len(rounds))
+    assert 0 < target.session.batches <= max(alone) < sum(alone)
+    assert "MINIMAL TRIGGERS" in capsys.readouterr().out
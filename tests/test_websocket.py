@@ -0,0 +1,116 @@
+"""WebSocket framing of fake_device and webrepl_fuzz, and the fuzzer's paste cases."""
+
+import contextlib
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from fake_device import WS_BINARY, WS_CONTINUATION, WS_TEXT, ws_frame, ws_mask, ws_parse
+from webrepl_fuzz import TEXT, WebSocketClient, bulk_code, paste_code, split_cases
+
+# RFC 6455 section 5.7 examples
+HELLO = bytes.fromhex("810548656c6c6f")
+HELLO_MASKED = bytes.fromhex("818537fa213d7f9f4d5158")
+
+
+class Socket:
+    def __init__(self):
+        self.sent = b""
+
+    def sendall(self, data: bytes):
+        self.sent += data
+
+
+def client_frame(payload: bytes, opcode: int = WS_TEXT, fin: bool = True) -> bytes:
+    """What WebSocketClient.send() puts on the wire."""
+    client = WebSocketClient.__new__(WebSocketClient)
+    client.sock = Socket()
+    client.send(payload, opcode, fin)
+    return client.sock.sent
+
+
+def test_rfc_examples():
+    assert ws_frame(b"Hello") == HELLO
+    assert ws_parse(HELLO) == (True, WS_TEXT, b"Hello", b"")
+    assert ws_parse(HELLO_MASKED) == (True, WS_TEXT, b"Hello", b"")
+
+
+def test_mask_is_its_own_inverse():
+    key = bytes.fromhex("37fa213d")
+    payload = "naïve 你好 😀".encode("utf-8")
+    assert ws_mask(payload, key) != payload
+    assert ws_mask(ws_mask(payload, key), key) == payload
+    assert ws_mask(b"", key) == b""
+
+
+@pytest.mark.parametrize(
+    "n, header",
+    [(125, "827d"), (126, "827e007e"), (0xFFFF, "827effff"), (0x10000, "827f0000000000010000")],
+)
+def test_frame_length_encodings(n, header):
+    payload = bytes(range(256)) * (n // 256) + bytes(range(n % 256))
+    frame = ws_frame(payload, WS_BINARY)
+    assert frame.hex().startswith(header)
+    assert ws_parse(frame) == (True, WS_BINARY, payload, b"")
+
+
+@pytest.mark.parametrize("n", [0, 1, 125, 126, 0x10000])
+def test_client_frames_are_masked(n):
+    payload = b"\xf0\x9f\x98\x80" * (n // 4) + b"a" * (n % 4)
+    frame = client_frame(payload)
+    assert frame[1] & 0x80
+    assert ws_parse(frame) == (True, WS_TEXT, payload, b"")
+
+
+def test_continuation_frame_without_fin():
+    frame = client_frame("你".encode("utf-8")[:2], WS_CONTINUATION, fin=False)
+    assert ws_parse(frame) == (False, WS_CONTINUATION, b"\xe4\xbd", b"")
+
+
+def test_incomplete_frames_wait_for_more_data():
+    for frame in (HELLO_MASKED, ws_frame(b"x" * 300), ws_frame(b"x" * 0x10000)):
+        for cut in range(min(len(frame), 300)):
+            assert ws_parse(frame[:cut]) is None
+
+
+def test_frames_split_off_in_order():
+    data = ws_frame(b"one") + HELLO_MASKED + ws_frame(b"three" * 40)
+    payloads = []
+    while data:
+        _, _, payload, data = ws_parse(data)
+        payloads.append(payload)
+    assert payloads == [b"one", b"Hello", b"three" * 40]
+
+
+def test_paste_code_prints_its_expected_output():
+    code, expected = paste_code(TEXT)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        exec(code.decode("utf-8"), {})
+    assert out.getvalue() == expected
+
+
+@pytest.mark.parametrize("size", [1, 1000, 4096, 16384])
+def test_bulk_code_fits_its_size(size):
+    code, _ = bulk_code(size)
+    one = len(paste_code(TEXT)[0])
+    if size <= one:
+        assert len(code) == one
+    else:
+        assert len(code) <= size
+        assert len(bulk_code(size + len(code))[0]) > size
+
+
+def test_split_cases_cover_the_code():
+    code, _ = paste_code(TEXT)
+    args = SimpleNamespace(seed=1, random=5, max_frame=7)
+    cases = split_cases(code, ["offsets", "bytewise", "random"], args)
+    assert len(cases) == 1 + (len(code) - 1) + 1 + 5
+    for case in cases:
+        assert b"".join(case["pieces"]) == code
+        assert all(case["pieces"])
+        cuts_inside = [k for k in case["cuts"] if code[k] & 0xC0 == 0x80]
+        assert case["inside"] == len(cuts_inside)
+    bytewise = next(c for c in cases if c["name"] == "bytewise")
+    assert bytewise["inside"] == len(code) - len(code.decode("utf-8"))
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Transport benchmark for mpremote connections.
+
+Measures per-operation latency (exec round trip, mkdir, stat) and bulk
+throughput (cp, cat) for each target and transport mode, with ASCII against
+multi-byte UTF-8 names and payloads. Results can be saved as a JSON baseline
+and compared against on later runs to flag regressions.
+
+Modes:
+    cli      one `mpremote connect <target> ...` process per operation
+    session  one open raw-REPL connection (mpsession.Session) for all operations
+
+The --sweep mode instead transfers generated large files of dense multi-byte
+UTF-8 text over a session, sweeping file size and transfer chunk size, and
+reports bytes/s plus host and device memory for each point.
+
+Usage:
+    python transport_bench.py -t COM27 socket://localhost:2218 rfc2217://localhost:2217
+    python transport_bench.py -t socket://localhost:2218 --save-baseline bench_baseline.json
+    python transport_bench.py -t socket://localhost:2218 --baseline bench_baseline.json
+    python transport_bench.py -t socket://localhost:2218 --sweep --sizes 65536 1048576
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from mpsession import MPREMOTE_VERSION
+from unicode_test import Target, run_mpremote
+
+BENCH_DIR = "/bench_data"
+BASELINE_FILE = "bench_baseline.json"
+
+# Name and payload flavours: plain ASCII against 2-, 3- and 4-byte UTF-8
+NAMES = {
+    "ascii": "bench_file",
+    "utf8": "bénch_ファイル_😀",
+}
+PAYLOAD_TEXT = {
+    "ascii": "The quick brown fox jumps over the lazy dog. ",
+    "utf8": "Ünïcödé ключ 中文字符 テスト 😀🎉𓂀 ",
+}
+
+# Codepoint ranges for generated --sweep content, by UTF-8 width
+CONTENT_RANGES = {
+    "ascii": [(0x21, 0x7E)],
+    "utf8-2": [(0x0410, 0x044F), (0x00C0, 0x00FF)],  # Cyrillic, Latin-1
+    "utf8-3": [(0x4E00, 0x9FFF), (0x3040, 0x30FF)],  # CJK, kana
+    "utf8-4": [(0x1F300, 0x1F5FF), (0x13000, 0x1342E)],  # Emoji, hieroglyphs
+}
+SWEEP_SIZES = [65536, 262144, 1048576, 4194304]
+SWEEP_CHUNK_SIZES = [256, 1024, 4096]
+
+# Device heap probe for --sweep: free heap after a collection, and after the
+# transfer (before anything collects the garbage it left)
+DEVICE_MEM_SCRIPT = "import gc\ngc.collect()\nprint(gc.mem_free())"
+DEVICE_MEM_AFTER_SCRIPT = "import gc\nprint(gc.mem_free())"
+
+# Removes everything under the benchmark directory on the device
+CLEANUP_SCRIPT = """\
+import os
+def _rm(d):
+ for e in os.ilistdir(d):
+  p = d + '/' + e[0]
+  if e[1] & 0x4000:
+   _rm(p)
+   os.rmdir(p)
+  else:
+   os.remove(p)
+"""
+
+# Metrics where bigger is better; all others are latencies (lower is better)
+THROUGHPUT_OPS = ("cp", "cat", "write", "read")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark mpremote transports: latency and throughput per target",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python transport_bench.py -t COM27
+    python transport_bench.py -t /dev/ttyUSB0 socket://localhost:2218 rfc2217://localhost:2217
+    python transport_bench.py -t socket://localhost:2218 --modes session --repeat 50
+    python transport_bench.py -t socket://localhost:2218 --save-baseline bench_baseline.json
+    python transport_bench.py -t socket://localhost:2218 --baseline bench_baseline.json --threshold 0.25
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        nargs="+",
+        default=["auto"],
+        help="Target connection(s) to benchmark (default: auto), e.g. COM27, /dev/ttyUSB0, "
+        "socket://localhost:2218, rfc2217://localhost:2217.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["cli", "session"],
+        default=["cli", "session"],
+        help="Transport modes to measure (default: both).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=10,
+        help="Repetitions per operation; the median is reported (default: 10).",
+    )
+    parser.add_argument(
+        "--payload-size",
+        type=int,
+        default=16384,
+        help="Payload size in bytes for the cp/cat throughput runs (default: 16384).",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Large-payload mode: transfer generated files of --content text over a session for "
+        "every --sizes x --chunk-sizes point, reporting bytes/s and host/device memory.",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=SWEEP_SIZES,
+        help=f"File sizes in bytes for --sweep (default: {' '.join(map(str, SWEEP_SIZES))}).",
+    )
+    parser.add_argument(
+        "--chunk-sizes",
+        nargs="+",
+        type=int,
+        default=SWEEP_CHUNK_SIZES,
+        help="Bytes per raw-REPL transfer step for --sweep "
+        f"(default: {' '.join(map(str, SWEEP_CHUNK_SIZES))}; the mpremote CLI always uses 256).",
+    )
+    parser.add_argument(
+        "--content",
+        nargs="+",
+        choices=list(CONTENT_RANGES),
+        default=["utf8-3", "utf8-4"],
+        help="Generated text for --sweep, by UTF-8 width (default: utf8-3 utf8-4).",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        metavar="FILE",
+        nargs="?",
+        const=BASELINE_FILE,
+        help=f"Save the results as a JSON baseline (default file: {BASELINE_FILE}).",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Compare against a saved baseline and exit with status 1 on regressions.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative change that counts as a regression (default: 0.2 = 20%%).",
+    )
+    return parser.parse_args()
+
+
+def make_payload(kind: str, size: int) -> bytes:
+    """Text payload of about size bytes, cut on a character boundary."""
+    text = PAYLOAD_TEXT[kind]
+    data = (text * (size // len(text.encode("utf-8")) + 1)).encode("utf-8")[:size]
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+def check(result: tuple[int, str, str], what: str):
+    """Raise when an operation failed; a benchmark of failing operations is meaningless."""
+    code, out, err = result
+    if code != 0:
+        raise RuntimeError(f"{what} failed: {err.strip()[:200]}")
+    return out
+
+
+def timed(func, repeat: int) -> list[float]:
+    """Run func(i) repeat times and return the durations in seconds."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times: list[float], nbytes: int = 0) -> dict:
+    """Latency summary in ms, or throughput in bytes/s when nbytes is given."""
+    if nbytes:
+        rates = [nbytes / t for t in times]
+        return {
+            "unit": "B/s",
+            "median": statistics.median(rates),
+            "min": min(rates),
+            "max": max(rates),
+        }
+    ms = [t * 1000 for t in times]
+    return {"unit": "ms", "median": statistics.median(ms), "min": min(ms), "max": max(ms)}
+
+
+def stat_op(target: Target, path: str) -> tuple[int, str, str]:
+    """os.stat() of a remote path; mpremote has no stat command, so the CLI mode uses exec."""
+    if target.session is not None:
+        target.session.transport.fs_stat(path)
+        return 0, "", ""
+    return run_mpremote(target, "exec", f"import os\nos.stat({path!r})")
+
+
+def bench_target(target: Target, repeat: int, payload_size: int, tmp: Path) -> dict:
+    """Run every benchmark on one target in its current mode. Returns {metric: summary}."""
+    results = {}
+    base = BENCH_DIR
+    # Leftovers of an aborted run would make mkdir fail
+    run_mpremote(
+        target, "exec", CLEANUP_SCRIPT + f"try:\n _rm({base!r})\nexcept OSError:\n pass\n"
+    )
+    run_mpremote(target, "mkdir", f":{base}")
+
+    results["exec"] = summarize(
+        timed(lambda i: check(run_mpremote(target, "exec", "pass"), "exec"), repeat)
+    )
+
+    for kind, name in NAMES.items():
+        results[f"mkdir/{kind}-name"] = summarize(
+            timed(
+                lambda i: check(run_mpremote(target, "mkdir", f":{base}/{name}_{i}"), "mkdir"),
+                repeat,
+            )
+        )
+        results[f"stat/{kind}-name"] = summarize(
+            timed(lambda i: check(stat_op(target, f"{base}/{name}_{i}"), "stat"), repeat)
+        )
+
+    for name_kind, name in NAMES.items():
+        for data_kind in PAYLOAD_TEXT:
+            data = make_payload(data_kind, payload_size)
+            local = tmp / f"{name}.{data_kind}"
+            local.write_bytes(data)
+            remote = f":{base}/{name}.{data_kind}"
+            key = f"{name_kind}-name/{data_kind}-data"
+
+            results[f"cp/{key}"] = summarize(
+                timed(
+                    lambda i: check(run_mpremote(target, "cp", str(local), remote), "cp"), repeat
+                ),
+                len(data),
+            )
+
+            def cat(i):
+                out = check(run_mpremote(target, "cat", remote), "cat")
+                if out.encode("utf-8") != data:
+                    raise RuntimeError(f"cat returned {len(out)} chars, content differs")
+
+            results[f"cat/{key}"] = summarize(timed(cat, repeat), len(data))
+
+    run_mpremote(target, "exec", CLEANUP_SCRIPT + f"_rm({base!r})\nos.rmdir({base!r})")
+    return results
+
+
+def generate_text(kind: str, size: int) -> bytes:
+    """Deterministic text of random kind characters, size bytes of UTF-8 with a newline every 64 chars."""
+    rng = random.Random(f"{kind}:{size}")
+    ranges = CONTENT_RANGES[kind]
+    width = len(chr(ranges[0][0]).encode("utf-8"))
+    count = size // width + 1
+    chars = [chr(rng.randint(*rng.choice(ranges))) for _ in range(count)]
+    for i in range(63, count, 64):
+        chars[i] = "\n"
+    data = "".join(chars).encode("utf-8")[:size]
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+def device_free(target: Target, script: str) -> int:
+    """Free device heap in bytes as printed by script, or -1 when it cannot be read."""
+    try:
+        return int(target.session.transport.exec(script).strip())
+    except Exception:
+        return -1
+
+
+def transfer(target: Target, op: str, path: str, data: bytes, chunk_size: int) -> float:
+    """One fs_writefile/fs_readfile over the session; returns the duration in seconds."""
+    transport = target.session.transport
+    start = time.perf_counter()
+    if op == "write":
+        transport.fs_writefile(path, data, chunk_size=chunk_size)
+    else:
+        contents = transport.fs_readfile(path, chunk_size=chunk_size)
+        if contents != data:
+            raise RuntimeError(f"read back {len(contents)} bytes, content differs")
+    return time.perf_counter() - start
+
+
+def sweep_target(
+    target: Target, sizes: list[int], chunk_sizes: list[int], kinds: list[str]
+) -> dict:
+    """Run the size x chunk-size sweep on one target over a session. Returns {metric: summary}.
+
+    Each point is transferred twice: once for the throughput, once under
+    tracemalloc for the host peak (tracing slows the host side down). The device
+    figure is the heap still in use after the untraced transfer (gc.mem_free()
+    before minus after), not a peak: whatever a collection freed meanwhile is
+    not counted.
+    """
+    from mpremote.transport import TransportError
+
+    results = {}
+    base = BENCH_DIR
+    run_mpremote(
+        target, "exec", CLEANUP_SCRIPT + f"try:\n _rm({base!r})\nexcept OSError:\n pass\n"
+    )
+    run_mpremote(target, "mkdir", f":{base}")
+
+    for kind in kinds:
+        for size in sizes:
+            data = generate_text(kind, size)
+            path = f"{base}/large_{kind}_{size}.txt"
+            for chunk_size in chunk_sizes:
+                for op in ("write", "read"):
+                    metric = f"{op}/{kind}/{size}/{chunk_size}"
+                    print(f"  {metric}", end=" ")
+                    sys.stdout.flush()
+                    try:
+                        free_before = device_free(target, DEVICE_MEM_SCRIPT)
+                        duration = transfer(target, op, path, data, chunk_size)
+                        free_after = device_free(target, DEVICE_MEM_AFTER_SCRIPT)
+
+                        tracemalloc.start()
+                        transfer(target, op, path, data, chunk_size)
+                        host_peak = tracemalloc.get_traced_memory()[1]
+                    except (OSError, RuntimeError, TransportError) as e:
+                        # MemoryError on the device arrives as a transport or filesystem error
+                        print(f"FAIL: {str(e).strip().splitlines()[-1][:60]}")
+                        target.session.drop()
+                        target.session.open()
+                        results[metric] = {"unit": "B/s", "median": 0, "error": str(e)[:200]}
+                        continue
+                    finally:
+                        tracemalloc.stop()
+
+                    summary = summarize([duration], len(data))
+                    summary["host_peak_kb"] = round(host_peak / 1024, 1)
+                    if free_before >= 0 and free_after >= 0:
+                        summary["device_heap_used_kb"] = round(
+                            (free_before - free_after) / 1024, 1
+                        )
+                    results[metric] = summary
+                    print(f"{summary['median'] / 1024:.1f} KB/s")
+            run_mpremote(
+                target, "exec", f"import os\ntry:\n os.remove({path!r})\nexcept OSError:\n pass"
+            )
+
+    run_mpremote(target, "exec", CLEANUP_SCRIPT + f"_rm({base!r})\nos.rmdir({base!r})")
+    return results
+
+
+def run_sweeps(args) -> dict:
+    """Run the large-payload sweep on every target. Returns {"target|session|metric": summary}."""
+    conns = [conn for value in args.target for conn in value.split(",") if conn]
+    results = {}
+    for conn in conns:
+        target = Target(conn)
+        print(f"Sweeping {conn}: sizes {args.sizes}, chunk sizes {args.chunk_sizes}...")
+        try:
+            target.open_session()
+            metrics = sweep_target(target, args.sizes, args.chunk_sizes, args.content)
+        except Exception as e:
+            print(f"  FAILED: {e}")
+            continue
+        finally:
+            target.close_session()
+        for metric, summary in metrics.items():
+            results[f"{conn}|session|{metric}"] = summary
+    return results
+
+
+def print_sweep(results: dict):
+    """Print the sweep points with throughput and memory."""
+    print("\n" + "=" * 100)
+    print("LARGE-PAYLOAD SWEEP")
+    print("=" * 100)
+    print(
+        f"{'target':<28} {'op':<6} {'content':<8} {'size':>9} {'chunk':>6} "
+        f"{'KB/s':>9} {'host peak KB':>13} {'dev used KB':>12}"
+    )
+    print("-" * 100)
+    for key, summary in results.items():
+        conn, _, metric = key.split("|")
+        op, kind, size, chunk_size = metric.split("/")
+        if "error" in summary:
+            rate = "FAIL"
+            host = device = ""
+        else:
+            rate = f"{summary['median'] / 1024:.1f}"
+            host = summary["host_peak_kb"]
+            device = summary.get("device_heap_used_kb", "?")
+        print(
+            f"{conn:<28} {op:<6} {kind:<8} {size:>9} {chunk_size:>6} "
+            f"{rate:>9} {host:>13} {device:>12}"
+        )
+
+
+def run_benchmarks(args) -> dict:
+    """Benchmark every target in every mode. Returns {"target|mode|metric": summary}."""
+    conns = [conn for value in args.target for conn in value.split(",") if conn]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for conn in conns:
+            for mode in args.modes:
+                target = Target(conn)
+                print(f"Benchmarking {conn} ({mode}, {args.repeat} repetitions)...")
+                try:
+                    if mode == "session":
+                        target.open_session()
+                    metrics = bench_target(target, args.repeat, args.payload_size, Path(tmp))
+                except Exception as e:
+                    print(f"  FAILED: {e}")
+                    continue
+                finally:
+                    target.close_session()
+                for metric, summary in metrics.items():
+                    results[f"{conn}|{mode}|{metric}"] = summary
+    return results
+
+
+def print_results(results: dict, baseline: dict = None, threshold: float = 0.2) -> list[str]:
+    """Print the results table, with the change against a baseline. Returns the regressions."""
+    regressions = []
+    print("\n" + "=" * 100)
+    print("TRANSPORT BENCHMARK")
+    print("=" * 100)
+    print(f"{'target':<28} {'mode':<8} {'metric':<32} {'median':>14} {'vs baseline':>14}")
+    print("-" * 100)
+    for key, summary in results.items():
+        conn, mode, metric = key.split("|")
+        if summary["unit"] == "ms":
+            value = f"{summary['median']:.1f} ms"
+        else:
+            value = f"{summary['median'] / 1024:.1f} KB/s"
+
+        change = ""
+        old = (baseline or {}).get(key)
+        if old and old["median"]:
+            ratio = summary["median"] / old["median"] - 1
+            change = f"{ratio:+.0%}"
+            throughput = metric.split("/")[0] in THROUGHPUT_OPS
+            if (throughput and ratio < -threshold) or (not throughput and ratio > threshold):
+                change += " REGRESSION"
+                regressions.append(key)
+        print(f"{conn:<28} {mode:<8} {metric:<32} {value:>14} {change:>14}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    if args.sweep:
+        results = run_sweeps(args)
+    else:
+        results = run_benchmarks(args)
+    if not results:
+        print("No benchmark completed")
+        sys.exit(1)
+
+    regressions = []
+    if args.sweep:
+        print_sweep(results)
+    if not args.sweep or baseline:
+        regressions = print_results(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        data = {
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "mpremote": MPREMOTE_VERSION,
+                "host": platform.platform(),
+                "python": platform.python_version(),
+                "repeat": args.repeat,
+                "payload_size": args.payload_size,
+                "sweep": args.sweep,
+            },
+            "results": results,
+        }
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        print(f"\nBaseline saved to: {args.save_baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}:")
+        for key in regressions:
+            print(f"  - {key}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Precomputed per-codepoint Unicode property table.
+
+One record per codepoint (U+0000..U+10FFFF) holding the general category, the
+Unicode block, the UTF-8 length and the issue flags used by analyze_filename().
+The table is built once from unicodedata and unicode_blocks, cached to disk
+(keyed by both their Unicode versions, which differ on newer Pythons) and
+memory-mapped on later runs, so analyzing a name is a lookup over its
+codepoint array instead of one unicodedata call per character.
+
+Usage:
+    table = property_table()
+    cps = codepoints("naïve=file.txt")
+    flags = table.flags(cps)            # bytes, one flag byte per character
+    table.categories(cps)               # ['Lu', 'Ll', ...]
+"""
+
+import mmap
+import os
+import sys
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+
+from unicode_blocks import BLOCKS
+from unicode_blocks import UNICODE_VERSION as BLOCKS_VERSION
+
+CODEPOINTS = 0x110000
+MAGIC = b"UPT1"
+HEADER_SIZE = 32
+CACHE_DIR = Path(__file__).parent
+
+# General category codes, indexed by the category byte of a record
+CATEGORIES = tuple(
+    "Cn Lu Ll Lt Lm Lo Mn Mc Me Nd Nl No Pc Pd Ps Pe Pi Pf Po Sm Sc Sk So Zs Zl Zp Cc Cf Cs Co".split()
+)
+
+# Block names, indexed by the block word of a record (0 = no block)
+BLOCK_NAMES = ("No_Block",) + tuple(name for _, _, name in BLOCKS)
+
+# Issue flag bits; bits 6-7 hold the UTF-8 length minus one
+OUTSIDE_BMP = 0x01
+COMBINING = 0x02
+FORMAT = 0x04
+PRIVATE_USE = 0x08
+CONTROL = 0x10
+ASCII_PUNCT = 0x20
+UTF8_SHIFT = 6
+
+# Flag bits and the analyze_filename() issue kinds they stand for
+ISSUE_LABELS = (
+    (OUTSIDE_BMP, "Outside BMP"),
+    (COMBINING, "Combining mark"),
+    (FORMAT, "Format char"),
+    (PRIVATE_USE, "Private use"),
+    (CONTROL, "Control char"),
+)
+ISSUE_FLAGS = OUTSIDE_BMP | COMBINING | FORMAT | PRIVATE_USE | CONTROL
+
+# Control characters flagged by analyze_filename() (tab, newline and CR are not)
+CONTROL_CHARS = "\x00\x01\x02\x03\x04\x05\x06\x07\x08\x0b\x0c\x0e\x0f"
+
+
+def table_version() -> str:
+    """Versions of the unicodedata and block data the table is built from."""
+    return f"{unicodedata.unidata_version}-blocks-{BLOCKS_VERSION}"
+
+
+def cache_path() -> Path:
+    """Table file for these Unicode versions and this byte order."""
+    return CACHE_DIR / f".unicode_props_{table_version()}_{sys.byteorder}.bin"
+
+
+def header() -> bytes:
+    """Table file header: magic and the Unicode versions it was built from."""
+    return MAGIC + table_version().encode().ljust(HEADER_SIZE - len(MAGIC), b"\0")
+
+
+def codepoints(text: str) -> memoryview:
+    """The codepoints of text as an unsigned int array (no per-character Python loop)."""
+    codec = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+    # surrogatepass: undecodable bytes in OS filenames arrive as lone surrogates
+    return memoryview(text.encode(codec, "surrogatepass")).cast("I")
+
+
+def build_table() -> bytes:
+    """Compute the table: header, category plane, flag plane, then the block plane (uint16)."""
+    cat_index = {cat: i for i, cat in enumerate(CATEGORIES)}
+    cats = bytearray(CODEPOINTS)
+    flags = bytearray(CODEPOINTS)
+
+    for cp in range(CODEPOINTS):
+        category = unicodedata.category(chr(cp))
+        cats[cp] = cat_index[category]
+        flag = (1 if cp < 0x80 else 2 if cp < 0x800 else 3 if cp < 0x10000 else 4) - 1
+        flag <<= UTF8_SHIFT
+        if cp > 0xFFFF:
+            flag |= OUTSIDE_BMP
+        if category[0] == "M":
+            flag |= COMBINING
+        elif category == "Cf":
+            flag |= FORMAT
+        elif category == "Co":
+            flag |= PRIVATE_USE
+        flags[cp] = flag
+
+    for c in CONTROL_CHARS:
+        flags[ord(c)] |= CONTROL
+    for cp in range(0x80):
+        c = chr(cp)
+        if not c.isalnum() and c not in "_.":
+            flags[cp] |= ASCII_PUNCT
+
+    blocks = array("H", bytes(2 * CODEPOINTS))
+    for i, (start, end, _) in enumerate(BLOCKS, 1):
+        blocks[start : end + 1] = array("H", [i]) * (end + 1 - start)
+
+    return header() + bytes(cats) + bytes(flags) + blocks.tobytes()
+
+
+class PropertyTable:
+    """Memory-mapped property table with array lookups."""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        self.category_plane = view[HEADER_SIZE : HEADER_SIZE + CODEPOINTS]
+        self.flag_plane = view[HEADER_SIZE + CODEPOINTS : HEADER_SIZE + 2 * CODEPOINTS]
+        self.block_plane = view[HEADER_SIZE + 2 * CODEPOINTS :].cast("H")
+
+    @classmethod
+    def load(cls, path: Path = None) -> "PropertyTable":
+        """Map the cached table, building and saving it first if missing or stale."""
+        path = path or cache_path()
+        expected = HEADER_SIZE + 4 * CODEPOINTS
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) == expected and mapped[:HEADER_SIZE] == header():
+                return cls(mapped)
+            mapped.close()
+        except (OSError, ValueError):
+            pass
+
+        data = build_table()
+        try:
+            tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            # Read-only checkout: keep the table in memory for this run
+            pass
+        return cls(data)
+
+    def category_ids(self, cps) -> bytes:
+        """Category index per codepoint."""
+        return bytes(map(self.category_plane.__getitem__, cps))
+
+    def categories(self, cps) -> list[str]:
+        """General category code per codepoint."""
+        return [CATEGORIES[i] for i in self.category_ids(cps)]
+
+    def flags(self, cps) -> bytes:
+        """Issue flag byte per codepoint (see the flag constants)."""
+        return bytes(map(self.flag_plane.__getitem__, cps))
+
+    def block_ids(self, cps) -> array:
+        """Block index per codepoint (into BLOCK_NAMES)."""
+        return array("H", map(self.block_plane.__getitem__, cps))
+
+    def blocks(self, cps) -> list[str]:
+        """Unicode block name per codepoint."""
+        return [BLOCK_NAMES[i] for i in self.block_ids(cps)]
+
+    def utf8_lengths(self, cps) -> bytes:
+        """UTF-8 encoded length per codepoint."""
+        return bytes((flag >> UTF8_SHIFT) + 1 for flag in self.flags(cps))
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def property_table() -> PropertyTable:
+    """The process-wide table, mapped on first use."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = PropertyTable.load()
+    return _table
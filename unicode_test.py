@@ -9,21 +9,543 @@ Usage:
     python unicode_test.py -t socket://localhost:2218  # Use socket
     python unicode_test.py --interactive           # Test console output (detects hangs)
     python unicode_test.py --skip-copy             # Skip copy, just test read/interactive
+    python unicode_test.py --session               # Reuse one connection for all operations
+    python unicode_test.py --reduce --session      # Find the minimal characters behind each failure
+    python unicode_test.py --bulk                  # Provision test_data in batched raw-REPL writes
+    python unicode_test.py -t COM27 COM28 socket://localhost:2218  # Run targets concurrently
+    python unicode_test.py --pool socket://localhost:2218 socket://localhost:2219  # Shard files
 """
 
 import argparse
+import ast
+import asyncio
+import csv
+import hashlib
+import io
+import json
 import os
+import re
+import shlex
+import socket
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unicodedata
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from mpsession import BULK_BATCH_SIZE, IDENTITY_SCRIPT, MPREMOTE_VERSION, Session
+from mptiming import PhaseTimings, instrumentable, phase_durations, read_marks, timed_command
+from unicode_props import (
+    ASCII_PUNCT,
+    CATEGORIES,
+    COMBINING,
+    CONTROL,
+    FORMAT,
+    ISSUE_FLAGS,
+    ISSUE_LABELS,
+    OUTSIDE_BMP,
+    PRIVATE_USE,
+    codepoints,
+    property_table,
+    table_version,
+)
+
 # Global settings (set by parse_args)
-CONN = "auto"
 DEST_BASE = "/remote_data"
 TEST_DIR = Path("test_data")
-RESULTS_FILE = "unicode_test_results.txt"
+MATRIX_FILE = "unicode_test_matrix.csv"
+CACHE_FILE = ".unicode_test_cache.json"
+STREAM_FILE = "unicode_test_results.jsonl"
+JOURNAL_FILE = ".unicode_test_journal_{}.jsonl"  # Per target connection
+JOURNAL_SYNC_INTERVAL = 1.0  # Seconds between fsyncs of the journal
+MANIFEST_FILE = TEST_DIR / "manifest.json"
+TIMINGS_FILE = "unicode_test_timings.json"
 INTERACTIVE_TIMEOUT = 5
+PORT_BUSY_RETRIES = 20  # Respawns of a console probe whose port another probe holds
+
+# Spawned mpremote runs are timed per phase when mpremote is importable here
+MPTIMING_AVAILABLE = instrumentable()
+
+
+class Target:
+    """Connection state for one device under test."""
+
+    def __init__(
+        self,
+        conn: str,
+        dest_base: str = DEST_BASE,
+        cache: "ResultCache" = None,
+        stream: "ResultStream" = None,
+        timings: PhaseTimings = None,
+    ):
+        self.conn = conn
+        self.dest_base = dest_base
+        self.session = None  # Open Session when --session/--bulk is used
+        self.cache = cache  # Shared ResultCache when --cache is used
+        self.stream = stream  # Shared ResultStream receiving one record per operation
+        self.journal = None  # Checkpoint Journal of this target's completed operations
+        self.identity = ""  # Firmware identity reported by the device, part of cache keys
+        self.timings = timings  # Shared PhaseTimings receiving per-phase durations
+        self.stage = "setup"  # Test stage the phase durations are recorded under
+
+    def mpremote_cmd(self, *args, marks: str = None) -> list[str]:
+        """Build the mpremote command line for this target, instrumented given a marks file."""
+        if self.conn == "auto":
+            cmd = ["mpremote"] + list(args)
+        else:
+            cmd = ["mpremote", "connect", self.conn] + list(args)
+        return timed_command(cmd, marks) if marks else cmd
+
+    def begin_spawn(self) -> str:
+        """Marks file for the phases of one spawned mpremote; None when not instrumented."""
+        if self.timings is None or not MPTIMING_AVAILABLE:
+            return None
+        fd, marks = tempfile.mkstemp(prefix="mptiming_", suffix=".txt")
+        os.close(fd)
+        return marks
+
+    def end_spawn(self, marks: str, started: float):
+        """Record the phases of a spawned mpremote that ran from started (time.time()) to now."""
+        if self.timings is None:
+            return
+        ended = time.time()
+        if marks is None:
+            self.timings.add(self.conn, self.stage, {"total": ended - started})
+            return
+        self.timings.add(self.conn, self.stage, phase_durations(read_marks(marks), started, ended))
+        try:
+            os.remove(marks)
+        except OSError:
+            pass
+
+    def open_session(self):
+        """Open the single shared connection used by --session/--bulk."""
+        self.session = Session(self.conn)
+        self.session.open()
+        if self.timings is not None:
+            # Paid once for the whole run: its own stage, not part of the first operation
+            durations = self.session.take_open_phases()
+            durations["total"] = sum(durations.values())
+            self.timings.add(self.conn, "session", durations)
+
+    def close_session(self):
+        """Close the session (if any) so a spawned mpremote can open the port."""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def record(self, op: str, filepath: Path, ok: bool, err: str, duration: float, **extra):
+        """Append the outcome of one operation to the result stream, if any."""
+        if self.stream is not None:
+            self.stream.write(self, op, filepath, ok, err, duration, **extra)
+
+
+class ResultCache:
+    """On-disk cache of per-file outcomes, shared by all targets of a run.
+
+    Invalidation policy: an entry is only reused when the operation, transport
+    mode, target identity (sys.platform, sys.version, sys.implementation incl.
+    build), mpremote version, filename bytes and file content are all identical,
+    and it is younger than max_age days. Transient failures (timeouts, port or
+    raw REPL access problems) are never stored. --clear-cache drops everything.
+
+    The key says nothing about the device filesystem, so a cached copy is only
+    served once the file was found on the device (see drop_stale_copies()).
+    """
+
+    TRANSIENT = ("TIMEOUT", "failed to access", "no device found", "could not enter raw repl")
+
+    def __init__(self, path: str, max_age_days: float):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def key(self, target: Target, op: str, filepath: Path) -> str:
+        mode = "session" if target.session is not None else "cli"
+        parts = [
+            op,
+            mode,
+            target.identity,
+            MPREMOTE_VERSION,
+            filepath.relative_to(TEST_DIR).as_posix().encode("utf-8").hex(),
+            corpus_manifest().entry(filepath)["sha256"],
+        ]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, target: Target, op: str, filepath: Path):
+        """Return the stored (returncode, stdout, stderr), or None."""
+        with self.lock:
+            entry = self.entries.get(self.key(target, op, filepath))
+        if entry is None or time.time() - entry["time"] > self.max_age:
+            return None
+        return entry["code"], entry["out"], entry["err"]
+
+    def put(self, target: Target, op: str, filepath: Path, result: tuple[int, str, str]):
+        code, out, err = result
+        if any(marker in err for marker in self.TRANSIENT):
+            return
+        with self.lock:
+            self.entries[self.key(target, op, filepath)] = {
+                "file": filepath.relative_to(TEST_DIR).as_posix(),
+                "op": op,
+                "code": code,
+                "out": out[:64],
+                "err": err[:200],
+                "time": time.time(),
+            }
+
+    def drop(self, target: Target, op: str, filepath: Path):
+        with self.lock:
+            self.entries.pop(self.key(target, op, filepath), None)
+
+    def save(self):
+        with self.lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=0)
+
+
+class ResultStream:
+    """JSONL sink with one record per copy/read/console operation, shared by all targets.
+
+    Records are appended and flushed as each operation finishes, so a crash or
+    Ctrl-C keeps everything completed so far and nothing accumulates in memory.
+    Each run's records carry the same "run" id. --reduce adds one "reduce"
+    record per minimal trigger sequence.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.run = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(
+        self,
+        target: Target,
+        op: str,
+        filepath: Path,
+        ok: bool,
+        err: str,
+        duration: float,
+        **extra,
+    ):
+        record = {
+            "run": self.run,
+            "time": round(time.time(), 3),
+            "target": target.conn,
+            "mode": "session" if target.session is not None else "cli",
+            "op": op,
+            "file": filepath.relative_to(TEST_DIR).as_posix(),
+            "status": "PASS" if ok else "FAIL",
+            "category": "" if ok else categorize_error(err),
+            "duration_ms": None if duration is None else round(duration * 1000, 1),
+            "stderr": err.strip()[:200],
+            "codepoints": [f"U+{cp:04X}" for cp in codepoints(filepath.name)],
+            "issues": corpus_manifest().entry(filepath)["issues"],
+        }
+        record.update(extra)
+        self.append(record)
+
+    def write_trigger(self, target: Target, category: str, trigger: str, files: list[Path]):
+        """Record a minimal trigger sequence found by --reduce (None: not reproducible)."""
+        self.append(
+            {
+                "run": self.run,
+                "time": round(time.time(), 3),
+                "target": target.conn,
+                "op": "reduce",
+                "category": category,
+                "trigger": trigger,
+                "codepoints": [f"U+{cp:04X}" for cp in codepoints(trigger or "")],
+                "files": [f.relative_to(TEST_DIR).as_posix() for f in files],
+            }
+        )
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class Journal:
+    """Crash-safe checkpoint journal of one target's file operations.
+
+    The first line is a "header" with the run parameters (target, destination,
+    transport mode, corpus digest). A "begin" line is written before each
+    operation and a "done" line with its result after it. Lines are flushed as
+    written, so they survive the process dying; fsync runs at most every
+    JOURNAL_SYNC_INTERVAL seconds and on close, so a power loss only costs the
+    last few operations, which a resumed run simply repeats.
+
+    A resumed run replays every completed operation from the journal; an
+    operation that began but never finished (in flight when the run stopped) is
+    run again to re-verify it. A journal whose header does not match the run's
+    parameters is not replayed (mismatch says why) and is started over.
+    """
+
+    def __init__(self, path: str, params: dict, resume: bool = False):
+        self.path = path
+        self.params = params
+        self.lock = threading.Lock()
+        self.completed = {}
+        self.in_flight = set()
+        self.mismatch = ""
+        replay = False
+        if resume:
+            replay = self.load()
+            if not replay:
+                self.completed.clear()
+                self.in_flight.clear()
+        self.file = open(path, "a" if replay else "w", encoding="utf-8")
+        self.synced = time.monotonic()
+        if not replay:
+            self.write({"state": "header", **params})
+
+    def load(self) -> bool:
+        """Read the journal; returns whether it belongs to this run and can be replayed."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = iter(f)
+                try:
+                    header = json.loads(next(lines))
+                except (StopIteration, ValueError):
+                    return False  # Empty, or died while writing the header
+                if header.pop("state", None) != "header":
+                    self.mismatch = "no run parameters"
+                    return False
+                differ = sorted(
+                    k for k in {*header, *self.params} if header.get(k) != self.params.get(k)
+                )
+                if differ:
+                    self.mismatch = "different " + ", ".join(differ)
+                    return False
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line
+                    key = (record["op"], record["file"])
+                    if record["state"] == "begin":
+                        self.in_flight.add(key)
+                    else:
+                        self.in_flight.discard(key)
+                        self.completed[key] = (record["code"], record["out"], record["err"])
+        except OSError:
+            return False
+        return True
+
+    def write(self, record: dict):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            if time.monotonic() - self.synced >= JOURNAL_SYNC_INTERVAL:
+                os.fsync(self.file.fileno())
+                self.synced = time.monotonic()
+
+    def result(self, op: str, filepath: Path):
+        """The recorded (returncode, stdout, stderr) of a completed operation, or None."""
+        return self.completed.get((op, filepath.relative_to(TEST_DIR).as_posix()))
+
+    def begin(self, op: str, filepath: Path):
+        self.write({"op": op, "file": filepath.relative_to(TEST_DIR).as_posix(), "state": "begin"})
+
+    def finish(self, op: str, filepath: Path, result: tuple[int, str, str]):
+        code, out, err = result
+        self.write(
+            {
+                "op": op,
+                "file": filepath.relative_to(TEST_DIR).as_posix(),
+                "state": "done",
+                "code": code,
+                "out": out[:64],
+                "err": err[:200],
+            }
+        )
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+class CorpusManifest:
+    """Indexed metadata of the test_data corpus, stored in MANIFEST_FILE.
+
+    One entry per test file (relative path): size, mtime, content digests, the
+    analyze_filename() issues and categories and the equivalence_class() labels,
+    plus the list of folders. refresh() makes one scandir pass and only re-reads
+    and re-analyzes files whose size or mtime changed; every stage then reads
+    the manifest instead of walking the tree, hashing or analyzing again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.dirs = []
+        self.entries = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Analysis labels depend on the Unicode versions of the property table
+            if data["version"] == self.VERSION and data["unicode"] == table_version():
+                self.dirs = data["dirs"]
+                self.entries = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def describe(filepath: Path, stat: os.stat_result) -> dict:
+        """Compute the manifest entry of one file."""
+        data = filepath.read_bytes()
+        analysis = analyze_filename(filepath.name)
+        issues, blocks, widths, length = equivalence_class(filepath.name)
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "adler32": f"{zlib.adler32(data):08x}",
+            "issues": analysis["potential_issues"],
+            "categories": sorted(analysis["categories"]),
+            "class": [list(issues), list(blocks), list(widths), length],
+        }
+
+    def refresh(self) -> int:
+        """Bring the manifest up to date with TEST_DIR; returns the number of (re)indexed files."""
+        dirs = []
+        entries = {}
+        updated = 0
+        pending = [TEST_DIR]
+        while pending:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    path = Path(entry.path)
+                    rel = path.relative_to(TEST_DIR).as_posix()
+                    if entry.is_dir():
+                        if not entry.name.startswith("."):
+                            dirs.append(rel)
+                            pending.append(path)
+                        continue
+                    if entry.name.endswith((".py", ".md")) or path == self.path:
+                        continue
+                    stat = entry.stat()
+                    old = self.entries.get(rel)
+                    if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+                        entries[rel] = old
+                    else:
+                        entries[rel] = self.describe(path, stat)
+                        updated += 1
+
+        changed = updated or entries.keys() != self.entries.keys() or sorted(dirs) != self.dirs
+        self.dirs = sorted(dirs)
+        self.entries = entries
+        if changed:
+            self.save()
+        return updated
+
+    def save(self):
+        data = {
+            "version": self.VERSION,
+            "unicode": table_version(),
+            "dirs": self.dirs,
+            "files": self.entries,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: could not save {self.path}: {e}")
+
+    def entry(self, filepath: Path) -> dict:
+        """Manifest entry of a test file, computed on the fly if it is not indexed."""
+        entry = self.entries.get(filepath.relative_to(TEST_DIR).as_posix())
+        if entry is None:
+            entry = self.describe(filepath, filepath.stat())
+        return entry
+
+    def files(self) -> list[Path]:
+        return [TEST_DIR / rel for rel in sorted(self.entries)]
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def corpus_manifest() -> CorpusManifest:
+    """The corpus manifest, loaded and refreshed on first use."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = CorpusManifest(MANIFEST_FILE)
+            updated = _manifest.refresh()
+            if updated:
+                print(f"Manifest: indexed {updated} new or changed files in {MANIFEST_FILE}")
+    return _manifest
+
+
+class ConsoleBaseline:
+    """Per-target console timing learned from piped reads, used by the hang watchdog."""
+
+    def __init__(self, startup: float, throughput: float, teardown: float):
+        self.startup = startup  # seconds from spawn until a small cat completes
+        self.throughput = throughput  # payload bytes per second
+        self.teardown = teardown  # seconds from the last output byte until mpremote exits
+
+    def first_output_limit(self) -> float:
+        """Longest silence allowed before the first output byte."""
+        return self.startup * 3 + 0.5
+
+    def stall_limit(self) -> float:
+        """Longest silence allowed between output bytes (a few mpremote 256-byte chunks)."""
+        return max(0.2, 3 * 256 / self.throughput)
+
+    def exit_limit(self) -> float:
+        """Longest silence allowed once the whole payload arrived (mpremote exiting)."""
+        return max(self.stall_limit(), self.teardown * 3 + 0.2)
+
+    def expected_duration(self, size: int) -> float:
+        """Wall time a healthy cat of size bytes should take."""
+        return self.startup + size / self.throughput
+
+    def __str__(self):
+        return (
+            f"startup {self.startup * 1000:.0f} ms, {self.throughput / 1024:.1f} KB/s, "
+            f"exit {self.teardown * 1000:.0f} ms"
+        )
+
+
+class ThreadOutput(io.TextIOBase):
+    """sys.stdout stand-in that sends each worker thread's prints to its own stream."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def stream(self):
+        return getattr(self.local, "stream", self.default)
+
+    def write(self, s):
+        return self.stream().write(s)
+
+    def flush(self):
+        self.stream().flush()
 
 
 def parse_args():
@@ -37,14 +559,28 @@ Examples:
     python unicode_test.py -t COM27
     python unicode_test.py -t socket://localhost:2218
     python unicode_test.py --interactive      # Test real console behavior
+    python unicode_test.py --interactive --concurrency 16  # Probe 16 files at once
     python unicode_test.py --skip-copy        # Only test reading (files already copied)
+    python unicode_test.py --incremental      # Only copy files missing or changed on the device
+    python unicode_test.py --cache            # Reuse outcomes from earlier identical runs
+    python unicode_test.py --resume           # Continue where an interrupted run stopped
+    python unicode_test.py --minimize         # One representative per equivalence class
+    python unicode_test.py --reduce --session # Shrink failing names to minimal triggers
+    python unicode_test.py --session          # One connection instead of one mpremote per file
+    python unicode_test.py --bulk             # Push the whole tree in a few batched writes
+    python unicode_test.py --timings          # Per-phase latency percentiles of every stage
+    python unicode_test.py -t COM27 /dev/ttyACM0 socket://localhost:2218  # Concurrent targets
+    python unicode_test.py --pool socket://localhost:2218 socket://localhost:2219  # Shard across instances
+    python unicode_test.py --spawn "./start_unix_port.sh {port}" --shards 8      # Start 8 instances
 """,
     )
     parser.add_argument(
         "-t",
         "--target",
-        default="auto",
-        help="Target device connection (default: auto). Examples: COM27, /dev/ttyUSB0, socket://localhost:2218",
+        nargs="+",
+        default=["auto"],
+        help="Target device connection(s) (default: auto). Examples: COM27, /dev/ttyUSB0, socket://localhost:2218. "
+        "Several targets (space or comma separated) run concurrently and are merged into one result matrix.",
     )
     parser.add_argument(
         "--interactive",
@@ -57,20 +593,155 @@ Examples:
         default=5,
         help="Timeout in seconds for interactive mode (default: 5).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of interactive console probes to run at once, each on its own pseudo-terminal "
+        "(POSIX only, default: 1). Probes on an exclusive serial port wait for their turn.",
+    )
+    parser.add_argument(
+        "--watchdog",
+        action="store_true",
+        help="Detect console hangs from output inactivity instead of a fixed --timeout, using a "
+        "startup/throughput baseline calibrated per target with piped reads.",
+    )
     parser.add_argument(
         "--skip-copy",
         action="store_true",
         help="Skip copy test, only run read/interactive tests on already-copied files.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Ask the device for sizes and hashes of everything under the destination in one call "
+        "and only copy files that are missing or different.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"Serve copy/read outcomes from the result cache ({CACHE_FILE}) when filename, file "
+        "content, firmware identity, mpremote version and mode are unchanged; only new "
+        "combinations are run on the device.",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=7,
+        help="Ignore cached outcomes older than this many days (default: 7).",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete the result cache before running.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run: operations completed according to the per-target "
+        "checkpoint journal are replayed from it, and only the operation that was in flight and "
+        "everything after it run on the device.",
+    )
+    parser.add_argument(
+        "--minimize",
+        action="store_true",
+        help="Fast smoke run: group files into equivalence classes (issue flags, Unicode blocks, "
+        "UTF-8 widths, name length) and copy one representative per class, expanding a class "
+        "only when its representative fails and until its failure mode is established.",
+    )
+    parser.add_argument(
+        "--reduce",
+        action="store_true",
+        help="Delta-debug (ddmin) every failing filename down to the minimal characters that "
+        "still fail with the same error category and report them per category. Candidates are "
+        "probed in one batched write per round with --session/--bulk, one mpremote call each "
+        "otherwise.",
+    )
+    parser.add_argument(
+        "--session",
+        action="store_true",
+        help="Open the target once and run all mkdir/cp/cat over that connection "
+        "(mpremote Python API) instead of one mpremote process per operation. "
+        "Bypasses mpremote's command-line parsing, so ARG PARSER failures do not occur.",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Provision all directories and files in a few batched raw-REPL writes through a small "
+        "on-device receiver, instead of one mkdir/cp per entry. Implies --session.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_BATCH_SIZE,
+        help=f"Payload bytes per raw-REPL write in --bulk mode (default: {BULK_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--stream",
+        default=STREAM_FILE,
+        metavar="FILE",
+        help=f"Append one JSON record per copy/read/console operation to this file as it "
+        f"finishes (default: {STREAM_FILE}). An empty FILE turns the stream off.",
+    )
+    parser.add_argument(
+        "--timings",
+        nargs="?",
+        const=TIMINGS_FILE,
+        metavar="FILE",
+        help="Time every operation per phase (spawn, connect, soft_reset, transfer, teardown) "
+        f"and save the p50/p95/p99 latencies of every stage to FILE (default: {TIMINGS_FILE}). "
+        "Spawned runs then go through mptiming.py, which hooks the transport of the mpremote "
+        "package importable by this Python instead of running the mpremote on PATH.",
+    )
+    parser.add_argument(
+        "--pool",
+        nargs="+",
+        help="Already-running unix-port instances (e.g. socket://localhost:2218 socket://localhost:2219). "
+        "The files are split across them, each shard under its own destination folder.",
+    )
+    parser.add_argument(
+        "--spawn",
+        metavar="CMD",
+        help="Start --shards local unix-port instances from this command, with {port} replaced by each "
+        "instance's port, and shard the files across them.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of instances started by --spawn (default: number of CPU cores).",
+    )
+    parser.add_argument(
+        "--base-port",
+        type=int,
+        default=2218,
+        help="Port of the first instance started by --spawn (default: 2218).",
+    )
+    args = parser.parse_args()
+    if args.minimize and args.bulk:
+        parser.error("--minimize copies one file at a time and cannot be combined with --bulk")
+    return args
 
 
-def run_mpremote(*args) -> tuple[int, str, str]:
-    """Run mpremote command and return (returncode, stdout, stderr)."""
-    if CONN == "auto":
-        cmd = ["mpremote"] + list(args)
-    else:
-        cmd = ["mpremote", "connect", CONN] + list(args)
+def run_mpremote(target: Target, *args) -> tuple[int, str, str]:
+    """Run mpremote command and return (returncode, stdout, stderr).
+
+    The wall time of each phase is recorded in target.timings under the current stage.
+    """
+    if target.session is not None:
+        start = time.monotonic()
+        result = target.session.run(*args)
+        total = time.monotonic() - start
+        if target.timings is not None:
+            # A (re)open during this operation is charged to it
+            durations = target.session.take_open_phases()
+            durations["transfer"] = max(total - sum(durations.values()), 0.0)
+            durations["total"] = total
+            target.timings.add(target.conn, target.stage, durations)
+        return result
+    marks = target.begin_spawn()
+    cmd = target.mpremote_cmd(*args, marks=marks)
+    started = time.time()
     try:
         result = subprocess.run(
             cmd,
@@ -85,26 +756,66 @@ def run_mpremote(*args) -> tuple[int, str, str]:
         return -1, "", "TIMEOUT"
     except Exception as e:
         return -1, "", str(e)
+    finally:
+        target.end_spawn(marks, started)
+
+
+def query_identity(target: Target) -> str:
+    """Firmware identity of the target (platform, version, implementation and build)."""
+    code, out, err = run_mpremote(target, "exec", IDENTITY_SCRIPT)
+    return out.strip() if code == 0 else ""
+
+
+def run_cached(target: Target, op: str, filepath: Path, *args) -> tuple[int, str, str, str]:
+    """run_mpremote() for one file operation, served from the journal or result cache when possible.
+
+    Returns (returncode, stdout, stderr, source) where source is "" when the
+    operation ran, "resumed" when replayed from the --resume journal and
+    "cached" when served from the result cache. Operations that run are journaled.
+    """
+    journal = target.journal
+    if journal is not None:
+        result = journal.result(op, filepath)
+        if result is not None:
+            return *result, "resumed"
+        journal.begin(op, filepath)
+
+    source = ""
+    if target.cache is None or not target.identity:
+        result = run_mpremote(target, *args)
+    else:
+        result = target.cache.get(target, op, filepath)
+        if result is not None:
+            source = "cached"
+        else:
+            result = run_mpremote(target, *args)
+            target.cache.put(target, op, filepath, result)
 
+    if journal is not None:
+        journal.finish(op, filepath, result)
+    return *result, source
 
-def run_mpremote_interactive(*args) -> tuple[int, str]:
+
+def run_mpremote_interactive(target: Target, *args, timeout: float = None) -> tuple[int, str]:
     """Run mpremote with real console output (not piped).
 
+    Always spawns mpremote, even with --session: the point is to exercise its
+    console output path.
+
     Returns (returncode, error_type) where error_type is:
     - "" for success
     - "TIMEOUT" if command hangs
     - "ENCODING" if UnicodeEncodeError
     - "ERROR" for other errors
     """
-    if CONN == "auto":
-        cmd = ["mpremote"] + list(args)
-    else:
-        cmd = ["mpremote", "connect", CONN] + list(args)
+    marks = target.begin_spawn()
+    cmd = target.mpremote_cmd(*args, marks=marks)
+    started = time.time()
 
     try:
         proc = subprocess.Popen(cmd, text=True)
         try:
-            returncode = proc.wait(timeout=INTERACTIVE_TIMEOUT)
+            returncode = proc.wait(timeout=timeout or INTERACTIVE_TIMEOUT)
             return returncode, ""
         except subprocess.TimeoutExpired:
             proc.kill()
@@ -115,115 +826,441 @@ def run_mpremote_interactive(*args) -> tuple[int, str]:
         if "UnicodeEncodeError" in err_str:
             return -1, "ENCODING"
         return -1, f"ERROR: {err_str[:50]}"
+    finally:
+        target.end_spawn(marks, started)
 
 
 def analyze_filename(filename: str) -> dict:
-    """Analyze a filename for potentially problematic characters."""
+    """Analyze a filename for potentially problematic characters.
+
+    Returns the codepoint array with per-character flag, category and block
+    arrays from the property table, the categories present and the potential
+    issues. Character names are only looked up by codepoint_details().
+    """
+    table = property_table()
+    cps = codepoints(filename)
+    flags = table.flags(cps)
+    category_ids = table.category_ids(cps)
     info = {
         "filename": filename,
         "length": len(filename),
-        "codepoints": [],
-        "categories": set(),
+        "codepoints": cps,
+        "flags": flags,
+        "category_ids": category_ids,
+        "blocks": table.block_ids(cps),
+        "categories": {CATEGORIES[i] for i in set(category_ids)},
         "potential_issues": [],
     }
 
-    for char in filename:
-        cp = ord(char)
-        try:
-            name = unicodedata.name(char, f"U+{cp:04X}")
-            category = unicodedata.category(char)
-        except:
-            name = f"U+{cp:04X}"
-            category = "??"
+    seen = 0
+    for flag in set(flags):
+        seen |= flag
+    if not seen & ISSUE_FLAGS:
+        return info
 
-        info["codepoints"].append(
-            {
-                "char": char,
-                "codepoint": f"U+{cp:04X}",
-                "name": name,
-                "category": category,
-            }
-        )
-        info["categories"].add(category)
-
-        # Flag potential issues
-        if cp > 0xFFFF:
+    # Flag potential issues
+    for char, cp, flag in zip(filename, cps, flags):
+        if flag & OUTSIDE_BMP:
             info["potential_issues"].append(f"Outside BMP: {char} (U+{cp:04X})")
-        if category.startswith("M"):
+        if flag & COMBINING:
             info["potential_issues"].append(f"Combining mark: {char} (U+{cp:04X})")
-        if category == "Cf":
+        if flag & FORMAT:
             info["potential_issues"].append(f"Format char: U+{cp:04X}")
-        if category == "Co":
+        if flag & PRIVATE_USE:
             info["potential_issues"].append(f"Private use: U+{cp:04X}")
-        if char in "\x00\x01\x02\x03\x04\x05\x06\x07\x08\x0b\x0c\x0e\x0f":
+        if flag & CONTROL:
             info["potential_issues"].append(f"Control char: U+{cp:04X}")
 
     return info
 
 
+def codepoint_details(filename: str) -> list[dict]:
+    """Per-character char, codepoint, name and category of a filename, for reports."""
+    cps = codepoints(filename)
+    return [
+        {
+            "char": char,
+            "codepoint": f"U+{cp:04X}",
+            "name": unicodedata.name(char, f"U+{cp:04X}"),
+            "category": category,
+        }
+        for char, cp, category in zip(filename, cps, property_table().categories(cps))
+    ]
+
+
+def equivalence_class(filename: str) -> tuple:
+    """Features that decide how a filename is likely to fail.
+
+    Potential-issue kinds from analyze_filename() plus any ASCII punctuation
+    (quotes and '=' break mpremote), the Unicode blocks used, the UTF-8 widths of
+    the characters and the encoded length bucket (powers of two). Looked up in the
+    property table directly.
+    """
+    table = property_table()
+    cps = codepoints(filename)
+    flags = table.flags(cps)
+    seen = 0
+    for flag in set(flags):
+        seen |= flag
+    issues = {label for bit, label in ISSUE_LABELS if seen & bit}
+    if seen & ASCII_PUNCT:
+        issues.update(f"ASCII {c!r}" for c, flag in zip(filename, flags) if flag & ASCII_PUNCT)
+    issues = sorted(issues)
+    lengths = table.utf8_lengths(cps)
+    blocks = sorted(set(table.blocks(cps)))
+    widths = sorted(set(lengths))
+    encoded = sum(lengths)
+    return tuple(issues), tuple(blocks), tuple(widths), 1 << (encoded - 1).bit_length()
+
+
+def group_equivalence_classes(files: list[Path]) -> list[list[Path]]:
+    """Group files by equivalence_class(); the first file of each class is its representative."""
+    manifest = corpus_manifest()
+    classes = {}
+    for filepath in sorted(files, key=lambda f: (len(f.name), f.as_posix())):
+        issues, blocks, widths, length = manifest.entry(filepath)["class"]
+        label = (tuple(issues), tuple(blocks), tuple(widths), length)
+        classes.setdefault(label, []).append(filepath)
+    return list(classes.values())
+
+
 def collect_test_files() -> tuple[list[Path], set[str]]:
-    """Collect all test files and subdirectories."""
-    all_files = []
+    """Collect all test files and subdirectories (from the corpus manifest)."""
+    manifest = corpus_manifest()
+    return manifest.files(), set(manifest.dirs)
+
+
+def file_subdirs(files: list[Path]) -> set[str]:
+    """Subdirectories (relative to TEST_DIR) needed to hold the given files."""
     subdirs = set()
+    for filepath in files:
+        for parent in filepath.relative_to(TEST_DIR).parents:
+            if parent != Path("."):
+                subdirs.add(parent.as_posix())
+    return subdirs
 
-    for root, dirs, files in os.walk(TEST_DIR):
-        dirs[:] = [d for d in dirs if not d.startswith(".")]
-        for d in dirs:
-            subdir = (Path(root) / d).relative_to(TEST_DIR)
-            subdirs.add(subdir.as_posix())
-        for f in files:
-            if f.endswith(".py") or f.endswith(".md"):
+
+# Device-side inventory for --incremental: prints (path, size, digest) for every
+# file under DEST_BASE. Uses hashlib.sha256 when the port has it, else adler32.
+# Sizes are counted while hashing, as os.stat() sizes are unreliable on some ports.
+INVENTORY_SCRIPT = """\
+import os
+try:
+ from hashlib import sha256 as _H
+except ImportError:
+ _H = None
+def _sum(p):
+ b = bytearray(512)
+ m = memoryview(b)
+ h = _H() if _H else None
+ a, s, size = 1, 0, 0
+ with open(p, 'rb') as f:
+  while 1:
+   n = f.readinto(b)
+   if not n:
+    break
+   size += n
+   if h:
+    h.update(m[:n])
+   else:
+    for i in range(n):
+     a = (a + b[i]) % 65521
+     s = (s + a) % 65521
+ if h:
+  return size, 'sha256:' + ''.join('%02x' % x for x in h.digest())
+ return size, 'adler32:%08x' % ((s << 16) | a)
+def _walk(d):
+ for e in os.ilistdir(d):
+  p = d + '/' + e[0]
+  if e[1] & 0x4000:
+   _walk(p)
+  else:
+   try:
+    print(repr((p,) + _sum(p)))
+   except Exception:
+    pass
+"""
+
+
+def remote_inventory(target: Target) -> dict[str, tuple[int, str]]:
+    """Ask the device, in one call, for {path: (size, digest)} of every file under dest_base."""
+    script = INVENTORY_SCRIPT + f"try:\n _walk({target.dest_base!r})\nexcept OSError:\n pass\n"
+    code, out, err = run_mpremote(target, "exec", script)
+    inventory = {}
+    if code != 0:
+        return inventory
+    for line in out.splitlines():
+        try:
+            path, size, digest = ast.literal_eval(line.strip())
+        except (ValueError, SyntaxError):
+            continue
+        inventory[path] = (size, digest)
+    return inventory
+
+
+def split_unchanged(target: Target, all_files: list[Path]) -> tuple[list[Path], list[Path]]:
+    """Split files into (already on the device and identical, missing or different)."""
+    inventory = remote_inventory(target)
+    manifest = corpus_manifest()
+    unchanged = []
+    to_copy = []
+    for filepath in sorted(all_files):
+        remote = inventory.get(f"{target.dest_base}/{filepath.relative_to(TEST_DIR).as_posix()}")
+        if remote is not None:
+            entry = manifest.entry(filepath)
+            size, digest = remote
+            algo = digest.split(":")[0]
+            # Local digests come from the manifest, in INVENTORY_SCRIPT's format
+            if size == entry["size"] and digest == f"{algo}:{entry.get(algo)}":
+                unchanged.append(filepath)
                 continue
-            filepath = Path(root) / f
-            all_files.append(filepath)
+        to_copy.append(filepath)
+    return unchanged, to_copy
+
+
+def drop_stale_copies(target: Target, files: list[Path], on_device: bool = None) -> int:
+    """Drop cached copy passes of files that are not on the device as they were copied.
+
+    A cached cp skips the copy, but the later stages read the file from this
+    device, which may have been wiped or reflashed since. on_device=False skips
+    the inventory when the files are already known to be missing or changed.
+    Returns the number of entries dropped.
+    """
+    if target.cache is None or not target.identity:
+        return 0
+    cached = []
+    for filepath in files:
+        result = target.cache.get(target, "cp", filepath)
+        if result is not None and result[0] == 0:
+            cached.append(filepath)
+    if not cached:
+        return 0
+    stale = cached if on_device is False else split_unchanged(target, cached)[1]
+    for filepath in stale:
+        target.cache.drop(target, "cp", filepath)
+    return len(stale)
+
+
+def setup_remote_dirs(target: Target, subdirs: set[str]):
+    """Create base and subdirectories on remote, timed as the "setup" stage."""
+    stage, target.stage = target.stage, "setup"
+    try:
+        run_mpremote(target, "mkdir", f":{target.dest_base}")
+        for subdir in sorted(subdirs):
+            run_mpremote(target, "mkdir", f":{target.dest_base}/{subdir}")
+    finally:
+        target.stage = stage
+
 
-    return all_files, subdirs
+def copy_one(target: Target, filepath: Path, label: str) -> tuple[bool, str]:
+    """Copy one file, printing its progress line. Returns (passed, error)."""
+    folder = filepath.parent.name if filepath.parent != TEST_DIR else ""
+    dest = f":{target.dest_base}/{filepath.relative_to(TEST_DIR).as_posix()}"
 
+    print(f"{label} {folder}/{filepath.name}", end=" ")
+    sys.stdout.flush()
 
-def setup_remote_dirs(subdirs: set[str]):
-    """Create base and subdirectories on remote."""
-    run_mpremote("mkdir", f":{DEST_BASE}")
-    for subdir in sorted(subdirs):
-        run_mpremote("mkdir", f":{DEST_BASE}/{subdir}")
+    start = time.monotonic()
+    code, out, err, source = run_cached(target, "cp", filepath, "cp", str(filepath), dest)
+    target.record("cp", filepath, code == 0, err, time.monotonic() - start, source=source)
 
+    if code == 0:
+        print(f"PASS ({source})" if source else "PASS")
+        return True, ""
+    error_type = categorize_error(err)
+    print(f"FAIL: {error_type}" + (f" ({source})" if source else ""))
+    return False, err.strip()[:200]
 
-def test_copy_files(all_files: list[Path]) -> tuple[list[Path], list[tuple[Path, str]]]:
+
+def test_copy_files(
+    target: Target, all_files: list[Path]
+) -> tuple[list[Path], list[tuple[Path, str]]]:
     """Test copying files to remote. Returns (passed, failed)."""
     print("=" * 70)
     print("TEST: Copying Files with 'mpremote cp'")
     print("=" * 70)
-    print(f"Connection: {CONN}")
-    print(f"Destination: {DEST_BASE}")
+    print(
+        f"Connection: {target.conn}" + (" (single session)" if target.session is not None else "")
+    )
+    print(f"Destination: {target.dest_base}")
     print(f"Testing {len(all_files)} files...\n")
 
     passed = []
     failed = []
 
     for i, filepath in enumerate(sorted(all_files), 1):
-        filename = filepath.name
-        rel_path = filepath.relative_to(TEST_DIR)
-        folder = filepath.parent.name if filepath.parent != TEST_DIR else ""
-        dest = f":{DEST_BASE}/{rel_path.as_posix()}"
+        ok, err = copy_one(target, filepath, f"[{i:3}/{len(all_files)}]")
+        if ok:
+            passed.append(filepath)
+        else:
+            failed.append((filepath, err))
 
-        print(f"[{i:3}/{len(all_files)}] {folder}/{filename}", end=" ")
-        sys.stdout.flush()
+    print_copy_summary(target, passed, failed)
+    return passed, failed
 
-        code, out, err = run_mpremote("cp", str(filepath), dest)
 
-        if code == 0:
-            print("PASS")
+def test_minimized_copy(
+    target: Target, all_files: list[Path], subdirs: set[str], confirmations: int = 2
+) -> tuple[list[Path], list[tuple[Path, str]]]:
+    """Smoke-test copying one representative per equivalence class. Returns (passed, failed).
+
+    A class whose representative passes is not expanded. A failing class is
+    expanded member by member until `confirmations` files failed with the same
+    error category (failure mode established) or the class turns out mixed, in
+    which case all of it is tested.
+    """
+    classes = group_equivalence_classes(all_files)
+
+    print("=" * 70)
+    print("TEST: Copying Files (equivalence-class minimized)")
+    print("=" * 70)
+    print(f"Connection: {target.conn}")
+    print(f"Destination: {target.dest_base}")
+    print(f"{len(all_files)} files in {len(classes)} equivalence classes\n")
+
+    setup_remote_dirs(target, subdirs)
+
+    passed = []
+    failed = []
+    modes = {}  # class index -> (error category, files tested, class size)
+
+    print("Representatives:")
+    pending = []
+    for i, members in enumerate(classes):
+        ok, err = copy_one(target, members[0], f"[{i + 1:3}/{len(classes)}]")
+        if ok:
+            passed.append(members[0])
+        else:
+            failed.append((members[0], err))
+            pending.append(i)
+
+    if pending:
+        print("\nExpanding failing classes:")
+    for i in pending:
+        members = classes[i]
+        category = categorize_error(failed[[f for f, _ in failed].index(members[0])][1])
+        same = 1
+        mixed = False
+        tested = 1
+        for filepath in members[1:]:
+            if same >= confirmations and not mixed:
+                break
+            ok, err = copy_one(target, filepath, f"[class {i + 1:3}]")
+            tested += 1
+            if ok:
+                passed.append(filepath)
+                mixed = True
+            else:
+                failed.append((filepath, err))
+                if categorize_error(err) == category:
+                    same += 1
+                else:
+                    mixed = True
+        modes[i] = ("mixed" if mixed else category, tested, len(members))
+
+    print_copy_summary(target, passed, failed)
+
+    print("\n" + "-" * 70)
+    print("EQUIVALENCE CLASSES")
+    print("-" * 70)
+    tested_total = len(passed) + len(failed)
+    print(f"Tested {tested_total} of {len(all_files)} files ({len(classes)} classes)")
+    for i, (mode, tested, size) in modes.items():
+        issues, blocks, widths, length = corpus_manifest().entry(classes[i][0])["class"]
+        print(f"\n{mode} - {tested}/{size} files tested")
+        print(f"  blocks: {', '.join(blocks)}")
+        print(f"  UTF-8 widths: {widths}, name <= {length} bytes")
+        if issues:
+            print(f"  issues: {', '.join(issues)}")
+        for filepath in classes[i][:3]:
+            print(f"  - {filepath.relative_to(TEST_DIR).as_posix()}")
+
+    return passed, failed
+
+
+def test_bulk_copy_files(
+    target: Target, all_files: list[Path], subdirs: set[str], batch_size: int = BULK_BATCH_SIZE
+) -> tuple[list[Path], list[tuple[Path, str]]]:
+    """Test copying all files in batched raw-REPL writes. Returns (passed, failed)."""
+    print("=" * 70)
+    print("TEST: Bulk Copy (batched raw-REPL writes)")
+    print("=" * 70)
+    print(f"Connection: {target.conn} (single session)")
+    print(f"Destination: {target.dest_base}")
+    print(f"Batch size: {batch_size} bytes")
+    print(f"Testing {len(all_files)} files...\n")
+
+    files = sorted(all_files)
+    errors = {}
+    if target.journal is not None:
+        for filepath in files:
+            result = target.journal.result("cp", filepath)
+            if result is not None:
+                errors[filepath] = result[2] if result[0] else ""
+    resumed = set(errors)
+    to_write = [f for f in files if f not in resumed]
+
+    dirs = [target.dest_base] + [f"{target.dest_base}/{subdir}" for subdir in sorted(subdirs)]
+    payload = [
+        (f"{target.dest_base}/{f.relative_to(TEST_DIR).as_posix()}", f.read_bytes())
+        for f in to_write
+    ]
+
+    batch_starts = []
+
+    def begin(indices: list[int]):
+        batch_starts.append(time.monotonic())
+        if target.journal is not None:
+            for i in indices:
+                target.journal.begin("cp", to_write[i])
+
+    start = time.monotonic()
+    errors.update(
+        zip(to_write, target.session.bulk_put(dirs, payload, batch_size, on_batch=begin))
+    )
+    elapsed = time.monotonic() - start
+    if target.timings is not None and batch_starts:
+        # One operation per batch; the first also covers the receiver setup (and any reopen)
+        ends = batch_starts[1:] + [start + elapsed]
+        for n, (began, ended) in enumerate(zip([start] + batch_starts[1:], ends)):
+            durations = target.session.take_open_phases() if n == 0 else {}
+            durations["transfer"] = max(ended - began - sum(durations.values()), 0.0)
+            durations["total"] = ended - began
+            target.timings.add(target.conn, target.stage, durations)
+    if target.journal is not None:
+        for filepath in to_write:
+            err = errors[filepath]
+            target.journal.finish("cp", filepath, (1 if err else 0, "", err))
+
+    passed = []
+    failed = []
+
+    for i, filepath in enumerate(files, 1):
+        err = errors[filepath]
+        source = "resumed" if filepath in resumed else ""
+        folder = filepath.parent.name if filepath.parent != TEST_DIR else ""
+        print(f"[{i:3}/{len(files)}] {folder}/{filepath.name}", end=" ")
+        # Files are written in shared batches: no per-file timing
+        target.record(
+            "cp", filepath, not err, err, None, bulk_ms=round(elapsed * 1000, 1), source=source
+        )
+
+        if not err:
+            print(f"PASS ({source})" if source else "PASS")
             passed.append(filepath)
         else:
-            error_type = categorize_error(err)
-            print(f"FAIL: {error_type}")
+            print(f"FAIL: {categorize_error(err)}" + (f" ({source})" if source else ""))
             failed.append((filepath, err.strip()[:200]))
 
-    print_copy_summary(passed, failed)
+    print_copy_summary(target, passed, failed)
     return passed, failed
 
 
-def test_read_files(files_to_read: list[Path]):
-    """Test reading back files using mpremote cat."""
+def test_read_files(
+    target: Target, files_to_read: list[Path]
+) -> tuple[list[Path], list[tuple[Path, str]]]:
+    """Test reading back files using mpremote cat. Returns (passed, failed)."""
+    target.stage = "read"
     print("\n" + "=" * 70)
     print("TEST: Reading Files with 'mpremote cat'")
     print("=" * 70)
@@ -231,7 +1268,7 @@ def test_read_files(files_to_read: list[Path]):
 
     if not files_to_read:
         print("No files to read.")
-        return
+        return [], []
 
     passed = []
     failed = []
@@ -240,57 +1277,352 @@ def test_read_files(files_to_read: list[Path]):
         filename = filepath.name
         rel_path = filepath.relative_to(TEST_DIR)
         folder = filepath.parent.name if filepath.parent != TEST_DIR else ""
-        remote_path = f":{DEST_BASE}/{rel_path.as_posix()}"
+        remote_path = f":{target.dest_base}/{rel_path.as_posix()}"
 
         print(f"[{i:3}/{len(files_to_read)}] cat {folder}/{filename}", end=" ")
         sys.stdout.flush()
 
-        code, out, err = run_mpremote("cat", remote_path)
+        start = time.monotonic()
+        code, out, err, source = run_cached(target, "cat", filepath, "cat", remote_path)
+        ok = code == 0 and len(out) > 0
+        target.record(
+            "cat",
+            filepath,
+            ok,
+            err or ("" if ok else "Empty response"),
+            time.monotonic() - start,
+            source=source,
+        )
 
-        if code == 0 and len(out) > 0:
-            print("PASS")
+        if ok:
+            print(f"PASS ({source})" if source else "PASS")
             passed.append(filepath)
         else:
             error_type = categorize_error(err) if err else "EMPTY"
-            print(f"FAIL: {error_type}")
+            print(f"FAIL: {error_type}" + (f" ({source})" if source else ""))
             failed.append((filepath, err.strip()[:100] if err else "Empty response"))
 
     # Summary
     print("\n" + "-" * 70)
     print(f"Read test: {len(passed)} passed, {len(failed)} failed")
+    if target.timings is not None:
+        target.timings.print_stage(target.conn, "read")
+    return passed, failed
+
+
+async def probe_console_pty(
+    target: Target, remote_path: str, size: int = 0, baseline: ConsoleBaseline = None
+) -> tuple[int, str]:
+    """Run one `mpremote cat` attached to its own pseudo-terminal.
 
+    Returns (returncode, error_type) like run_mpremote_interactive(). The pty is
+    drained continuously so a full terminal buffer is never mistaken for a hang.
+
+    Without a baseline a probe hangs after INTERACTIVE_TIMEOUT. With one, an
+    output-inactivity watchdog flags it as soon as the output goes quiet for
+    longer than the target's baseline allows (before the first byte, mid-payload
+    or after the expected size arrived) while the process has not exited.
+    """
+    import pty
 
-def test_console_output(all_files: list[Path]):
-    """Test mpremote cat with real console output to detect hang issues."""
+    loop = asyncio.get_running_loop()
+    master, slave = pty.openpty()
+    marks = target.begin_spawn()
+    started = time.time()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *target.mpremote_cmd("cat", remote_path, marks=marks),
+            stdin=subprocess.DEVNULL,
+            stdout=slave,
+            stderr=slave,
+        )
+    finally:
+        os.close(slave)
+
+    output = bytearray()
+    start = last_output = time.monotonic()
+
+    def drain():
+        nonlocal last_output
+        try:
+            data = os.read(master, 4096)
+        except OSError:
+            data = b""  # EIO once the child closed its side
+        if data:
+            output.extend(data)
+            last_output = time.monotonic()
+        else:
+            loop.remove_reader(master)
+
+    loop.add_reader(master, drain)
+    exited = asyncio.ensure_future(proc.wait())
+    try:
+        while True:
+            await asyncio.wait({exited}, timeout=0.05)
+            if exited.done():
+                returncode = exited.result()
+                break
+            hang = watchdog_verdict(
+                time.monotonic() - start,
+                time.monotonic() - last_output,
+                len(output),
+                size,
+                baseline,
+            )
+            if hang:
+                proc.kill()
+                await exited
+                return -1, f"TIMEOUT (console hang: {hang})"
+    finally:
+        loop.remove_reader(master)
+        os.close(master)
+        target.end_spawn(marks, started)
+
+    text = output.decode("utf-8", "replace")
+    if returncode == 0:
+        return 0, ""
+    if "UnicodeEncodeError" in text:
+        return returncode, "ENCODING"
+    lines = text.strip().splitlines()
+    if "failed to access" in text:
+        # Reported in full: probe_console_all() tells a busy port from a missing one
+        return returncode, f"ERROR: {lines[-1]}"
+    return returncode, f"ERROR: {lines[-1][:50] if lines else returncode}"
+
+
+def watchdog_verdict(
+    elapsed: float, silence: float, received: int, size: int, baseline: ConsoleBaseline
+) -> str:
+    """Decide whether a console probe hangs; returns the reason, or "" while it is healthy."""
+    if baseline is None:
+        return f"no exit after {INTERACTIVE_TIMEOUT}s" if elapsed > INTERACTIVE_TIMEOUT else ""
+
+    if received == 0:
+        limit, phase = baseline.first_output_limit(), "before first output"
+    elif received >= size:
+        limit, phase = baseline.exit_limit(), f"after all {size} bytes (no exit)"
+    else:
+        # Mid-payload gaps are allowed to be a bit longer (slow UART chunks)
+        limit, phase = 2 * baseline.stall_limit(), f"after {received} of {size} bytes"
+
+    if silence > limit:
+        return f"no output for {silence * 1000:.0f} ms {phase}"
+    # Absolute cap for output that trickles forever
+    if elapsed > 10 * max(INTERACTIVE_TIMEOUT, baseline.expected_duration(size)):
+        return f"no exit after {elapsed:.1f}s"
+    return ""
+
+
+async def probe_console_all(
+    target: Target,
+    remote_paths: list[str],
+    sizes: list[int],
+    concurrency: int,
+    baseline: ConsoleBaseline = None,
+    on_start=None,
+):
+    """Run the console probes concurrently.
+
+    Yields (index, returncode, error_type, duration) as each completes; the duration
+    excludes the time spent waiting for a free slot. on_start(index) is called as
+    each probe starts.
+
+    A probe refused the port while other probes run means the port is exclusive
+    (a serial port): from then on probes run one at a time, and the refused one
+    is retried up to PORT_BUSY_RETRIES times. A port refused while no other probe
+    runs is missing or held elsewhere, which is reported like any other error.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    exclusive = asyncio.Lock()
+    serial = False
+    running = spawned = 0
+
+    async def attempt(remote_path: str, size: int) -> tuple[int, str, bool]:
+        """One probe; also returns whether another probe ran at some point meanwhile."""
+        nonlocal running, spawned
+        shared, before = running > 0, spawned
+        running, spawned = running + 1, spawned + 1
+        try:
+            code, err = await probe_console_pty(target, remote_path, size, baseline)
+        finally:
+            running -= 1
+        return code, err, shared or running > 0 or spawned > before + 1
+
+    async def probe(i: int, remote_path: str):
+        nonlocal serial
+        async with slots:
+            if on_start is not None:
+                on_start(i)
+            start = time.monotonic()
+            for _ in range(PORT_BUSY_RETRIES + 1):
+                if serial:
+                    async with exclusive:
+                        code, err, shared = await attempt(remote_path, sizes[i])
+                else:
+                    code, err, shared = await attempt(remote_path, sizes[i])
+                if "failed to access" not in err or not shared:
+                    break
+                if not serial:
+                    serial = True
+                    print("\nPort is exclusive: running the remaining console probes serially")
+                await asyncio.sleep(0.1)
+            return i, code, err, time.monotonic() - start
+
+    for next_done in asyncio.as_completed([probe(i, path) for i, path in enumerate(remote_paths)]):
+        yield await next_done
+
+
+def calibrate_console(target: Target, files: list[Path]) -> ConsoleBaseline:
+    """Learn the target's startup latency, cat throughput and exit time from piped reads.
+
+    Piped output never hits the console hang, so these runs give the healthy
+    baseline: best of two reads of the smallest and the largest file. They are
+    spawned like the probes (even with --session), and the time from the last
+    output byte until mpremote exited is the teardown the watchdog allows for.
+    """
+    by_size = sorted(files, key=lambda f: f.stat().st_size)
+    small, large = by_size[0], by_size[-1]
+    teardowns = []
+
+    def best_time(filepath: Path) -> float:
+        remote_path = f":{target.dest_base}/{filepath.relative_to(TEST_DIR).as_posix()}"
+        times = []
+        for _ in range(2):
+            total, teardown = timed_cat(target, remote_path)
+            times.append(total)
+            teardowns.append(teardown)
+        return min(times)
+
+    t_small = best_time(small)
+    t_large = best_time(large) if large != small else t_small
+    size_delta = large.stat().st_size - small.stat().st_size
+    throughput = max(size_delta, 256) / max(t_large - t_small, 0.01)
+    return ConsoleBaseline(t_small, throughput, max(teardowns))
+
+
+def timed_cat(target: Target, remote_path: str) -> tuple[float, float]:
+    """Spawn one piped `mpremote cat`; returns (total seconds, seconds from last output to exit)."""
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        target.mpremote_cmd("cat", remote_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    killer = threading.Timer(60, proc.kill)
+    killer.start()
+    last_output = start
+    try:
+        while proc.stdout.read1(4096):
+            last_output = time.monotonic()
+        proc.wait()
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+    end = time.monotonic()
+    return end - start, end - last_output
+
+
+def test_console_output(
+    target: Target, all_files: list[Path], concurrency: int = 1, watchdog: bool = False
+) -> tuple[list[Path], list[tuple[Path, str]]]:
+    """Test mpremote cat with real console output to detect hang issues. Returns (passed, failed).
+
+    With concurrency > 1 (POSIX only) the probes run in parallel, each on its own
+    pseudo-terminal, and results are printed in completion order. With watchdog,
+    hangs are detected from output inactivity against a baseline calibrated for
+    this target; without ptys it scales the timeout to each file's expected duration.
+    """
+    use_pty = os.name == "posix" and (concurrency > 1 or watchdog)
+    if concurrency > 1 and os.name != "posix":
+        print("Concurrent console probes need pseudo-terminals (POSIX); running serially.")
+        concurrency = 1
+
+    target.stage = "console"
     print("\n" + "=" * 70)
     print("TEST: Console Output (Interactive Mode)")
     print("=" * 70)
-    print(f"Timeout: {INTERACTIVE_TIMEOUT}s per file")
-    print(f"Testing {len(all_files)} files...\n")
 
+    files = sorted(all_files)
+    resumed = {}
+    if target.journal is not None:
+        for filepath in files:
+            result = target.journal.result("console", filepath)
+            if result is not None:
+                resumed[filepath] = result
+        files = [f for f in files if f not in resumed]
+    remote_paths = [f":{target.dest_base}/{f.relative_to(TEST_DIR).as_posix()}" for f in files]
+    sizes = [f.stat().st_size for f in files]
+
+    baseline = None
+    if watchdog and files:
+        baseline = calibrate_console(target, files)
+        print(f"Watchdog baseline: {baseline}")
+        print(
+            f"  first output within {baseline.first_output_limit() * 1000:.0f} ms, "
+            f"gaps under {baseline.stall_limit() * 1000:.0f} ms, "
+            f"exit within {baseline.exit_limit() * 1000:.0f} ms of the last byte"
+        )
+    else:
+        print(f"Timeout: {INTERACTIVE_TIMEOUT}s per file")
+    if concurrency > 1:
+        print(f"Concurrency: {concurrency} probes")
+    print(f"Testing {len(all_files)} files...\n")
     passed = []
     failed_timeout = []
     failed_other = []
 
-    for i, filepath in enumerate(sorted(all_files), 1):
-        rel_path = filepath.relative_to(TEST_DIR)
-        remote_path = f":{DEST_BASE}/{rel_path.as_posix()}"
-
-        print(f"[{i:3}/{len(all_files)}] cat {rel_path.as_posix()}", end=" ")
-        sys.stdout.flush()
-
-        code, err = run_mpremote_interactive("cat", remote_path)
-
+    def report(filepath: Path, code: int, err: str, duration: float, source: str = ""):
+        target.record("console", filepath, code == 0, err, duration, source=source)
+        if target.journal is not None and not source:
+            target.journal.finish("console", filepath, (code, "", err))
+        suffix = f" ({source})" if source else ""
         if code == 0:
-            print("PASS")
+            print("PASS" + suffix)
             passed.append(filepath)
         elif "TIMEOUT" in err:
-            print("FAIL: CONSOLE HANG")
+            print("FAIL: CONSOLE HANG" + suffix)
             failed_timeout.append((filepath, err))
         else:
-            print(f"FAIL: {err[:30]}")
+            print(f"FAIL: {err[:30]}" + suffix)
             failed_other.append((filepath, err))
 
+    for filepath, (code, _, err) in resumed.items():
+        print(f"[resumed] cat {filepath.relative_to(TEST_DIR).as_posix()}", end=" ")
+        report(filepath, code, err, None, "resumed")
+
+    if use_pty:
+
+        def begin(i: int):
+            if target.journal is not None:
+                target.journal.begin("console", files[i])
+
+        async def gather():
+            done = 0
+            async for i, code, err, duration in probe_console_all(
+                target, remote_paths, sizes, concurrency, baseline, begin
+            ):
+                done += 1
+                print(
+                    f"[{done:3}/{len(files)}] cat {files[i].relative_to(TEST_DIR).as_posix()}",
+                    end=" ",
+                )
+                report(files[i], code, err, duration)
+
+        asyncio.run(gather())
+    else:
+        for i, (filepath, remote_path) in enumerate(zip(files, remote_paths), 1):
+            print(f"[{i:3}/{len(files)}] cat {filepath.relative_to(TEST_DIR).as_posix()}", end=" ")
+            sys.stdout.flush()
+
+            timeout = (
+                baseline.expected_duration(filepath.stat().st_size) * 3 + 0.5 if baseline else None
+            )
+            if target.journal is not None:
+                target.journal.begin("console", filepath)
+            start = time.monotonic()
+            code, err = run_mpremote_interactive(target, "cat", remote_path, timeout=timeout)
+            report(filepath, code, err, time.monotonic() - start)
+
     # Summary
     print("\n" + "-" * 70)
     print("CONSOLE OUTPUT SUMMARY")
@@ -306,6 +1638,10 @@ def test_console_output(all_files: list[Path]):
         if len(failed_timeout) > 10:
             print(f"  ... and {len(failed_timeout) - 10} more")
 
+    if target.timings is not None:
+        target.timings.print_stage(target.conn, "console")
+    return passed, failed_timeout + failed_other
+
 
 def categorize_error(err: str) -> str:
     """Categorize an error message."""
@@ -323,7 +1659,7 @@ def categorize_error(err: str) -> str:
         return err[:40] if err else "UNKNOWN"
 
 
-def print_copy_summary(passed: list[Path], failed: list[tuple[Path, str]]):
+def print_copy_summary(target: Target, passed: list[Path], failed: list[tuple[Path, str]]):
     """Print copy test summary with detailed analysis of failures."""
     print("\n" + "=" * 70)
     print("COPY TEST SUMMARY")
@@ -337,42 +1673,25 @@ def print_copy_summary(passed: list[Path], failed: list[tuple[Path, str]]):
     # Categorize failures
     categories = {"Outside BMP": [], "Combining marks": [], "Format chars": [], "Other": []}
 
-    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-        f.write("Unicode Test Results\n")
-        f.write("=" * 70 + "\n\n")
-
-        for filepath, error in failed:
-            analysis = analyze_filename(filepath.name)
-
-            # Categorize
-            categorized = False
-            for issue in analysis["potential_issues"]:
-                if "Outside BMP" in issue:
-                    categories["Outside BMP"].append(filepath.name)
-                    categorized = True
-                    break
-                elif "Combining" in issue:
-                    categories["Combining marks"].append(filepath.name)
-                    categorized = True
-                    break
-                elif "Format char" in issue:
-                    categories["Format chars"].append(filepath.name)
-                    categorized = True
-                    break
-            if not categorized:
-                categories["Other"].append(filepath.name)
-
-            # Write detailed analysis to file
-            f.write(f"\nFile: {filepath.relative_to(TEST_DIR)}\n")
-            f.write(f"Error: {error}\n")
-            f.write("Codepoints:\n")
-            for cp in analysis["codepoints"]:
-                f.write(f"  {cp['char']} = {cp['codepoint']} ({cp['name']}) [{cp['category']}]\n")
-            if analysis["potential_issues"]:
-                f.write("Issues:\n")
-                for issue in analysis["potential_issues"]:
-                    f.write(f"  - {issue}\n")
-            f.write("-" * 40 + "\n")
+    for filepath, _ in failed:
+        issues = corpus_manifest().entry(filepath)["issues"]
+
+        categorized = False
+        for issue in issues:
+            if "Outside BMP" in issue:
+                categories["Outside BMP"].append(filepath.name)
+                categorized = True
+                break
+            elif "Combining" in issue:
+                categories["Combining marks"].append(filepath.name)
+                categorized = True
+                break
+            elif "Format char" in issue:
+                categories["Format chars"].append(filepath.name)
+                categorized = True
+                break
+        if not categorized:
+            categories["Other"].append(filepath.name)
 
     # Print categories
     print("\n" + "-" * 70)
@@ -401,15 +1720,473 @@ def print_copy_summary(passed: list[Path], failed: list[tuple[Path, str]]):
         for name in categories["Other"][:5]:
             print(f"  - {name}")
 
-    print(f"\nDetailed results saved to: {RESULTS_FILE}")
+    if target.stream is not None:
+        print(f"\nPer-file errors, codepoints and issues: {target.stream.path}")
+
+
+def ddmin(chars: str):
+    """Delta-debugging (ddmin) generator reducing chars to a 1-minimal failing subsequence.
+
+    Yields lists of candidate strings and expects a list of booleans (candidate
+    still fails) to be sent back for each, so candidates from several reductions
+    can share one device round trip. The first round checks that chars itself
+    fails; returns the minimal sequence, or None when the failure did not reproduce.
+    """
+    if not (yield [chars])[0]:
+        return None
+    n = 2
+    while len(chars) >= 2:
+        bounds = [len(chars) * i // n for i in range(n + 1)]
+        subsets = [chars[start:end] for start, end in zip(bounds, bounds[1:])]
+        # With two chunks the complements are the subsets themselves
+        complements = [chars[:start] + chars[end:] for start, end in zip(bounds, bounds[1:])]
+        candidates = subsets + (complements if n > 2 else [])
+        results = yield candidates
+        if any(results[:n]):
+            chars = subsets[results.index(True)]
+            n = 2
+        elif any(results[n:]):
+            chars = complements[results.index(True, n) - n]
+            n = max(n - 1, 2)
+        elif n >= len(chars):
+            break
+        else:
+            n = min(2 * n, len(chars))
+    return chars
+
+
+# Removes the probe files left by reduce_failures(), then the probe folder itself
+PROBE_CLEANUP_SCRIPT = """\
+import os
+try:
+ for _n in os.listdir({0!r}):
+  try:
+   os.remove({0!r} + '/' + _n)
+  except OSError:
+   pass
+ os.rmdir({0!r})
+except OSError:
+ pass
+"""
+
+
+def probe_names(target: Target, probe_dir: str, names: list[str], data: dict[str, bytes]) -> dict:
+    """Copy candidate filenames to probe_dir and report each one's error ("" on success).
+
+    With a session all candidates go in one batched raw-REPL write and are
+    removed again on the device; otherwise each is a temporary local file copied
+    with its own mpremote call, left for reduce_failures() to remove at the end.
+    None means the name could not be tried.
+    """
+    if target.session is not None:
+        files = [(f"{probe_dir}/{name}", data[name]) for name in names]
+        errors = target.session.bulk_put([target.dest_base, probe_dir], files, probe=True)
+        return dict(zip(names, errors))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            local = Path(tmp) / name
+            try:
+                local.write_bytes(data[name])
+            except (OSError, ValueError):
+                results[name] = None
+                continue
+            code, out, err = run_mpremote(target, "cp", str(local), f":{probe_dir}/{name}")
+            results[name] = "" if code == 0 else err or "UNKNOWN"
+            local.unlink()
+    return results
+
+
+def reduce_failures(target: Target, failed: list[tuple[Path, str]]) -> dict:
+    """Reduce each failing filename to the minimal characters that still fail the same way.
+
+    All reductions advance in lockstep, so every ddmin round of every file is
+    probed in one batch. The file extension is kept. Returns
+    {(error category, minimal stem): [files]}; the stem is None when a failure
+    did not reproduce under the probe folder.
+    """
+    print("\n" + "=" * 70)
+    print("REDUCE: Minimal Failing Characters (ddmin)")
+    print("=" * 70)
+
+    probe_dir = f"{target.dest_base}/_reduce"
+    if target.session is None:
+        setup_remote_dirs(target, set())
+        run_mpremote(target, "mkdir", f":{probe_dir}")
+
+    reductions = {}  # filepath -> (category, strict, generator, candidates)
+    for filepath, err in failed:
+        category = categorize_error(err)
+        # Unrecognized errors fall back to their own (name-dependent) text: any failure counts
+        strict = category != (err[:40] if err else "UNKNOWN")
+        reduction = ddmin(filepath.stem)
+        reductions[filepath] = (category, strict, reduction, next(reduction))
+
+    probed = {}
+    minimal = {}
+    rounds = 0
+    while reductions:
+        content = {}
+        for filepath, (*_, candidates) in reductions.items():
+            for stem in candidates:
+                content.setdefault(stem + filepath.suffix, filepath.read_bytes())
+        names = [name for name in content if name not in probed]
+        if names:
+            probed.update(probe_names(target, probe_dir, names, content))
+            rounds += 1
+
+        for filepath, (category, strict, reduction, candidates) in list(reductions.items()):
+            errors = [probed[stem + filepath.suffix] for stem in candidates]
+            results = [bool(e) and (not strict or categorize_error(e) == category) for e in errors]
+            try:
+                reductions[filepath] = (category, strict, reduction, reduction.send(results))
+            except StopIteration as stop:
+                minimal.setdefault((category, stop.value), []).append(filepath)
+                del reductions[filepath]
+
+    run_mpremote(target, "exec", PROBE_CLEANUP_SCRIPT.format(probe_dir))
+    print(f"{len(failed)} failing names reduced with {len(probed)} probes in {rounds} round trips")
+    print_minimal_triggers(target, minimal)
+    return minimal
+
+
+def print_minimal_triggers(target: Target, minimal: dict):
+    """Print the minimal trigger sequences per error category and add them to the result stream."""
+    by_category = {}
+    for (category, stem), files in sorted(minimal.items(), key=lambda item: item[0][0]):
+        by_category.setdefault(category, []).append((stem, files))
+
+    lines = []
+    for category, triggers in by_category.items():
+        lines.append(f"\n{category}:")
+        for stem, files in sorted(triggers, key=lambda t: (t[0] is None, len(t[0] or ""))):
+            example = files[0].relative_to(TEST_DIR).as_posix()
+            count = f"{len(files)} file{'s' if len(files) != 1 else ''}, e.g. {example}"
+            if stem is None:
+                lines.append(f"  (not reproducible in probe folder) - {count}")
+                continue
+            lines.append(f"  {stem!r} - {count}")
+            for cp in codepoint_details(stem):
+                lines.append(f"      {cp['codepoint']} {cp['name']} [{cp['category']}]")
+        if target.stream is not None:
+            for stem, files in triggers:
+                target.stream.write_trigger(target, category, stem, files)
+
+    print("\n" + "-" * 70)
+    print("MINIMAL TRIGGERS")
+    print("-" * 70)
+    print("\n".join(lines))
+
+
+def copy_stage(
+    args, target: Target, all_files: list[Path], subdirs: set[str]
+) -> tuple[list[Path], list[tuple[Path, str]]]:
+    """Provision the test files on the target with the selected copy strategy.
+
+    With --incremental, files already present and identical on the device count
+    as passed and only missing or changed files are copied. With --reduce, the
+    failing names are then reduced to their minimal trigger characters.
+    """
+    target.stage = "copy"
+    unchanged = []
+    if args.incremental:
+        unchanged, all_files = split_unchanged(target, all_files)
+        subdirs = file_subdirs(all_files)
+        print(
+            f"Incremental: {len(unchanged)} files unchanged on device, {len(all_files)} to copy\n"
+        )
+        if not all_files:
+            return unchanged, []
+    if not args.bulk:
+        stale = drop_stale_copies(target, all_files, False if args.incremental else None)
+        if stale:
+            print(f"Cache: {stale} cached copies are not on the device, copying them again\n")
+
+    if args.minimize:
+        passed, failed = test_minimized_copy(target, all_files, subdirs)
+    elif args.bulk:
+        passed, failed = test_bulk_copy_files(target, all_files, subdirs, args.batch_size)
+    else:
+        setup_remote_dirs(target, subdirs)
+        passed, failed = test_copy_files(target, all_files)
+    if target.timings is not None:
+        target.timings.print_stage(target.conn, "copy")
+    if args.reduce and failed:
+        target.stage = "reduce"
+        reduce_failures(target, failed)
+    return unchanged + passed, failed
+
+
+def run_tests(args, target: Target, all_files: list[Path], subdirs: set[str]) -> dict[Path, str]:
+    """Run the test stages selected on the command line.
+
+    Returns the outcome per file: "PASS", or the first failing stage and its error category.
+    """
+    outcomes = {}
+
+    def record(stage: str, passed: list[Path], failed: list[tuple[Path, str]]):
+        for filepath in passed:
+            outcomes[filepath] = "PASS"
+        for filepath, err in failed:
+            outcomes[filepath] = f"{stage}: {categorize_error(err)}"
+
+    params = {
+        "target": target.conn,
+        "dest_base": target.dest_base,
+        "mode": "bulk" if args.bulk else "session" if args.session else "cli",
+        "interactive": args.interactive,
+        "corpus": corpus_digest(all_files),
+    }
+    target.journal = Journal(JOURNAL_FILE.format(slug(target.conn)), params, resume=args.resume)
+    if target.journal.mismatch:
+        print(
+            f"Resume: {target.journal.path} is from a different run "
+            f"({target.journal.mismatch}), not replaying it\n"
+        )
+    elif args.resume:
+        print(
+            f"Resume: {len(target.journal.completed)} operations completed in {target.journal.path}"
+        )
+        for op, rel in sorted(target.journal.in_flight):
+            print(f"  re-verifying {op} {rel} (in flight when the run stopped)")
+        print()
+
+    try:
+        if args.session or args.bulk:
+            try:
+                target.open_session()
+            except Exception as e:
+                print(f"Error: cannot open a session on {target.conn}: {e}")
+                record("session", [], [(f, str(e) or type(e).__name__) for f in all_files])
+                return outcomes
+        if target.cache is not None:
+            target.identity = query_identity(target)
+            print(f"Cache: {target.identity or 'target identity unknown, cache not used'}\n")
+
+        if args.interactive:
+            # Interactive mode: test console output behavior
+            print("=" * 70)
+            print("INTERACTIVE MODE - Testing Real Console Behavior")
+            print("=" * 70)
+            print("This mode detects console output issues that don't appear when")
+            print("output is piped. A TIMEOUT indicates the console hung.\n")
+
+            if not args.skip_copy:
+                passed, failed = copy_stage(args, target, all_files, subdirs)
+                record("cp", [], failed)
+                target.close_session()
+                record(
+                    "console",
+                    *test_console_output(
+                        target, passed if passed else all_files, args.concurrency, args.watchdog
+                    ),
+                )
+            else:
+                target.close_session()
+                record(
+                    "console",
+                    *test_console_output(target, all_files, args.concurrency, args.watchdog),
+                )
+        else:
+            # Normal mode: copy and read-back tests
+            if args.skip_copy:
+                record("cat", *test_read_files(target, all_files))
+            else:
+                passed, failed = copy_stage(args, target, all_files, subdirs)
+                record("cp", [], failed)
+                if passed:
+                    record("cat", *test_read_files(target, passed))
+    finally:
+        target.close_session()
+        target.journal.close()
+        if target.cache is not None:
+            target.cache.save()
+
+    return outcomes
+
+
+def corpus_digest(files: list[Path]) -> str:
+    """Digest of the test files' paths and contents, identifying the corpus a run covers."""
+    parts = [
+        f"{f.relative_to(TEST_DIR).as_posix()}:{corpus_manifest().entry(f)['sha256']}"
+        for f in sorted(files)
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def slug(conn: str) -> str:
+    """Make a target connection string safe for use in a filename."""
+    return re.sub(r"[^A-Za-z0-9]+", "_", conn).strip("_") or "target"
+
+
+def run_workers(args, jobs: list[tuple[Target, list[Path], set[str]]]) -> list[dict[Path, str]]:
+    """Run run_tests() for each (target, files, subdirs) job in its own thread.
+
+    Each worker's output goes to its own log file. Returns the outcomes per job.
+    """
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+
+    def worker(job: tuple[Target, list[Path], set[str]]) -> dict[Path, str]:
+        target, files, dirs = job
+        log_file = f"unicode_test_{slug(target.conn)}.log"
+        start = time.monotonic()
+        with open(log_file, "w", encoding="utf-8") as log:
+            output.local.stream = log
+            try:
+                outcomes = run_tests(args, target, files, dirs)
+            except Exception as e:
+                print(f"ABORTED: {e}")
+                outcomes = {}
+            finally:
+                del output.local.stream
+        failures = sum(1 for outcome in outcomes.values() if outcome != "PASS")
+        print(
+            f"[{target.conn}] done in {time.monotonic() - start:.1f}s: {failures} failures (log: {log_file})"
+        )
+        return outcomes
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            return list(pool.map(worker, jobs))
+    finally:
+        sys.stdout = output.default
+
+
+def run_matrix(args, targets: list[Target], all_files: list[Path], subdirs: set[str]):
+    """Run all targets concurrently, one worker each, and print the merged result matrix."""
+    print(f"Running {len(targets)} targets concurrently...\n")
+    results = run_workers(args, [(target, all_files, subdirs) for target in targets])
+    print_matrix([target.conn for target in targets], all_files, results)
+
+
+def shard_files(all_files: list[Path], count: int) -> list[tuple[list[Path], set[str]]]:
+    """Split the files round-robin into count shards, each with the subdirs it needs."""
+    shards = []
+    for k in range(count):
+        files = sorted(all_files)[k::count]
+        shards.append((files, file_subdirs(files)))
+    return shards
+
+
+def start_unix_instances(
+    cmd_template: str, count: int, base_port: int
+) -> tuple[list[subprocess.Popen], list[str]]:
+    """Start count unix-port instances from a command template with a {port} placeholder.
+
+    Returns (processes, connection strings) once every port accepts connections.
+    """
+    procs = []
+    conns = []
+    for k in range(count):
+        port = base_port + k
+        cmd = shlex.split(cmd_template.format(port=port))
+        procs.append(
+            subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        )
+        conns.append(f"socket://localhost:{port}")
+
+    deadline = time.monotonic() + 15
+    for k, proc in enumerate(procs):
+        while True:
+            try:
+                socket.create_connection(("localhost", base_port + k), timeout=1).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    stop_unix_instances(procs)
+                    raise RuntimeError(f"unix-port instance on port {base_port + k} did not start")
+                time.sleep(0.2)
+    return procs, conns
+
+
+def stop_unix_instances(procs: list[subprocess.Popen]):
+    """Terminate instances started by start_unix_instances()."""
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def run_sharded(
+    args,
+    conns: list[str],
+    all_files: list[Path],
+    cache: ResultCache = None,
+    stream: ResultStream = None,
+    timings: PhaseTimings = None,
+):
+    """Split the files across a pool of unix-port instances and merge the results."""
+    shards = shard_files(all_files, len(conns))
+    jobs = [
+        (
+            Target(
+                conn,
+                dest_base=f"{DEST_BASE}_{k}",
+                cache=cache,
+                stream=stream,
+                timings=timings,
+            ),
+            files,
+            dirs,
+        )
+        for k, (conn, (files, dirs)) in enumerate(zip(conns, shards))
+    ]
+    print(f"Sharding {len(all_files)} files across {len(conns)} instances...\n")
+    results = run_workers(args, jobs)
+
+    merged = {}
+    for outcomes in results:
+        merged.update(outcomes)
+    print_matrix([f"sharded x{len(conns)}"], all_files, [merged])
+
+
+def print_matrix(columns: list[str], all_files: list[Path], results: list[dict[Path, str]]):
+    """Print the per-file x per-target matrix and save it as CSV."""
+    print("\n" + "=" * 70)
+    print("RESULT MATRIX")
+    print("=" * 70)
+
+    header = ["file"] + columns
+    rows = []
+    for filepath in sorted(all_files):
+        rows.append(
+            [filepath.relative_to(TEST_DIR).as_posix()] + [r.get(filepath, "-") for r in results]
+        )
+
+    for column, r in zip(columns, results):
+        failures = sum(1 for outcome in r.values() if outcome != "PASS")
+        print(f"{column}: {len(r) - failures} passed, {failures} failed")
+
+    # Only rows where at least one target did not pass are interesting on screen
+    differing = [row for row in rows if any(cell != "PASS" for cell in row[1:])]
+    if differing:
+        print()
+        for row in differing:
+            print(row[0])
+            for conn, cell in zip(header[1:], row[1:]):
+                print(f"    {conn:30} {cell}")
+
+    with open(MATRIX_FILE, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    print(f"\nFull matrix saved to: {MATRIX_FILE}")
 
 
 def main():
     args = parse_args()
 
-    global CONN, INTERACTIVE_TIMEOUT
-    CONN = args.target
+    global INTERACTIVE_TIMEOUT
     INTERACTIVE_TIMEOUT = args.timeout
+    conns = [conn for value in args.target for conn in value.split(",") if conn]
 
     # Collect test files
     all_files, subdirs = collect_test_files()
@@ -420,29 +2197,47 @@ def main():
 
     print(f"Found {len(all_files)} files in {len(subdirs)} folders\n")
 
-    if args.interactive:
-        # Interactive mode: test console output behavior
-        print("=" * 70)
-        print("INTERACTIVE MODE - Testing Real Console Behavior")
-        print("=" * 70)
-        print("This mode detects console output issues that don't appear when")
-        print("output is piped. A TIMEOUT indicates the console hung.\n")
-
-        if not args.skip_copy:
-            setup_remote_dirs(subdirs)
-            passed, _ = test_copy_files(all_files)
-            test_console_output(passed if passed else all_files)
-        else:
-            test_console_output(all_files)
-    else:
-        # Normal mode: copy and read-back tests
-        if args.skip_copy:
-            test_read_files(all_files)
+    cache = None
+    if args.cache or args.clear_cache:
+        if args.clear_cache and os.path.exists(CACHE_FILE):
+            os.remove(CACHE_FILE)
+        if args.cache:
+            cache = ResultCache(CACHE_FILE, args.cache_max_age)
+
+    stream = None
+    if args.stream:
+        stream = ResultStream(args.stream)
+        print(f"Streaming results to {args.stream}\n")
+    timings = PhaseTimings() if args.timings else None
+
+    try:
+        if args.pool or args.spawn:
+            procs = []
+            if args.spawn:
+                procs, pool = start_unix_instances(args.spawn, args.shards, args.base_port)
+            else:
+                pool = [conn for value in args.pool for conn in value.split(",") if conn]
+            try:
+                run_sharded(args, pool, all_files, cache, stream, timings)
+            finally:
+                stop_unix_instances(procs)
+        elif len(conns) == 1:
+            run_tests(
+                args,
+                Target(conns[0], cache=cache, stream=stream, timings=timings),
+                all_files,
+                subdirs,
+            )
         else:
-            setup_remote_dirs(subdirs)
-            passed, _ = test_copy_files(all_files)
-            if passed:
-                test_read_files(passed)
+            targets = [Target(conn, cache=cache, stream=stream, timings=timings) for conn in conns]
+            run_matrix(args, targets, all_files, subdirs)
+
+    finally:
+        if stream is not None:
+            stream.close()
+        if timings is not None:
+            timings.save(args.timings)
+            print(f"\nPhase timings saved to: {args.timings}")
 
 
 if __name__ == "__main__":
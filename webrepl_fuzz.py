@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+WebREPL raw-paste fragmentation fuzzer.
+
+test_scripts/later/6912_raw_paste_webrepl.py describes by hand how code pasted
+over WebREPL travels in WebSocket frames, and that a frame boundary can fall
+inside a multi-byte UTF-8 sequence. This drives it for real: a small WebSocket
+client logs in to WebREPL, enters the raw REPL and pastes Unicode-heavy code
+(raw-paste mode with flow control, or plain raw REPL if the device refuses
+raw paste), split into frames
+
+    offsets     in two frames, at every byte offset of the code
+    bytewise    one frame per byte
+    random      random frame sizes (--random cases, --seed)
+
+and checks the executed output for corruption. Cases that split inside a
+UTF-8 sequence are counted apart from the ones that split on a character
+boundary. The throughput mode pastes a larger program with fixed frame sizes
+and reports the usable paste bandwidth per frame size.
+
+Frames are separate WebSocket text messages by default; --framing fragmented
+sends each paste as one message of continuation frames instead.
+
+Usage:
+    python fake_device.py --port 8266 --webrepl secret &
+    python webrepl_fuzz.py -t ws://localhost:8266 -p secret
+    python webrepl_fuzz.py -t ws://192.168.4.1:8266 -p secret --modes offsets throughput
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import socket
+import struct
+import sys
+import time
+from urllib.parse import urlparse
+
+from fake_device import (
+    WS_CLOSE,
+    WS_CONTINUATION,
+    WS_GUID,
+    WS_PING,
+    WS_PONG,
+    WS_TEXT,
+    ws_mask,
+    ws_parse,
+)
+
+RESULTS_FILE = "webrepl_fuzz.json"
+MODES = ["offsets", "bytewise", "random", "throughput"]
+FRAME_SIZES = [1, 4, 16, 64, 256, 1024]
+RAW_REPL_PROMPT = b"raw REPL; CTRL-B to exit\r\n>"
+
+# Text of the pasted code: accents, CJK, symbols, Cyrillic, Arabic and characters
+# outside the BMP, so every UTF-8 length occurs (same scripts as the 6912 snippets)
+TEXT = "café naïve — 你好世界 ✓ Привет مرحبا 😀🎉 𝄞"
+
+
+def paste_code(text: str) -> tuple[bytes, str]:
+    """Code that prints a checksum of a Unicode literal, and its expected output."""
+    code = f"# {text}\ns = {text!r}\nprint(len(s), sum(s.encode()), s)\n"
+    return code.encode("utf-8"), f"{len(text)} {sum(text.encode())} {text}\n"
+
+
+def bulk_code(size: int) -> tuple[bytes, str]:
+    """paste_code() of TEXT repeated as often as fits in size bytes of code (at least once).
+
+    The code holds the text twice (comment and literal), so it grows by the
+    encoded length of two copies per repeat, after a fixed part.
+    """
+    one, two = len(paste_code(TEXT)[0]), len(paste_code(TEXT * 2)[0])
+    per_repeat = two - one
+    repeats = max(1, (size - (one - per_repeat)) // per_repeat)
+    return paste_code(TEXT * repeats)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fuzz WebREPL raw paste with UTF-8 split across WebSocket frames",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python webrepl_fuzz.py -t ws://localhost:8266 -p secret
+    python webrepl_fuzz.py -t ws://192.168.4.1:8266 -p secret --modes offsets
+    python webrepl_fuzz.py -t ws://localhost:8266 -p secret --modes random --random 500 --seed 7
+    python webrepl_fuzz.py -t ws://localhost:8266 -p secret --modes throughput --bulk-size 16384
+""",
+    )
+    parser.add_argument(
+        "-t",
+        "--target",
+        default="ws://localhost:8266",
+        help="WebREPL URL (default: ws://localhost:8266).",
+    )
+    parser.add_argument("-p", "--password", required=True, help="WebREPL password.")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=MODES,
+        default=MODES,
+        help="Split patterns to run (default: all).",
+    )
+    parser.add_argument(
+        "--framing",
+        choices=["messages", "fragmented"],
+        default="messages",
+        help="Send frames as separate text messages, or as one fragmented message per paste "
+        "(default: messages).",
+    )
+    parser.add_argument(
+        "--random",
+        type=int,
+        default=100,
+        metavar="N",
+        help="Number of random splits (default: 100).",
+    )
+    parser.add_argument(
+        "--max-frame",
+        type=int,
+        default=16,
+        help="Largest frame of the random splits, in bytes (default: 16).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument(
+        "--frame-sizes",
+        nargs="+",
+        type=int,
+        default=FRAME_SIZES,
+        help=f"Frame sizes of the throughput mode (default: {' '.join(map(str, FRAME_SIZES))}).",
+    )
+    parser.add_argument(
+        "--bulk-size",
+        type=int,
+        default=4096,
+        help="Approximate size in bytes of the code pasted in throughput mode (default: 4096).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Throughput runs per frame size; the median is reported (default: 3).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5,
+        help="Seconds to wait for the device before a case counts as hung (default: 5).",
+    )
+    parser.add_argument(
+        "--json",
+        default=RESULTS_FILE,
+        metavar="FILE",
+        help=f"Save the results to this JSON file (default: {RESULTS_FILE}).",
+    )
+    return parser.parse_args()
+
+
+class WebSocketClient:
+    """Minimal RFC 6455 client: masked frames out, payload bytes of all data frames in."""
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        if parsed.scheme != "ws":
+            raise ValueError(f"not a ws:// URL: {url}")
+        self.timeout = timeout
+        self.sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = base64.b64encode(os.urandom(16))
+        self.sock.sendall(
+            f"GET {parsed.path or '/'} HTTP/1.1\r\nHost: {parsed.netloc}\r\n".encode("ascii")
+            + b"Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: "
+            + key
+            + b"\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        response = b""
+        while b"\r\n\r\n" not in response:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("connection closed during the WebSocket handshake")
+            response += data
+        head, _, self.frames = response.partition(b"\r\n\r\n")
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+        if b" 101 " not in head.split(b"\r\n", 1)[0] or accept not in head:
+            raise ConnectionError(f"WebSocket handshake refused: {head.splitlines()[0]!r}")
+        self.buffer = b""
+
+    def send(self, payload: bytes, opcode: int = WS_TEXT, fin: bool = True):
+        key = os.urandom(4)
+        n = len(payload)
+        first = (0x80 if fin else 0) | opcode
+        if n < 126:
+            header = struct.pack("!BB", first, 0x80 | n)
+        elif n < 0x10000:
+            header = struct.pack("!BBH", first, 0x80 | 126, n)
+        else:
+            header = struct.pack("!BBQ", first, 0x80 | 127, n)
+        self.sock.sendall(header + key + ws_mask(payload, key))
+
+    def _fill(self, deadline: float):
+        """Receive until at least one more data payload byte is buffered."""
+        while True:
+            frame = ws_parse(self.frames)
+            if frame is not None:
+                _, opcode, payload, self.frames = frame
+                if opcode == WS_CLOSE:
+                    raise ConnectionError("device closed the WebSocket")
+                if opcode == WS_PING:
+                    self.send(payload, WS_PONG)
+                elif opcode != WS_PONG and payload:
+                    self.buffer += payload
+                    return
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("no response from device")
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                raise TimeoutError("no response from device") from None
+            if not data:
+                raise ConnectionError("device closed the connection")
+            self.frames += data
+
+    def read_until(self, *markers: bytes, timeout: float = None) -> bytes:
+        """Bytes up to and including the first of markers."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            hits = [(i, m) for m in markers if (i := self.buffer.find(m)) >= 0]
+            if hits:
+                i, marker = min(hits)
+                data, self.buffer = self.buffer[: i + len(marker)], self.buffer[i + len(marker) :]
+                return data
+            self._fill(deadline)
+
+    def read(self, n: int, timeout: float = None) -> bytes:
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while len(self.buffer) < n:
+            self._fill(deadline)
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def close(self):
+        try:
+            self.send(struct.pack("!H", 1000), WS_CLOSE)
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class WebRepl:
+    """A logged-in WebREPL connection in the raw REPL."""
+
+    def __init__(self, url: str, password: str, timeout: float, fragmented: bool):
+        self.ws = WebSocketClient(url, timeout)
+        self.fragmented = fragmented
+        self.paste_supported = None
+        self.ws.read_until(b"Password: ")
+        self.ws.send(password.encode("utf-8") + b"\r")
+        reply = self.ws.read_until(b">>> ", b"denied")
+        if reply.endswith(b"denied"):
+            self.ws.close()
+            raise ConnectionError("WebREPL password rejected")
+        self.ws.send(b"\r\x03\x03")
+        self.ws.send(b"\x01")
+        self.ws.read_until(RAW_REPL_PROMPT)
+
+    def send_frames(self, pieces: list[bytes], window: int = 0):
+        """Send pieces as frames; with a raw-paste window, wait for flow control between them."""
+        remain = window
+        first = True
+        for index, piece in enumerate(pieces):
+            while piece:
+                if window:
+                    if remain == 0:
+                        flow = self.ws.read(1)
+                        if flow != b"\x01":
+                            raise ConnectionError(f"device aborted the paste ({flow!r})")
+                        remain = window
+                    part = piece[:remain]
+                    remain -= len(part)
+                else:
+                    part = piece
+                piece = piece[len(part) :]
+                last = index == len(pieces) - 1 and not piece
+                if self.fragmented:
+                    self.ws.send(part, WS_TEXT if first else WS_CONTINUATION, fin=last)
+                else:
+                    self.ws.send(part)
+                first = False
+
+    def execute(self, pieces: list[bytes]) -> tuple[str, str]:
+        """Paste and run code split into pieces; returns (stdout, stderr)."""
+        self.ws.send(b"\x05A\x01")
+        reply = self.ws.read(2)
+        if reply == b"R\x01":
+            self.paste_supported = True
+            (window,) = struct.unpack("<H", self.ws.read(2))
+            self.send_frames(pieces, window)
+            self.ws.send(b"\x04")
+            self.ws.read_until(b"\x04")  # End of data acknowledged
+        elif reply == b"R\x00":
+            self.paste_supported = False
+            self.send_frames(pieces)
+            self.ws.send(b"\x04")
+            if self.ws.read(2) != b"OK":
+                raise ConnectionError("raw REPL did not accept the code")
+        else:
+            raise ConnectionError(f"unexpected raw-paste reply {reply!r}")
+        out = self.ws.read_until(b"\x04")[:-1]
+        err = self.ws.read_until(b"\x04")[:-1]
+        self.ws.read_until(b">")
+        decode = lambda b: b.decode("utf-8", "replace").replace("\r\n", "\n")
+        return decode(out), decode(err)
+
+    def close(self):
+        self.ws.close()
+
+
+def split(data: bytes, sizes: list[int]) -> list[bytes]:
+    pieces, pos = [], 0
+    for size in sizes:
+        pieces.append(data[pos : pos + size])
+        pos += size
+    return pieces
+
+
+def inside_sequence(data: bytes, offset: int) -> bool:
+    """Whether a cut before data[offset] falls inside a multi-byte UTF-8 sequence."""
+    return 0 < offset < len(data) and data[offset] & 0xC0 == 0x80
+
+
+def split_cases(code: bytes, modes: list[str], args) -> list[dict]:
+    """{name, cuts (offsets where frames end), pieces} for the correctness modes."""
+    cases = [{"name": "whole", "cuts": []}]
+    if "offsets" in modes:
+        cases += [{"name": f"offset {k}", "cuts": [k]} for k in range(1, len(code))]
+    if "bytewise" in modes:
+        cases.append({"name": "bytewise", "cuts": list(range(1, len(code)))})
+    if "random" in modes:
+        rng = random.Random(args.seed)
+        for i in range(args.random):
+            cuts, pos = [], rng.randint(1, args.max_frame)
+            while pos < len(code):
+                cuts.append(pos)
+                pos += rng.randint(1, args.max_frame)
+            cases.append({"name": f"random {i}", "cuts": cuts})
+    for case in cases:
+        bounds = [0] + case["cuts"] + [len(code)]
+        case["pieces"] = split(code, [b - a for a, b in zip(bounds, bounds[1:])])
+        case["inside"] = sum(inside_sequence(code, k) for k in case["cuts"])
+    return cases
+
+
+def describe_mismatch(out: str, expected: str) -> str:
+    """Short description of where output differs from the expected output."""
+    i = next((i for i, (a, b) in enumerate(zip(out, expected)) if a != b), None)
+    if i is None:
+        i = min(len(out), len(expected))
+    return f"output differs at char {i}: got {out[max(i - 4, 0) : i + 8]!r}"
+
+
+class Fuzzer:
+    """Runs cases over one WebREPL connection, reconnecting after a hang or disconnect."""
+
+    def __init__(self, args):
+        self.args = args
+        self.repl = None
+        self.connections = 0
+        self.paste_supported = None
+
+    def connect(self):
+        if self.repl is None:
+            self.repl = WebRepl(
+                self.args.target,
+                self.args.password,
+                self.args.timeout,
+                self.args.framing == "fragmented",
+            )
+            self.connections += 1
+
+    def run(self, pieces: list[bytes]) -> tuple[str, str]:
+        """Execute one paste; returns (stdout, stderr) or raises after dropping the connection."""
+        self.connect()
+        try:
+            result = self.repl.execute(pieces)
+            self.paste_supported = self.repl.paste_supported
+            return result
+        except (TimeoutError, ConnectionError, OSError):
+            self.repl.close()
+            self.repl = None
+            raise
+
+    def check(self, case: dict, expected: str) -> dict:
+        try:
+            out, err = self.run(case["pieces"])
+        except (TimeoutError, ConnectionError, OSError) as e:
+            return {"status": "FAIL", "detail": f"{type(e).__name__}: {e}"}
+        if err:
+            lines = err.strip().splitlines()
+            return {"status": "FAIL", "detail": lines[-1] if lines else err}
+        if out != expected:
+            return {"status": "FAIL", "detail": describe_mismatch(out, expected)}
+        return {"status": "PASS", "detail": ""}
+
+    def close(self):
+        if self.repl is not None:
+            self.repl.close()
+
+
+def run_splits(fuzzer: Fuzzer, args) -> list[dict]:
+    """Run the correctness cases and print their failures as they happen."""
+    code, expected = paste_code(TEXT)
+    cases = split_cases(code, args.modes, args)
+    print(f"Pasting {len(code)} bytes of code in {len(cases)} splits\n")
+    results = []
+    for case in cases:
+        result = fuzzer.check(case, expected)
+        results.append(
+            {
+                "name": case["name"],
+                "frames": len(case["pieces"]),
+                "inside": case["inside"],
+                "cuts": case["cuts"],
+                **result,
+            }
+        )
+        if result["status"] != "PASS":
+            print(
+                f"  FAIL {case['name']} ({case['inside']} cuts inside UTF-8): {result['detail']}"
+            )
+        if case["name"] == "whole" and result["status"] != "PASS":
+            print("  The unsplit paste fails: the split results only repeat that failure")
+    return results
+
+
+def run_throughput(fuzzer: Fuzzer, args) -> list[dict]:
+    """Paste a larger program at each frame size; median seconds and bytes/s per size."""
+    code, expected = bulk_code(args.bulk_size)
+    print(f"\nThroughput: {len(code)} bytes of code per paste")
+    points = []
+    for size in args.frame_sizes:
+        pieces = split(code, [size] * (len(code) // size + 1))
+        pieces = [p for p in pieces if p]
+        times, error = [], ""
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            try:
+                out, err = fuzzer.run(pieces)
+            except (TimeoutError, ConnectionError, OSError) as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            times.append(time.perf_counter() - start)
+            if err or out != expected:
+                error = err.strip().splitlines()[-1] if err.strip() else "corrupted output"
+                break
+        point = {"frame_size": size, "frames": len(pieces), "bytes": len(code), "error": error}
+        if times and not error:
+            seconds = sorted(times)[len(times) // 2]
+            point.update(seconds=round(seconds, 4), bytes_per_s=round(len(code) / seconds))
+        points.append(point)
+        result = error or f"{point['bytes_per_s'] / 1024:.1f} KB/s"
+        print(f"  {size:>6} B frames ({len(pieces):>5} frames): {result}")
+    return points
+
+
+def print_summary(results: list[dict], points: list[dict], fuzzer: Fuzzer):
+    """Print pass/fail split by cuts inside and outside UTF-8 sequences, and the throughput."""
+    print("\n" + "=" * 70)
+    print("WEBREPL FRAGMENTATION")
+    print("=" * 70)
+    mode = {True: "raw paste", False: "raw REPL (raw paste refused)", None: "unknown"}
+    print(f"Paste mode: {mode[fuzzer.paste_supported]}")
+    if results:
+        groups = {
+            "no cut": [r for r in results if not r["cuts"]],
+            "cuts on character boundaries": [r for r in results if r["cuts"] and not r["inside"]],
+            "cuts inside UTF-8 sequences": [r for r in results if r["inside"]],
+        }
+        for label, group in groups.items():
+            if group:
+                passed = sum(r["status"] == "PASS" for r in group)
+                print(f"  {label:<30} {passed:>5}/{len(group)} passed")
+    if points:
+        print("\n" + "-" * 70)
+        print(f"{'frame size':>10} {'frames':>7} {'seconds':>9} {'KB/s':>9}")
+        for p in points:
+            if p["error"]:
+                print(f"{p['frame_size']:>10} {p['frames']:>7}  {p['error']}")
+            else:
+                print(
+                    f"{p['frame_size']:>10} {p['frames']:>7} {p['seconds']:>9.3f} "
+                    f"{p['bytes_per_s'] / 1024:>9.1f}"
+                )
+
+
+def main():
+    args = parse_args()
+    fuzzer = Fuzzer(args)
+    try:
+        fuzzer.connect()
+    except (ValueError, TimeoutError, ConnectionError, OSError) as e:
+        print(f"Error: cannot open {args.target}: {e}")
+        sys.exit(1)
+
+    print(f"Target: {args.target} ({args.framing})")
+    results, points = [], []
+    try:
+        results = run_splits(fuzzer, args)
+        if "throughput" in args.modes:
+            points = run_throughput(fuzzer, args)
+    finally:
+        fuzzer.close()
+
+    print_summary(results, points, fuzzer)
+    failed = sum(r["status"] != "PASS" for r in results)
+    print(f"\n{len(results)} splits, {failed} failed, {fuzzer.connections} connection(s)")
+
+    data = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": args.target,
+            "framing": args.framing,
+            "paste_supported": fuzzer.paste_supported,
+            "seed": args.seed,
+            "connections": fuzzer.connections,
+        },
+        "splits": results,
+        "throughput": points,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"Results saved to: {args.json}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()